@@ -1,34 +1,49 @@
 """The Scheduler Integration."""
-import logging
-import voluptuous as vol
 import datetime
-import homeassistant.util.dt as dt_util
+import logging
 
-from homeassistant.helpers import config_validation as cv
+import attr
+import homeassistant.util.dt as dt_util
+import voluptuous as vol
 from homeassistant.components.switch import DOMAIN as PLATFORM
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
-    EVENT_HOMEASSISTANT_STARTED,
-    EVENT_HOMEASSISTANT_STOP,
     ATTR_ENTITY_ID,
     ATTR_NAME,
+    EVENT_HOMEASSISTANT_STARTED,
+    EVENT_HOMEASSISTANT_STOP,
+    STATE_OFF,
+    STATE_ON,
+)
+from homeassistant.core import (
+    CoreState,
+    HomeAssistant,
+    SupportsResponse,
+    asyncio,
+    callback,
 )
-from homeassistant.core import HomeAssistant, asyncio, CoreState, callback
+from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from homeassistant.helpers.entity_registry import async_get as get_entity_registry
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from homeassistant.helpers.dispatcher import (
     async_dispatcher_send,
 )
+from homeassistant.helpers.entity_registry import async_get as get_entity_registry
 from homeassistant.helpers.event import (
     async_call_later,
-    async_track_state_change_event,
     async_track_point_in_time,
+    async_track_state_change_event,
 )
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 
 from . import const
+from .feed import ChangeFeed
+from .handles import HandleRegistry
+from .occurrence import WorkdayCalendar, weekday_mask
 from .store import async_get_registry
+from .sun import SunEphemeris, SunTracker
+from .timer import plan_timers
+from .trigger import TriggerEngine
 from .websockets import async_register_websockets
 
 _LOGGER = logging.getLogger(__name__)
@@ -43,6 +58,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Set up Scheduler integration from a config entry."""
     session = async_get_clientsession(hass)
     store = await async_get_registry(hass)
+    await store.async_set_journal(entry.options.get(const.CONF_JOURNAL, False))
     coordinator = SchedulerCoordinator(hass, session, entry, store)
 
     device_registry = dr.async_get(hass)
@@ -58,6 +74,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     hass.data.setdefault(const.DOMAIN, {})
     hass.data[const.DOMAIN] = {"coordinator": coordinator, "schedules": {}}
 
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
+
     if entry.unique_id is None:
         hass.config_entries.async_update_entry(entry, unique_id=coordinator.id)
 
@@ -78,11 +96,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
 
     @callback
     def async_service_edit_schedule(service):
-        match = None
-        for (schedule_id, entity) in hass.data[const.DOMAIN]["schedules"].items():
-            if entity.entity_id == service.data[const.ATTR_ENTITY_ID]:
-                match = schedule_id
-                continue
+        match = coordinator.async_get_schedule_id(service.data[const.ATTR_ENTITY_ID])
         if not match:
             raise vol.Invalid(
                 "Entity not found: {}".format(service.data[const.ATTR_ENTITY_ID])
@@ -103,11 +117,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
 
     @callback
     def async_service_remove_schedule(service):
-        match = None
-        for (schedule_id, entity) in hass.data[const.DOMAIN]["schedules"].items():
-            if entity.entity_id == service.data["entity_id"]:
-                match = schedule_id
-                continue
+        match = coordinator.async_get_schedule_id(service.data["entity_id"])
         if not match:
             raise vol.Invalid("Entity not found: {}".format(service.data["entity_id"]))
         else:
@@ -122,11 +132,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
 
     @callback
     def service_copy_schedule(service):
-        match = None
-        for (schedule_id, entity) in hass.data[const.DOMAIN]["schedules"].items():
-            if entity.entity_id == service.data[const.ATTR_ENTITY_ID]:
-                match = schedule_id
-                continue
+        match = coordinator.async_get_schedule_id(service.data[const.ATTR_ENTITY_ID])
         if not match:
             raise vol.Invalid(
                 "Entity not found: {}".format(service.data[const.ATTR_ENTITY_ID])
@@ -153,36 +159,169 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         ),
     )
 
+    @callback
+    def async_resolve_entity_ids(entity_ids: list) -> list:
+        """find the schedule IDs of a list of schedule entities, which must all exist"""
+        schedule_ids = []
+        errors = []
+        seen = set()
+        for entity_id in entity_ids:
+            schedule_id = coordinator.async_get_schedule_id(entity_id)
+            if not schedule_id:
+                errors.append("Entity not found: {}".format(entity_id))
+            elif schedule_id in seen:
+                errors.append("Entity given more than once: {}".format(entity_id))
+            seen.add(schedule_id)
+            schedule_ids.append(schedule_id)
+        if errors:
+            raise vol.Invalid(", ".join(errors))
+        return schedule_ids
+
+    async def async_service_set_enabled(service, enabled: bool):
+        start = dt_util.utcnow()
+        schedule_ids = None
+        if ATTR_ENTITY_ID in service.data:
+            schedule_ids = async_resolve_entity_ids(service.data[ATTR_ENTITY_ID])
+        if enabled:
+            changed = await coordinator.async_enable_all_schedules(
+                schedule_ids, service.data.get(const.ATTR_TAGS)
+            )
+        else:
+            changed = await coordinator.async_disable_all_schedules(
+                schedule_ids, service.data.get(const.ATTR_TAGS)
+            )
+        duration = (dt_util.utcnow() - start).total_seconds()
+        _LOGGER.debug(
+            "{} {} schedules in {:.3f}s".format(
+                "Enabled" if enabled else "Disabled", len(changed), duration
+            )
+        )
+        return {const.ATTR_SCHEDULE_IDS: changed, const.ATTR_DURATION: duration}
+
     async def async_service_disable_all(service):
-        await coordinator.async_disable_all_schedules()
+        return await async_service_set_enabled(service, False)
 
     hass.services.async_register(
         const.DOMAIN,
         const.SERVICE_DISABLE_ALL,
-        async_service_disable_all
+        async_service_disable_all,
+        schema=const.ENABLE_ALL_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
     )
 
     async def async_service_enable_all(service):
-        await coordinator.async_enable_all_schedules()
+        return await async_service_set_enabled(service, True)
 
     hass.services.async_register(
         const.DOMAIN,
         const.SERVICE_ENABLE_ALL,
-        async_service_enable_all
+        async_service_enable_all,
+        schema=const.ENABLE_ALL_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
     )
 
     async def async_service_reload_storage(service):
         """Reload scheduler storage from disk."""
-        await coordinator.async_reload_storage()
+        return await coordinator.async_reload_storage()
 
     hass.services.async_register(
         const.DOMAIN,
         const.SERVICE_RELOAD_STORAGE,
-        async_service_reload_storage
+        async_service_reload_storage,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    @callback
+    def async_service_add_many(service):
+        entries = coordinator.async_create_schedules(
+            [dict(item) for item in service.data[const.ATTR_SCHEDULES]]
+        )
+        return {
+            const.ATTR_SCHEDULES: [
+                {const.ATTR_SCHEDULE_ID: entry.schedule_id, ATTR_NAME: entry.name}
+                for entry in entries
+            ]
+        }
+
+    hass.services.async_register(
+        const.DOMAIN,
+        const.SERVICE_ADD_MANY,
+        async_service_add_many,
+        schema=const.ADD_MANY_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    @callback
+    def async_service_edit_many(service):
+        items = service.data[const.ATTR_SCHEDULES]
+        entity_ids = [item[ATTR_ENTITY_ID] for item in items]
+        schedule_ids = async_resolve_entity_ids(entity_ids)
+        changes = {}
+        for (schedule_id, item) in zip(schedule_ids, items):
+            data = dict(item)
+            del data[ATTR_ENTITY_ID]
+            changes[schedule_id] = data
+        coordinator.async_edit_schedules(changes)
+        return {
+            const.ATTR_SCHEDULES: [
+                {ATTR_ENTITY_ID: entity_id, const.ATTR_SCHEDULE_ID: schedule_id}
+                for (entity_id, schedule_id) in zip(entity_ids, schedule_ids)
+            ]
+        }
+
+    hass.services.async_register(
+        const.DOMAIN,
+        const.SERVICE_EDIT_MANY,
+        async_service_edit_many,
+        schema=vol.Schema(
+            {
+                vol.Required(const.ATTR_SCHEDULES): vol.All(
+                    cv.ensure_list,
+                    vol.Length(min=1),
+                    [
+                        const.EDIT_SCHEDULE_SCHEMA.extend(
+                            {vol.Required(ATTR_ENTITY_ID): cv.string}
+                        )
+                    ],
+                ),
+            }
+        ),
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    @callback
+    def async_service_remove_many(service):
+        entity_ids = service.data[ATTR_ENTITY_ID]
+        schedule_ids = async_resolve_entity_ids(entity_ids)
+        coordinator.async_delete_schedules(schedule_ids)
+        return {
+            const.ATTR_SCHEDULES: [
+                {ATTR_ENTITY_ID: entity_id, const.ATTR_SCHEDULE_ID: schedule_id}
+                for (entity_id, schedule_id) in zip(entity_ids, schedule_ids)
+            ]
+        }
+
+    hass.services.async_register(
+        const.DOMAIN,
+        const.SERVICE_REMOVE_MANY,
+        async_service_remove_many,
+        schema=vol.Schema({vol.Required(ATTR_ENTITY_ID): cv.entity_ids}),
+        supports_response=SupportsResponse.OPTIONAL,
     )
 
     return True
 
+
+async def async_update_options(hass, entry: ConfigEntry):
+    """Apply changed options of the config entry."""
+    coordinator = hass.data[const.DOMAIN]["coordinator"]
+    coordinator.update_delay = entry.options.get(const.CONF_UPDATE_DELAY, 0)
+    await coordinator.store.async_set_journal(
+        entry.options.get(const.CONF_JOURNAL, False)
+    )
+    await coordinator.async_set_spread(entry.options.get(const.ATTR_SPREAD, 0))
+
+
 async def async_migrate_entry(hass, config_entry: ConfigEntry):
     """Migrate old entry."""
     _LOGGER.debug("Migrating from version %s", config_entry.version)
@@ -224,9 +363,31 @@ class SchedulerCoordinator(DataUpdateCoordinator):
         self.state = const.STATE_INIT
         self._workday_tracker = None
         self._workday_timer = None
+        self.workday_calendar = WorkdayCalendar()
+        self.spread = entry.options.get(const.ATTR_SPREAD, 0)
+        self.update_delay = entry.options.get(const.CONF_UPDATE_DELAY, 0)
+        self._timer_plans = {}
+        self._finished_timers = []
+        self._pending_updates = {}
+        self._update_timer = None
+        self._entity_ids = {}
+        self._schedule_ids = {}
+        self.requested_updates = 0
+        self.state_writes = 0
+        self.skipped_state_writes = 0
+        self.update_events = 0
         self.stopped = False
+        self.handles = HandleRegistry()
+        self.trigger_engine = TriggerEngine(hass)
+        self.trigger_engine.async_add_batch_listener(self.async_process_finished_timers)
+        self.sun_tracker = SunTracker(hass)
+        self.sun_tracker.async_start()
+        self.sun_ephemeris = SunEphemeris(hass, self.sun_tracker)
+        self.sun_ephemeris.async_start()
+        self.change_feed = ChangeFeed(hass, self)
 
         super().__init__(hass, _LOGGER, name=const.DOMAIN)
+        self.async_update_workday_calendar()
 
         # detect time of prior shutdown to determine which schedules need to be triggered
         time_shutdown = self.store.async_get_time_shutdown()
@@ -244,6 +405,7 @@ class SchedulerCoordinator(DataUpdateCoordinator):
             @callback
             def async_timer_finished(_now):
                 self.state = const.STATE_READY
+                self._timer_plans = {}
                 async_dispatcher_send(self.hass, const.EVENT_STARTED)
 
             async_call_later(hass, 10, async_timer_finished)
@@ -263,12 +425,12 @@ class SchedulerCoordinator(DataUpdateCoordinator):
 
         hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, async_handle_shutdown)
 
-    def async_get_schedule(self, schedule_id: str):
+    def async_get_schedule(self, schedule_id: str, fields: list = None):
         """fetch a schedule (websocket API hook)"""
         if schedule_id not in self.hass.data[const.DOMAIN]["schedules"]:
             return None
         item = self.hass.data[const.DOMAIN]["schedules"][schedule_id]
-        return item.async_get_entity_state()
+        return item.async_get_entity_state(fields)
 
     def async_get_schedules(self):
         """fetch a list of schedules (websocket API hook)"""
@@ -279,61 +441,280 @@ class SchedulerCoordinator(DataUpdateCoordinator):
             data.append(config)
         return data
 
+    @callback
+    def async_get_schedule_position(self, schedule_id: str):
+        """position of a schedule in storage order (websocket API hook)"""
+        return self.store.async_get_schedule_position(schedule_id)
+
+    @callback
+    def async_find_schedules(
+        self,
+        tags: list = None,
+        entity_ids: list = None,
+        enabled: bool = None,
+        weekdays: list = None,
+    ) -> list:
+        """find the IDs of the schedules matching all filters (websocket API hook)"""
+        candidates = None
+        if tags is not None:
+            candidates = set()
+            for tag in tags:
+                candidates.update(self.store.async_get_schedules_with_tag(tag))
+        if entity_ids is not None:
+            matches = set()
+            for entity_id in entity_ids:
+                matches.update(self.store.async_get_schedules_with_entity(entity_id))
+            candidates = matches if candidates is None else candidates & matches
+        if weekdays is not None:
+            weekdays = set(weekdays)
+
+        entities = self.hass.data[const.DOMAIN]["schedules"]
+        result = []
+        for (schedule_id, entry) in self.store.schedules.items():
+            if candidates is not None and schedule_id not in candidates:
+                continue
+            if schedule_id not in entities:
+                continue
+            if enabled is not None and entry.enabled != enabled:
+                continue
+            if weekdays is not None and weekdays.isdisjoint(entry.weekdays):
+                continue
+            result.append(schedule_id)
+        return result
+
+    @callback
+    def async_register_entity(self, entity):
+        """add a schedule entity to the entity_id <-> schedule_id index"""
+        old_entity_id = self._entity_ids.get(entity.schedule_id)
+        if old_entity_id is not None:
+            self._schedule_ids.pop(old_entity_id, None)
+        self._entity_ids[entity.schedule_id] = entity.entity_id
+        self._schedule_ids[entity.entity_id] = entity.schedule_id
+
+    @callback
+    def async_unregister_entity(self, entity):
+        """remove a schedule entity from the entity_id <-> schedule_id index"""
+        if self._entity_ids.get(entity.schedule_id) != entity.entity_id:
+            # the schedule is already registered under another entity
+            return
+        del self._entity_ids[entity.schedule_id]
+        self._schedule_ids.pop(entity.entity_id, None)
+
+    @callback
+    def async_get_schedule_id(self, entity_id: str):
+        """find the schedule ID of a schedule entity"""
+        schedule_id = self._schedule_ids.get(entity_id)
+        entity = self.hass.data[const.DOMAIN]["schedules"].get(schedule_id)
+        if entity is None or entity.entity_id != entity_id:
+            return None
+        return schedule_id
+
+    @callback
+    def async_get_entity_id(self, schedule_id: str):
+        """find the entity ID of a schedule"""
+        return self._entity_ids.get(schedule_id)
+
     @callback
     def async_create_schedule(self, data):
         """add a new schedule"""
-        tags = None
-        if const.ATTR_TAGS in data:
-            tags = data[const.ATTR_TAGS]
-            del data[const.ATTR_TAGS]
-        res = self.store.async_create_schedule(data)
-        if res:
-            self.async_assign_tags_to_schedule(res.schedule_id, tags)
-            async_dispatcher_send(self.hass, const.EVENT_ITEM_CREATED, res)
+        self.async_create_schedules([data])
+
+    @callback
+    def async_create_schedules(self, items: list) -> list:
+        """add a batch of new schedules, they are saved and added as entities at once"""
+        entries = []
+        with self.store.async_batch():
+            for data in items:
+                tags = data.pop(const.ATTR_TAGS, None)
+                res = self.store.async_create_schedule(data)
+                if res:
+                    self.async_assign_tags_to_schedule(res.schedule_id, tags)
+                    entries.append(res)
+        if entries:
+            async_dispatcher_send(self.hass, const.EVENT_ITEMS_CREATED, entries)
+        return entries
 
     @callback
     def async_edit_schedule(self, schedule_id: str, data: dict):
         """edit an existing schedule"""
-        if schedule_id not in self.hass.data[const.DOMAIN]["schedules"]:
-            return
-        item = self.async_get_schedule(schedule_id)
-
-        if ATTR_NAME in data and item[ATTR_NAME] != data[ATTR_NAME]:
-            data[ATTR_NAME] = data[ATTR_NAME].strip()
-        elif ATTR_NAME in data:
-            del data[ATTR_NAME]
-
-        tags_updated = False
-        tags = None
-        if const.ATTR_TAGS in data:
-            tags_updated = True
-            tags = data[const.ATTR_TAGS]
-            del data[const.ATTR_TAGS]
-
-        entry = self.store.async_update_schedule(schedule_id, data)
-        if tags_updated:
-            self.async_assign_tags_to_schedule(schedule_id, tags)
-        entity = self.hass.data[const.DOMAIN]["schedules"][schedule_id]
-        if ATTR_NAME in data:
-            # if the name has been changed, the entity ID must change hence the entity should be destroyed
-            entity_registry = get_entity_registry(self.hass)
-            entity_registry.async_remove(entity.entity_id)
-            async_dispatcher_send(self.hass, const.EVENT_ITEM_CREATED, entry)
-        else:
+        self.async_edit_schedules({schedule_id: data})
+
+    @callback
+    def async_edit_schedules(self, changes: dict) -> list:
+        """edit a batch of schedules (schedule_id -> data), returns the edited IDs"""
+        schedules = self.hass.data[const.DOMAIN]["schedules"]
+        entity_registry = get_entity_registry(self.hass)
+        updated = []
+        renamed = []
+        with self.store.async_batch():
+            for (schedule_id, data) in changes.items():
+                if schedule_id not in schedules:
+                    continue
+                item = self.store.async_get_schedule_entry(schedule_id)
+
+                if ATTR_NAME in data and item.name != data[ATTR_NAME]:
+                    data[ATTR_NAME] = data[ATTR_NAME].strip()
+                elif ATTR_NAME in data:
+                    del data[ATTR_NAME]
+
+                tags_updated = False
+                tags = None
+                if const.ATTR_TAGS in data:
+                    tags_updated = True
+                    tags = data[const.ATTR_TAGS]
+                    del data[const.ATTR_TAGS]
+
+                entry = self.store.async_update_schedule(schedule_id, data)
+                if tags_updated:
+                    self.async_assign_tags_to_schedule(schedule_id, tags)
+                if ATTR_NAME in data:
+                    # a new name changes the entity ID, hence the entity is recreated
+                    entity = schedules.pop(schedule_id)
+                    entity_registry.async_remove(entity.entity_id)
+                    renamed.append(entry)
+                else:
+                    updated.append(schedule_id)
+
+        self.async_propagate_changes(updated, renamed)
+        return updated + [entry.schedule_id for entry in renamed]
+
+    @callback
+    def async_propagate_changes(self, updated: list, created: list):
+        """update the entities of changed schedules and add those of created ones"""
+        if updated or created:
+            # compute the timers of the changed schedules in one go
+            self.async_plan_timers(updated + [entry.schedule_id for entry in created])
+        if created:
+            async_dispatcher_send(self.hass, const.EVENT_ITEMS_CREATED, created)
+        for schedule_id in updated:
+            async_dispatcher_send(
+                self.hass,
+                const.schedule_signal(const.EVENT_ITEM_UPDATED, schedule_id),
+                schedule_id,
+            )
             async_dispatcher_send(self.hass, const.EVENT_ITEM_UPDATED, schedule_id)
 
     @callback
     def async_delete_schedule(self, schedule_id: str):
         """delete an existing schedule"""
-        if schedule_id not in self.hass.data[const.DOMAIN]["schedules"]:
-            return
-        entity = self.hass.data[const.DOMAIN]["schedules"][schedule_id]
+        self.async_delete_schedules([schedule_id])
+
+    @callback
+    def async_delete_schedules(self, schedule_ids: list) -> list:
+        """delete a batch of existing schedules, returns the IDs of the deleted ones"""
+        schedules = self.hass.data[const.DOMAIN]["schedules"]
         entity_registry = get_entity_registry(self.hass)
-        entity_registry.async_remove(entity.entity_id)
-        self.store.async_delete_schedule(schedule_id)
-        self.async_assign_tags_to_schedule(schedule_id, None)
-        self.hass.data[const.DOMAIN]["schedules"].pop(schedule_id, None)
-        async_dispatcher_send(self.hass, const.EVENT_ITEM_REMOVED, schedule_id)
+        removed = []
+        with self.store.async_batch():
+            for schedule_id in schedule_ids:
+                if schedule_id not in schedules:
+                    continue
+                entity = schedules.pop(schedule_id)
+                entity_registry.async_remove(entity.entity_id)
+                self.store.async_delete_schedule(schedule_id)
+                self.async_assign_tags_to_schedule(schedule_id, None)
+                removed.append(schedule_id)
+        for schedule_id in removed:
+            async_dispatcher_send(self.hass, const.EVENT_ITEM_REMOVED, schedule_id)
+        return removed
+
+    @callback
+    def async_plan_timers(self, schedule_ids: list = None):
+        """precompute the timers of all schedules (on startup) or of a changed batch"""
+        start = dt_util.utcnow()
+        if schedule_ids is None:
+            plans = self._timer_plans = plan_timers(self, self.store.schedules.values())
+        else:
+            plans = plan_timers(self, [self.store.schedules[x] for x in schedule_ids])
+            self._timer_plans.update(plans)
+        _LOGGER.debug(
+            "Planned timers of {} schedules in {:.3f}s".format(
+                len(plans),
+                (dt_util.utcnow() - start).total_seconds(),
+            )
+        )
+
+    @callback
+    def async_pop_timer_plan(self, schedule_id: str):
+        """take the precomputed timer of a schedule, if still up to date"""
+        plan = self._timer_plans.pop(schedule_id, None)
+        if plan is None or plan.entry is not self.store.schedules.get(schedule_id):
+            return None
+        return plan
+
+    async def async_set_spread(self, spread: int):
+        """change the default spread of the fire times, restarts the timers"""
+        if spread == self.spread:
+            return
+        self.spread = spread
+        for entity in self.hass.data[const.DOMAIN]["schedules"].values():
+            await entity.async_restart_timer()
+
+    @callback
+    def async_queue_timer_finished(self, schedule_id: str):
+        """collect the schedules of which the timer finished in the current batch"""
+        self._finished_timers.append(schedule_id)
+
+    async def async_process_finished_timers(self):
+        """notify the schedules of which the timer finished together"""
+        if not self._finished_timers:
+            return
+        schedule_ids = self._finished_timers
+        self._finished_timers = []
+
+        async_dispatcher_send(self.hass, const.EVENT_TIMER_FINISHED, schedule_ids)
+        entities = self.hass.data[const.DOMAIN]["schedules"]
+        old_states = {
+            schedule_id: entities[schedule_id].state
+            for schedule_id in schedule_ids
+            if schedule_id in entities
+        }
+        await asyncio.gather(
+            *[
+                entities[schedule_id].async_timer_finished()
+                for schedule_id in old_states
+            ]
+        )
+        self.change_feed.async_timers_finished(old_states)
+
+    @callback
+    def async_queue_entity_update(self, entity, force: bool = False):
+        """write the state of an entity and notify the frontend, coalesced"""
+        self.requested_updates += 1
+        if entity.schedule_id in self._pending_updates:
+            force = force or self._pending_updates[entity.schedule_id][1]
+        self._pending_updates[entity.schedule_id] = (entity, force)
+        if self._update_timer is None:
+            self._update_timer = self.hass.loop.call_later(
+                self.update_delay, self.async_flush_entity_updates
+            )
+
+    @callback
+    def async_flush_entity_updates(self):
+        """write the pending entity states and fire a single scheduler_updated event"""
+        self._update_timer = None
+        pending = self._pending_updates
+        self._pending_updates = {}
+
+        entities = self.hass.data[const.DOMAIN]["schedules"]
+        schedule_ids = []
+        for (schedule_id, (entity, force)) in pending.items():
+            if entities.get(schedule_id) is not entity:
+                # entity was removed in the meantime
+                continue
+            if entity.async_write_state_if_changed():
+                self.state_writes += 1
+            else:
+                self.skipped_state_writes += 1
+                if not force:
+                    continue
+            schedule_ids.append(schedule_id)
+
+        if schedule_ids:
+            self.update_events += 1
+            self.hass.bus.async_fire(
+                const.EVENT, {const.ATTR_SCHEDULE_IDS: schedule_ids}
+            )
 
     async def _async_update_data(self):
         """Update data via library."""
@@ -343,6 +724,14 @@ class SchedulerCoordinator(DataUpdateCoordinator):
         if self._workday_tracker:
             self._workday_tracker()
             self._workday_tracker = None
+        if self._update_timer:
+            self._update_timer.cancel()
+            self._update_timer = None
+        self.handles.async_release_all()
+        self.trigger_engine.async_unload()
+        self.sun_tracker.async_stop()
+        self.sun_ephemeris.async_stop()
+        self.change_feed.async_stop()
         self.stopped = True
 
     async def async_delete_config(self):
@@ -355,46 +744,21 @@ class SchedulerCoordinator(DataUpdateCoordinator):
 
     def async_get_tags_for_schedule(self, schedule_id: str):
         """fetch a list of tags for a schedule"""
-        tags = self.async_get_tags()
-        result = filter(lambda el: schedule_id in el[const.ATTR_SCHEDULES], tags)
-        result = list(map(lambda x: x[ATTR_NAME], result))
-        result = sorted(result)
-        return result
+        return sorted(self.store.async_get_tags_for_schedule(schedule_id))
 
     def async_assign_tags_to_schedule(self, schedule_id: str, new_tags: list):
         if not new_tags:
             new_tags = []
-        old_tags = self.async_get_tags_for_schedule(schedule_id)
+        old_tags = self.store.async_get_tags_for_schedule(schedule_id)
         for tag_name in old_tags:
             if tag_name not in new_tags:
                 # remove old tag
-                el = self.store.async_get_tag(tag_name)
-                if len(el[const.ATTR_SCHEDULES]) > 1:
-                    self.store.async_update_tag(
-                        tag_name,
-                        {
-                            const.ATTR_SCHEDULES: [
-                                x for x in el[const.ATTR_SCHEDULES] if x != schedule_id
-                            ]
-                        },
-                    )
-                else:
-                    self.store.async_delete_tag(tag_name)
-            else:
-                new_tags.remove(tag_name)
+                self.store.async_remove_schedule_from_tag(tag_name, schedule_id)
 
         for tag_name in new_tags:
-            # assign new tag
-            el = self.store.async_get_tag(tag_name)
-            if el:
-                self.store.async_update_tag(
-                    tag_name,
-                    {const.ATTR_SCHEDULES: el[const.ATTR_SCHEDULES] + [schedule_id]},
-                )
-            else:
-                self.store.async_create_tag(
-                    {ATTR_NAME: tag_name, const.ATTR_SCHEDULES: [schedule_id]}
-                )
+            if tag_name not in old_tags:
+                # assign new tag
+                self.store.async_add_schedule_to_tag(tag_name, schedule_id)
 
     async def async_reset_workday_timer(self):
         """the workday polling timer has finished"""
@@ -404,7 +768,7 @@ class SchedulerCoordinator(DataUpdateCoordinator):
             """perform daily polling of the workday entity"""
             _LOGGER.debug("Performing daily update of workday sensor")
             await self.async_reset_workday_timer()
-            async_dispatcher_send(self.hass, const.EVENT_WORKDAY_SENSOR_UPDATED)
+            self.async_workday_calendar_updated()
 
         now = dt_util.as_local(dt_util.utcnow())
         ts = dt_util.find_next_time_expression_time(
@@ -437,43 +801,160 @@ class SchedulerCoordinator(DataUpdateCoordinator):
             """the workday sensor has been updated"""
             _LOGGER.debug("Workday sensor has updated")
             await self.async_reset_workday_timer()
-            async_dispatcher_send(self.hass, const.EVENT_WORKDAY_SENSOR_UPDATED)
+            self.async_workday_calendar_updated()
 
         self._workday_tracker = async_track_state_change_event(
             self.hass, const.WORKDAY_ENTITY, async_workday_state_updated
         )
         await self.async_reset_workday_timer()
+        self.async_workday_calendar_updated()
 
-    async def async_enable_all_schedules(self):
-        """enables all schedules"""
-        for schedule in self.hass.data[const.DOMAIN]["schedules"].values():
-            await schedule.async_turn_on()
+    @callback
+    def async_update_workday_calendar(self) -> bool:
+        """rebuild the workday calendar from the workday sensor, True if changed"""
+        workday_sensor = self.hass.states.get(const.WORKDAY_ENTITY)
+
+        calendar = WorkdayCalendar(version=self.workday_calendar.version + 1)
+        if workday_sensor and const.ATTR_WORKDAYS in workday_sensor.attributes:
+            # workday sensor defines a list of workdays
+            calendar = attr.evolve(
+                calendar,
+                workday_mask=weekday_mask(
+                    workday_sensor.attributes[const.ATTR_WORKDAYS]
+                ),
+            )
+        if workday_sensor and workday_sensor.state in [STATE_ON, STATE_OFF]:
+            # state of workday sensor is used for evaluating workday vs weekend
+            calendar = attr.evolve(
+                calendar,
+                today=dt_util.as_local(dt_util.utcnow()).date(),
+                today_is_workday=workday_sensor.state == STATE_ON,
+            )
 
-    async def async_disable_all_schedules(self):
-        """disables all schedules"""
-        for schedule in self.hass.data[const.DOMAIN]["schedules"].values():
-            await schedule.async_turn_off()
+        if calendar.same_days(self.workday_calendar):
+            return False
+        self.workday_calendar = calendar
+        return True
 
-    async def async_reload_storage(self):
-        """Reload scheduler storage from disk."""
+    @callback
+    def async_workday_calendar_updated(self):
+        """notify the schedules if the workday calendar has changed"""
+        if not self.async_update_workday_calendar():
+            return
+        _LOGGER.debug(
+            "Workday calendar has changed (version {})".format(
+                self.workday_calendar.version
+            )
+        )
+        async_dispatcher_send(
+            self.hass,
+            const.EVENT_WORKDAY_SENSOR_UPDATED,
+            self.workday_calendar.version,
+        )
+
+    async def async_enable_all_schedules(
+        self, schedule_ids: list = None, tags: list = None
+    ):
+        """enables all schedules (optionally only the given ones and/or tags)"""
+        return await self.async_set_schedules_enabled(True, schedule_ids, tags)
+
+    async def async_disable_all_schedules(
+        self, schedule_ids: list = None, tags: list = None
+    ):
+        """disables all schedules (optionally only the given ones and/or tags)"""
+        return await self.async_set_schedules_enabled(False, schedule_ids, tags)
+
+    async def async_set_schedules_enabled(
+        self, enabled: bool, schedule_ids: list = None, tags: list = None
+    ) -> list:
+        """enable or disable many schedules in one batch, returns the changed IDs"""
+        entities = self.hass.data[const.DOMAIN]["schedules"]
+        if schedule_ids is None:
+            schedule_ids = list(entities)
+        if tags:
+            tagged = set()
+            for tag in tags:
+                tagged.update(self.store.async_get_schedules_with_tag(tag))
+            schedule_ids = [x for x in schedule_ids if x in tagged]
+        schedule_ids = [
+            x
+            for x in schedule_ids
+            if x in entities and self.store.schedules[x].enabled != enabled
+        ]
+        if not enabled:
+            await asyncio.gather(
+                *[
+                    entities[schedule_id].async_empty_action_queue()
+                    for schedule_id in schedule_ids
+                ]
+            )
+        return self.async_edit_schedules(
+            {x: {const.ATTR_ENABLED: enabled} for x in schedule_ids}
+        )
+
+    async def async_reload_storage(self) -> dict:
+        """Reload scheduler storage from disk, only updating changed schedules."""
         _LOGGER.info("Reloading scheduler storage from disk")
+        start = dt_util.utcnow()
 
-        # Clear existing schedules to prevent duplicates
-        entity_registry = get_entity_registry(self.hass)
-        existing_schedules = list(self.hass.data[const.DOMAIN]["schedules"].keys())
-        for schedule_id in existing_schedules:
-            entity = self.hass.data[const.DOMAIN]["schedules"][schedule_id]
-            entity_registry.async_remove(entity.entity_id)
-            self.hass.data[const.DOMAIN]["schedules"].pop(schedule_id, None)
-            async_dispatcher_send(self.hass, const.EVENT_ITEM_REMOVED, schedule_id)
+        old_entries = self.store.schedules
+        old_tags = {
+            schedule_id: self.store.async_get_tags_for_schedule(schedule_id)
+            for schedule_id in old_entries
+        }
 
         # Reload storage data
         await self.store.async_load()
+        new_entries = self.store.schedules
 
-        # Recreate entities from reloaded data
-        for entry in self.store.schedules.values():
-            async_dispatcher_send(self.hass, const.EVENT_ITEM_CREATED, entry)
+        entities = self.hass.data[const.DOMAIN]["schedules"]
+        entity_registry = get_entity_registry(self.hass)
+        created = []
+        updated = []
+        renamed = 0
+        unchanged = 0
+        for (schedule_id, entry) in new_entries.items():
+            old = old_entries.get(schedule_id)
+            if schedule_id not in entities:
+                created.append(entry)
+            elif old is None or old.name != entry.name:
+                # the entity ID follows from the name, the entity must be recreated
+                entity = entities.pop(schedule_id)
+                entity_registry.async_remove(entity.entity_id)
+                created.append(entry)
+                renamed += 1
+            elif old != entry or old_tags[
+                schedule_id
+            ] != self.store.async_get_tags_for_schedule(schedule_id):
+                updated.append(schedule_id)
+            else:
+                unchanged += 1
 
-        _LOGGER.info("Scheduler storage reloaded successfully")
+        removed = [x for x in entities if x not in new_entries]
+        for schedule_id in removed:
+            entity = entities.pop(schedule_id)
+            entity_registry.async_remove(entity.entity_id)
+            async_dispatcher_send(self.hass, const.EVENT_ITEM_REMOVED, schedule_id)
+
+        self.async_propagate_changes(updated, created)
+
+        result = {
+            const.ATTR_ADDED: len(created) - renamed,
+            const.ATTR_CHANGED: len(updated) + renamed,
+            const.ATTR_REMOVED: len(removed),
+            const.ATTR_UNCHANGED: unchanged,
+            const.ATTR_DURATION: (dt_util.utcnow() - start).total_seconds(),
+        }
+        _LOGGER.info(
+            "Scheduler storage reloaded successfully: "
+            "{} added, {} changed, {} removed, {} unchanged in {:.3f}s".format(
+                result[const.ATTR_ADDED],
+                result[const.ATTR_CHANGED],
+                result[const.ATTR_REMOVED],
+                result[const.ATTR_UNCHANGED],
+                result[const.ATTR_DURATION],
+            )
+        )
         # Notify listeners that storage has been reloaded
         async_dispatcher_send(self.hass, const.EVENT_STARTED)
+        return result
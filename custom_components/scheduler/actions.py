@@ -38,6 +38,12 @@ from homeassistant.helpers.dispatcher import (
 )
 
 from . import const
+from .handles import (
+    HANDLE_LISTENER,
+    HANDLE_STATE_TRACKER,
+    HANDLE_TIMER,
+    HandleScope,
+)
 from .store import ScheduleEntry
 
 _LOGGER = logging.getLogger(__name__)
@@ -227,15 +233,21 @@ def action_has_effect(action: dict, hass: HomeAssistant):
 
 
 class ActionHandler:
-    def __init__(self, hass: HomeAssistant, schedule_id: str):
+    def __init__(self, hass: HomeAssistant, schedule_id: str, handles: HandleScope):
         """init"""
         self.hass = hass
         self._queues = {}
         self._timer = None
+        self._handles = handles
         self.id = schedule_id
 
-        async_dispatcher_connect(
-            self.hass, "action_queue_finished", self.async_cleanup_queues
+        self._queue_listener = self._handles.async_track(
+            HANDLE_LISTENER,
+            async_dispatcher_connect(
+                self.hass,
+                const.schedule_signal(const.EVENT_ACTION_QUEUE_FINISHED, schedule_id),
+                self.async_cleanup_queues,
+            ),
         )
 
     async def async_queue_actions(self, data: ScheduleEntry, skip_initial_execution = False):
@@ -253,7 +265,12 @@ class ActionHandler:
 
             if entity not in self._queues:
                 self._queues[entity] = ActionQueue(
-                    self.hass, self.id, conditions, condition_type, track_conditions
+                    self.hass,
+                    self.id,
+                    self._handles,
+                    conditions,
+                    condition_type,
+                    track_conditions,
                 )
 
             self._queues[entity].add_action(action)
@@ -263,7 +280,7 @@ class ActionHandler:
 
     async def async_cleanup_queues(self, id: str = None):
         """remove all objects from queue which have no remaining tasks"""
-        if id is not None and id != self.id or not len(self._queues.keys()):
+        if not len(self._queues.keys()):
             return
 
         # remove all items which are either finished executing
@@ -304,18 +321,27 @@ class ActionHandler:
                     restore_time
                 )
             )
-            self._timer = async_call_later(
-                self.hass, restore_time * 60, async_clear_queue
+            self._timer = self._handles.async_track(
+                HANDLE_TIMER,
+                async_call_later(self.hass, restore_time * 60, async_clear_queue),
             )
         else:
             await async_clear_queue()
 
+    async def async_unload(self):
+        """remove all objects from queue and stop listening for finished queues"""
+        await self.async_empty_queue()
+        if self._queue_listener:
+            self._queue_listener()
+            self._queue_listener = None
+
 
 class ActionQueue:
     def __init__(
         self,
         hass: HomeAssistant,
         id: str,
+        handles: HandleScope,
         conditions: list,
         condition_type: str,
         track_conditions: bool,
@@ -323,6 +349,7 @@ class ActionQueue:
         """create a new action queue"""
         self.hass = hass
         self.id = id
+        self._handles = handles
         self._timer = None
         self._action_entities = []
         self._condition_entities = []
@@ -399,8 +426,11 @@ class ActionQueue:
         watched_entities = list(set(self._condition_entities + self._action_entities))
         if len(watched_entities):
             self._listeners.append(
-                async_track_state_change_event(
-                    self.hass, watched_entities, async_entity_changed
+                self._handles.async_track(
+                    HANDLE_STATE_TRACKER,
+                    async_track_state_change_event(
+                        self.hass, watched_entities, async_entity_changed
+                    ),
                 )
             )
 
@@ -411,8 +441,11 @@ class ActionQueue:
             # trigger the queue once when HA has restarted
             if self.hass.state != CoreState.running:
                 self._listeners.append(
-                    async_dispatcher_connect(
-                        self.hass, const.EVENT_STARTED, self.async_process_queue
+                    self._handles.async_track(
+                        HANDLE_LISTENER,
+                        async_dispatcher_connect(
+                            self.hass, const.EVENT_STARTED, self.async_process_queue
+                        ),
                     )
                 )
         else:
@@ -539,6 +572,8 @@ class ActionQueue:
 
                 @callback
                 async def async_timer_finished(_now):
+                    if self._timer:
+                        self._timer()
                     self._timer = None
                     if self._state_update_listener:
                         self._state_update_listener()
@@ -546,10 +581,13 @@ class ActionQueue:
                     self.queue_busy = False
                     await self.async_process_queue(task_idx + 1)
 
-                self._timer = async_call_later(
-                    self.hass,
-                    task[CONF_SERVICE_DATA][CONF_DELAY],
-                    async_timer_finished,
+                self._timer = self._handles.async_track(
+                    HANDLE_TIMER,
+                    async_call_later(
+                        self.hass,
+                        task[CONF_SERVICE_DATA][CONF_DELAY],
+                        async_timer_finished,
+                    ),
                 )
                 _LOGGER.debug(
                     "[{}]: Postponing next task for {} seconds".format(
@@ -590,8 +628,11 @@ class ActionQueue:
                         await self.async_process_queue(task_idx + 1)
 
                 if task[CONF_ACTION] == ACTION_WAIT_STATE_CHANGE:
-                    self._state_update_listener = async_track_state_change_event(
-                        self.hass, task[ATTR_ENTITY_ID], async_entity_changed
+                    self._state_update_listener = self._handles.async_track(
+                        HANDLE_STATE_TRACKER,
+                        async_track_state_change_event(
+                            self.hass, task[ATTR_ENTITY_ID], async_entity_changed
+                        ),
                     )
                 return
 
@@ -622,7 +663,11 @@ class ActionQueue:
             while len(self._queue):
                 self._queue.pop()
 
-            async_dispatcher_send(self.hass, "action_queue_finished", self.id)
+            async_dispatcher_send(
+                self.hass,
+                const.schedule_signal(const.EVENT_ACTION_QUEUE_FINISHED, self.id),
+                self.id,
+            )
         else:
             _LOGGER.debug(
                 "[{}]: Done for now, Waiting for conditions to change".format(self.id)
@@ -1,7 +1,10 @@
 """Config flow for the Scheduler component."""
 import secrets
 
+import voluptuous as vol
 from homeassistant import config_entries
+from homeassistant.core import callback
+
 from . import const
 
 
@@ -24,3 +27,45 @@ class SchedulerConfigFlow(config_entries.ConfigFlow, domain=const.DOMAIN):
         self._abort_if_unique_id_configured(updates=user_input)
 
         return self.async_create_entry(title="Scheduler", data={})
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Get the options flow for this handler."""
+        return SchedulerOptionsFlow()
+
+
+class SchedulerOptionsFlow(config_entries.OptionsFlow):
+    """Options flow for Scheduler."""
+
+    async def async_step_init(self, user_input=None):
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        const.ATTR_SPREAD,
+                        default=self.config_entry.options.get(const.ATTR_SPREAD, 0),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=const.SPREAD_MAX)),
+                    vol.Optional(
+                        const.CONF_JOURNAL,
+                        default=self.config_entry.options.get(
+                            const.CONF_JOURNAL, False
+                        ),
+                    ): bool,
+                    vol.Optional(
+                        const.CONF_UPDATE_DELAY,
+                        default=self.config_entry.options.get(
+                            const.CONF_UPDATE_DELAY, 0
+                        ),
+                    ): vol.All(
+                        vol.Coerce(float),
+                        vol.Range(min=0, max=const.UPDATE_DELAY_MAX),
+                    ),
+                }
+            ),
+        )
@@ -26,6 +26,7 @@ DAY_TYPE_WORKDAY = "workday"
 DAY_TYPE_WEEKEND = "weekend"
 
 WORKDAY_ENTITY = "binary_sensor.workday_sensor"
+ATTR_WORKDAYS = "workdays"
 
 ATTR_SKIP_CONDITIONS = "skip_conditions"
 ATTR_CONDITION_TYPE = "condition_type"
@@ -54,6 +55,9 @@ SERVICE_COPY = "copy"
 SERVICE_DISABLE_ALL = "disable_all"
 SERVICE_ENABLE_ALL = "enable_all"
 SERVICE_RELOAD_STORAGE = "reload_storage"
+SERVICE_ADD_MANY = "add_many"
+SERVICE_EDIT_MANY = "edit_many"
+SERVICE_REMOVE_MANY = "remove_many"
 
 OffsetTimePattern = re.compile(r"^([a-z]+)([-|\+]{1})([0-9:]+)$")
 DatePattern = re.compile(r"^[0-9]+\-[0-9]+\-[0-9]+$")
@@ -70,20 +74,86 @@ ATTR_TAGS = "tags"
 ATTR_SCHEDULES = "schedules"
 ATTR_START_DATE = "start_date"
 ATTR_END_DATE = "end_date"
+ATTR_SPREAD = "spread"
+ATTR_SCHEDULE_IDS = "schedule_ids"
+ATTR_DURATION = "duration"
+ATTR_ADDED = "added"
+ATTR_CHANGED = "changed"
+ATTR_REMOVED = "removed"
+ATTR_UNCHANGED = "unchanged"
+ATTR_OFFSET = "offset"
+ATTR_LIMIT = "limit"
+ATTR_CURSOR = "cursor"
+ATTR_FIELDS = "fields"
+ATTR_TOTAL = "total"
+ATTR_NEXT_CURSOR = "next_cursor"
+ATTR_STATE = "state"
+ATTR_NEXT_TRIGGER = "next_trigger"
+ATTR_NEXT_ENTRIES = "next_entries"
+ATTR_TIMESTAMPS = "timestamps"
+ATTR_REVISION = "revision"
+ATTR_DATA = "data"
+ATTR_DELTAS = "deltas"
+ATTR_OLD_STATE = "old_state"
+ATTR_NEW_STATE = "new_state"
+ATTR_BATCH_INTERVAL = "batch_interval"
+ATTR_BATCH_SIZE = "batch_size"
+ATTR_EVENTS = "events"
+ATTR_FIRST_REVISION = "first_revision"
 
+# fire times are spread within +/- this many seconds at most
+SPREAD_MAX = 30
+
+CONF_JOURNAL = "journal"
+CONF_UPDATE_DELAY = "update_delay"
+# entity updates are coalesced during this many seconds at most
+UPDATE_DELAY_MAX = 10
+# events for websocket subscribers are batched during this many seconds at most
+BATCH_INTERVAL_MAX = 60
+BATCH_SIZE_DEFAULT = 100
+
+# dispatched with the list of schedule IDs of which the timers finished together
 EVENT_TIMER_FINISHED = "scheduler_timer_finished"
 EVENT_TIMER_UPDATED = "scheduler_timer_updated"
 EVENT_ITEM_UPDATED = "scheduler_item_updated"
 EVENT_ITEM_CREATED = "scheduler_item_created"
+EVENT_ITEMS_CREATED = "scheduler_items_created"
 EVENT_ITEM_REMOVED = "scheduler_item_removed"
 EVENT_STARTED = "scheduler_started"
 EVENT_WORKDAY_SENSOR_UPDATED = "workday_sensor_updated"
+EVENT_ACTION_QUEUE_FINISHED = "scheduler_action_queue_finished"
+EVENT_CHANGE = "scheduler_change"
+EVENT_BATCH = "scheduler_batch"
+
+# fields of a schedule which can be requested in the websocket list
+SCHEDULE_FIELDS = [
+    ATTR_SCHEDULE_ID,
+    ATTR_WEEKDAYS,
+    ATTR_START_DATE,
+    ATTR_END_DATE,
+    ATTR_TIMESLOTS,
+    ATTR_REPEAT_TYPE,
+    ATTR_NAME,
+    ATTR_ENABLED,
+    ATTR_SPREAD,
+    ATTR_NEXT_ENTRIES,
+    ATTR_TIMESTAMPS,
+    ATTR_ENTITY_ID,
+    ATTR_TAGS,
+    ATTR_STATE,
+    ATTR_NEXT_TRIGGER,
+]
 
 STATE_INIT = "init"
 STATE_READY = "ready"
 STATE_COMPLETED = "completed"
 
 
+def schedule_signal(event: str, schedule_id: str) -> str:
+    """name of the dispatcher signal which is only sent for a single schedule"""
+    return "{}_{}".format(event, schedule_id)
+
+
 def validate_time(time):
     res = OffsetTimePattern.match(time)
     if not res:
@@ -113,6 +183,10 @@ def validate_date(value: str) -> str:
         return date.strftime("%Y-%m-%d")
 
 
+SPREAD_SCHEMA = vol.Any(
+    None, vol.All(vol.Coerce(int), vol.Range(min=0, max=SPREAD_MAX))
+)
+
 CONDITION_SCHEMA = vol.Schema(
     {
         vol.Required(ATTR_ENTITY_ID): cv.entity_id,
@@ -171,6 +245,7 @@ ADD_SCHEDULE_SCHEMA = vol.Schema(
         ),
         vol.Optional(ATTR_START_DATE, default=None): validate_date,
         vol.Optional(ATTR_END_DATE, default=None): validate_date,
+        vol.Optional(ATTR_SPREAD, default=None): SPREAD_SCHEMA,
         vol.Required(ATTR_TIMESLOTS): vol.All(
             cv.ensure_list, vol.Length(min=1), [TIMESLOT_SCHEMA]
         ),
@@ -205,6 +280,7 @@ EDIT_SCHEDULE_SCHEMA = vol.Schema(
         ),
         vol.Optional(ATTR_START_DATE, default=None): validate_date,
         vol.Optional(ATTR_END_DATE, default=None): validate_date,
+        vol.Optional(ATTR_SPREAD): SPREAD_SCHEMA,
         vol.Optional(ATTR_TIMESLOTS): vol.All(
             cv.ensure_list, vol.Length(min=1), [TIMESLOT_SCHEMA]
         ),
@@ -219,3 +295,18 @@ EDIT_SCHEDULE_SCHEMA = vol.Schema(
         vol.Optional(ATTR_TAGS): vol.All(cv.ensure_list, vol.Unique(), [cv.string]),
     }
 )
+
+ADD_MANY_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_SCHEDULES): vol.All(
+            cv.ensure_list, vol.Length(min=1), [ADD_SCHEDULE_SCHEMA]
+        ),
+    }
+)
+
+ENABLE_ALL_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+        vol.Optional(ATTR_TAGS): vol.All(cv.ensure_list, [cv.string]),
+    }
+)
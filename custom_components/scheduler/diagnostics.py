@@ -0,0 +1,52 @@
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from . import const
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict:
+    """Return diagnostics for the scheduler config entry."""
+    coordinator = hass.data[const.DOMAIN]["coordinator"]
+    handles = coordinator.handles
+    trigger_engine = coordinator.trigger_engine
+    sun_tracker = coordinator.sun_tracker
+    store = coordinator.store
+
+    return {
+        "schedules": len(hass.data[const.DOMAIN]["schedules"]),
+        "storage": {
+            "journal_enabled": store.journal_enabled,
+            "journal_size": store.journal.size,
+            "journal_bytes_written": store.journal.bytes_written,
+            "journal_records_written": store.journal.records_written,
+            "compactions": store.compactions,
+        },
+        "entity_updates": {
+            "requested": coordinator.requested_updates,
+            "state_writes": coordinator.state_writes,
+            "skipped_state_writes": coordinator.skipped_state_writes,
+            "events": coordinator.update_events,
+        },
+        "handles": {
+            "active": handles.active_handles,
+            "registered": handles.registered_count,
+            "released": handles.released_count,
+            "leaked": handles.leaked_count,
+            "schedules": handles.async_get_counts(),
+        },
+        "trigger_engine": {
+            "active_triggers": trigger_engine.active_triggers,
+            "active_timers": trigger_engine.active_timers,
+            "batch_count": trigger_engine.batch_count,
+            "last_batch_size": trigger_engine.last_batch_size,
+            "largest_batch_size": trigger_engine.largest_batch_size,
+            "last_batch_duration": trigger_engine.last_batch_duration,
+            "longest_batch_duration": trigger_engine.longest_batch_duration,
+        },
+        "sun_tracker": {
+            "propagated_updates": sun_tracker.propagated_updates,
+            "suppressed_updates": sun_tracker.suppressed_updates,
+        },
+    }
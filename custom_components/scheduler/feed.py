@@ -0,0 +1,339 @@
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import (
+    async_dispatcher_connect,
+    async_dispatcher_send,
+)
+from homeassistant.helpers.event import async_call_later
+
+from . import const
+
+_LOGGER = logging.getLogger(__name__)
+
+# events of which only the latest one per schedule needs to be passed
+COALESCED_EVENTS = [
+    const.EVENT_ITEM_UPDATED,
+    const.EVENT_TIMER_UPDATED,
+    const.EVENT_TIMER_FINISHED,
+]
+
+
+class ChangeFeed:
+    """Numbered changes of the schedules, carrying the data which changed.
+
+    The data of each change is built once and passed to all websocket
+    connections which subscribed to it. Every change increases the revision,
+    such that a client can detect a gap and fetch the full list again.
+    The feed only runs while there are subscribers.
+    """
+
+    def __init__(self, hass: HomeAssistant, coordinator):
+        """init"""
+        self.hass = hass
+        self.coordinator = coordinator
+        self.revision = 0
+        self._configs = {}
+        self._listeners = []
+        self._subscribers = 0
+
+    @callback
+    def async_subscribe(self, handler):
+        """pass the changes to a handler, returns a callback which unsubscribes"""
+        if not self._subscribers:
+            self.async_start()
+        self._subscribers += 1
+        unsub = async_dispatcher_connect(self.hass, const.EVENT_CHANGE, handler)
+
+        @callback
+        def async_unsubscribe():
+            """stop passing the changes, the feed stops with the last subscriber"""
+            unsub()
+            self._subscribers -= 1
+            if not self._subscribers:
+                self.async_stop()
+
+        return async_unsubscribe
+
+    @callback
+    def async_start(self):
+        """listen to the changes of the schedules"""
+        for (signal, handler) in [
+            (const.EVENT_ITEMS_CREATED, self.async_items_created),
+            (const.EVENT_ITEM_UPDATED, self.async_item_updated),
+            (const.EVENT_ITEM_REMOVED, self.async_item_removed),
+            (const.EVENT_TIMER_UPDATED, self.async_timer_updated),
+        ]:
+            self._listeners.append(async_dispatcher_connect(self.hass, signal, handler))
+
+    @callback
+    def async_stop(self):
+        """stop listening to the changes of the schedules"""
+        while len(self._listeners):
+            self._listeners.pop()()
+        self._configs = {}
+
+    @callback
+    def _async_publish(self, event: str, schedule_id: str, data: dict = None):
+        """pass a change to the subscribed connections"""
+        self.revision += 1
+        change = {
+            "event": event,
+            const.ATTR_SCHEDULE_ID: schedule_id,
+            const.ATTR_REVISION: self.revision,
+        }
+        if data is not None:
+            change[const.ATTR_DATA] = data
+        async_dispatcher_send(self.hass, const.EVENT_CHANGE, change)
+
+    @callback
+    def _async_get_config(self, schedule_id: str):
+        """the stored data and the tags of a schedule"""
+        return (
+            self.coordinator.store.async_get_schedule_data(schedule_id),
+            self.coordinator.async_get_tags_for_schedule(schedule_id),
+        )
+
+    @callback
+    def async_items_created(self, entries: list):
+        """a batch of schedules was created, pass their complete configs"""
+        for entry in entries:
+            (config, tags) = self._configs[entry.schedule_id] = self._async_get_config(
+                entry.schedule_id
+            )
+            self._async_publish(
+                const.EVENT_ITEM_CREATED,
+                entry.schedule_id,
+                dict(config, **{const.ATTR_TAGS: tags}),
+            )
+
+    @callback
+    def async_item_updated(self, schedule_id: str):
+        """a schedule was changed, pass the fields of its config which differ"""
+        old = self._configs.get(schedule_id)
+        (config, tags) = self._configs[schedule_id] = self._async_get_config(
+            schedule_id
+        )
+        if config is None:
+            return
+        if old is None or old[0] is None:
+            data = dict(config, **{const.ATTR_TAGS: tags})
+        else:
+            data = {
+                key: value
+                for (key, value) in config.items()
+                if old[0].get(key) != value
+            }
+            if tags != old[1]:
+                data[const.ATTR_TAGS] = tags
+        self._async_publish(const.EVENT_ITEM_UPDATED, schedule_id, data)
+
+    @callback
+    def async_item_removed(self, schedule_id: str):
+        """a schedule was removed"""
+        self._configs.pop(schedule_id, None)
+        self._async_publish(const.EVENT_ITEM_REMOVED, schedule_id)
+
+    @callback
+    def async_timer_updated(self, schedule_id: str):
+        """the timer of a schedule was recalculated, pass the upcoming timeslots"""
+        entity = self.hass.data[const.DOMAIN]["schedules"].get(schedule_id)
+        self._async_publish(
+            const.EVENT_TIMER_UPDATED,
+            schedule_id,
+            entity.async_get_timer_state() if entity else None,
+        )
+
+    @callback
+    def async_timers_finished(self, old_states: dict):
+        """the timers of schedules finished, pass the resulting state transitions"""
+        if not self._listeners:
+            return
+        entities = self.hass.data[const.DOMAIN]["schedules"]
+        for (schedule_id, old_state) in old_states.items():
+            entity = entities.get(schedule_id)
+            self._async_publish(
+                const.EVENT_TIMER_FINISHED,
+                schedule_id,
+                {
+                    const.ATTR_OLD_STATE: old_state,
+                    const.ATTR_NEW_STATE: entity.state if entity else None,
+                },
+            )
+
+
+class EventBuffer:
+    """Events for a websocket subscriber, which are sent together as a batch.
+
+    Repeated events of the same kind for a schedule are collapsed into the
+    latest one (merging the changed data), the buffer is flushed after the
+    interval or as soon as it holds the maximum number of events.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, connection, msg_id: int, interval: float, size: int
+    ):
+        """init"""
+        self.hass = hass
+        self.connection = connection
+        self.msg_id = msg_id
+        self.interval = interval
+        self.size = size
+        self._events = {}
+        self._count = 0
+        self._first_revision = None
+        self._last_revision = None
+        self._timer = None
+
+    @callback
+    def async_send_message(self, message: dict):
+        """add an event message to the buffer (replaces connection.send_message)"""
+        event = message["event"]
+        event_type = event["event"]
+        schedule_id = event.get(const.ATTR_SCHEDULE_ID)
+
+        if event_type in COALESCED_EVENTS:
+            key = (event_type, schedule_id)
+            # re-insert, such that the event keeps its place in the order of events
+            previous = self._events.pop(key, None)
+            if previous is not None and const.ATTR_DATA in event:
+                event = dict(
+                    event, **{const.ATTR_DATA: self._merge(event_type, previous, event)}
+                )
+        else:
+            if event_type == const.EVENT_ITEM_REMOVED:
+                for other_type in COALESCED_EVENTS:
+                    self._events.pop((other_type, schedule_id), None)
+            self._count += 1
+            key = self._count
+
+        if const.ATTR_REVISION in event:
+            if self._first_revision is None:
+                self._first_revision = event[const.ATTR_REVISION]
+            self._last_revision = event[const.ATTR_REVISION]
+        self._events[key] = event
+
+        if len(self._events) >= self.size:
+            self.async_flush()
+        elif self._timer is None:
+            self._timer = async_call_later(
+                self.hass, self.interval, self._async_flush_timer
+            )
+
+    @staticmethod
+    def _merge(event_type: str, previous: dict, event: dict):
+        """data of an event combined with that of the event it replaces"""
+        data = event[const.ATTR_DATA]
+        previous_data = previous.get(const.ATTR_DATA)
+        if not previous_data or not data:
+            return data
+        if event_type == const.EVENT_ITEM_UPDATED:
+            return dict(previous_data, **data)
+        if event_type == const.EVENT_TIMER_FINISHED:
+            return dict(
+                data, **{const.ATTR_OLD_STATE: previous_data[const.ATTR_OLD_STATE]}
+            )
+        return data
+
+    @callback
+    def _async_flush_timer(self, _now):
+        """flush the buffer after the interval"""
+        self._timer = None
+        self.async_flush()
+
+    @callback
+    def async_flush(self):
+        """send the buffered events as a single message"""
+        if self._timer is not None:
+            self._timer()
+            self._timer = None
+        if not self._events:
+            return
+        events = list(self._events.values())
+        self._events = {}
+        batch = {
+            "event": const.EVENT_BATCH,
+            const.ATTR_EVENTS: events,
+        }
+        if self._first_revision is not None:
+            batch[const.ATTR_FIRST_REVISION] = self._first_revision
+            batch[const.ATTR_REVISION] = self._last_revision
+            self._first_revision = None
+        self.connection.send_message(
+            {"id": self.msg_id, "type": "event", "event": batch}
+        )
+
+    @callback
+    def async_cancel(self):
+        """drop the buffered events when the subscription ends"""
+        if self._timer is not None:
+            self._timer()
+            self._timer = None
+        self._events = {}
+
+
+class EventFilter:
+    """Passes only the events of the schedules a websocket subscriber asked for.
+
+    A schedule matches when its ID is given or when it has one of the given
+    tags, which is checked on the tag index of the store when the event
+    occurs. A schedule which stops matching (after its tags are changed)
+    still gets this last event, such that the subscriber can drop it.
+    """
+
+    def __init__(self, coordinator, schedule_ids: list, tags: list, send_message):
+        """init"""
+        self.coordinator = coordinator
+        self.schedule_ids = set(schedule_ids or [])
+        self.tags = set(tags or [])
+        self._send_message = send_message
+        self._matched = set(self.schedule_ids)
+        for tag in self.tags:
+            self._matched.update(coordinator.store.async_get_schedules_with_tag(tag))
+
+    @callback
+    def _async_match(self, schedule_id: str) -> bool:
+        """whether a schedule is one of the requested schedules"""
+        if schedule_id in self.schedule_ids:
+            return True
+        if not self.tags:
+            return False
+        return not self.tags.isdisjoint(
+            self.coordinator.store.async_get_tags_for_schedule(schedule_id)
+        )
+
+    @callback
+    def async_rejects(self, event_type: str, schedule_id: str) -> bool:
+        """whether the event of a schedule is dropped, before its message is built"""
+        if schedule_id in self._matched:
+            return False
+        return event_type == const.EVENT_ITEM_REMOVED or not self._async_match(
+            schedule_id
+        )
+
+    @callback
+    def async_send_message(self, message: dict):
+        """pass an event message if it concerns a requested schedule"""
+        event = message["event"]
+        schedule_id = event.get(const.ATTR_SCHEDULE_ID)
+
+        if event["event"] == const.EVENT_ITEM_REMOVED or not self._async_match(
+            schedule_id
+        ):
+            if schedule_id not in self._matched:
+                return
+            self._matched.discard(schedule_id)
+        elif schedule_id not in self._matched:
+            self._matched.add(schedule_id)
+            if event["event"] == const.EVENT_ITEM_UPDATED and const.ATTR_DATA in event:
+                # the subscriber did not know the schedule yet, pass its complete config
+                data = dict(
+                    self.coordinator.store.async_get_schedule_data(schedule_id),
+                    **{
+                        const.ATTR_TAGS: self.coordinator.async_get_tags_for_schedule(
+                            schedule_id
+                        )
+                    },
+                )
+                message = dict(message, event=dict(event, **{const.ATTR_DATA: data}))
+        self._send_message(message)
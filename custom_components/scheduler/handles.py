@@ -0,0 +1,125 @@
+import logging
+
+from homeassistant.core import callback
+
+_LOGGER = logging.getLogger(__name__)
+
+HANDLE_LISTENER = "listener"
+HANDLE_TIMER = "timer"
+HANDLE_STATE_TRACKER = "state_tracker"
+
+HANDLE_TYPES = [HANDLE_LISTENER, HANDLE_TIMER, HANDLE_STATE_TRACKER]
+
+
+class HandleScope:
+    """Handles which are created for a single instance of a schedule entity.
+
+    The timer handler, action handler and action queues register the
+    unsubscribe callback of every listener, timer and state tracker they
+    create, anything that is left after unloading is released with the scope.
+    """
+
+    def __init__(self, registry, schedule_id: str):
+        """init"""
+        self._registry = registry
+        self._handles = {}
+        self.schedule_id = schedule_id
+
+    @callback
+    def async_track(self, handle_type: str, unsub):
+        """register an unsubscribe callback, returns a callback which releases it"""
+        handles = self._handles
+        registry = self._registry
+
+        @callback
+        def async_release():
+            """call the unsubscribe callback (only once)"""
+            if handles.pop(async_release, None) is None:
+                return
+            registry.released_count += 1
+            unsub()
+
+        handles[async_release] = handle_type
+        registry.registered_count += 1
+        return async_release
+
+    @callback
+    def async_release(self) -> int:
+        """release the handles which are left after unloading, returns their number"""
+        self._registry.async_remove_scope(self)
+        count = len(self._handles)
+        if count:
+            self._registry.leaked_count += count
+            _LOGGER.warning(
+                "Schedule {} has {} handles left after unloading: {}".format(
+                    self.schedule_id, count, self.async_get_counts()
+                )
+            )
+        for async_release in list(self._handles):
+            async_release()
+        return count
+
+    @callback
+    def async_get_counts(self) -> dict:
+        """number of active handles per type"""
+        counts = dict.fromkeys(HANDLE_TYPES, 0)
+        for handle_type in self._handles.values():
+            counts[handle_type] += 1
+        return counts
+
+    def __len__(self) -> int:
+        """number of active handles"""
+        return len(self._handles)
+
+
+class HandleRegistry:
+    """Registry of the handle scopes of all schedule entities."""
+
+    def __init__(self):
+        """init"""
+        self._scopes = {}
+
+        self.registered_count = 0
+        self.released_count = 0
+        self.leaked_count = 0
+
+    @callback
+    def async_create_scope(self, schedule_id: str) -> HandleScope:
+        """create a scope for a new instance of a schedule entity"""
+        scope = HandleScope(self, schedule_id)
+        self._scopes.setdefault(schedule_id, []).append(scope)
+        return scope
+
+    @callback
+    def async_remove_scope(self, scope: HandleScope):
+        """forget a scope that was released"""
+        scopes = self._scopes.get(scope.schedule_id, [])
+        if scope in scopes:
+            scopes.remove(scope)
+        if not scopes:
+            self._scopes.pop(scope.schedule_id, None)
+
+    @callback
+    def async_release_all(self):
+        """release the scopes of all schedules"""
+        for scopes in list(self._scopes.values()):
+            for scope in list(scopes):
+                scope.async_release()
+
+    @callback
+    def async_get_counts(self) -> dict:
+        """number of entity instances and active handles per schedule"""
+        result = {}
+        for (schedule_id, scopes) in self._scopes.items():
+            counts = dict.fromkeys(HANDLE_TYPES, 0)
+            for scope in scopes:
+                for (handle_type, count) in scope.async_get_counts().items():
+                    counts[handle_type] += count
+            counts["instances"] = len(scopes)
+            result[schedule_id] = counts
+        return result
+
+    @property
+    def active_handles(self) -> int:
+        """total number of active handles"""
+        return sum(len(scope) for scopes in self._scopes.values() for scope in scopes)
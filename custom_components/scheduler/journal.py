@@ -0,0 +1,98 @@
+import json
+import logging
+import os
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.json import JSONEncoder
+from homeassistant.helpers.storage import STORAGE_DIR
+
+_LOGGER = logging.getLogger(__name__)
+
+JOURNAL_OP = "op"
+JOURNAL_VERSION = "version"
+JOURNAL_KEY = "key"
+JOURNAL_DATA = "data"
+
+OP_SCHEDULE_UPDATED = "schedule_updated"
+OP_SCHEDULE_REMOVED = "schedule_removed"
+OP_TAG_UPDATED = "tag_updated"
+OP_TAG_REMOVED = "tag_removed"
+OP_TIME_SHUTDOWN = "time_shutdown"
+
+
+def read_journal(path: str) -> list:
+    """read the records of the journal file (runs in executor)"""
+    records = []
+    if not os.path.isfile(path):
+        return records
+    with open(path, encoding="utf-8") as file:
+        for (line_number, line) in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # the last line may be incomplete after a power failure
+                _LOGGER.warning(
+                    "Skipping invalid record on line {} of {}".format(line_number, path)
+                )
+    return records
+
+
+def append_journal(path: str, lines: str):
+    """append lines to the journal file and flush them to disk (runs in executor)"""
+    with open(path, "a", encoding="utf-8") as file:
+        file.write(lines)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def remove_journal(path: str):
+    """remove the journal file (runs in executor)"""
+    if os.path.isfile(path):
+        os.remove(path)
+
+
+class ScheduleJournal:
+    """Append-only log of the records which changed since the last snapshot.
+
+    Each line holds a single JSON record, the complete state of the changed
+    schedule or tag is stored such that records can safely be replayed more
+    than once.
+    """
+
+    def __init__(self, hass: HomeAssistant, key: str):
+        """init"""
+        self.hass = hass
+        self.path = hass.config.path(STORAGE_DIR, key)
+        self.size = 0
+
+        self.bytes_written = 0
+        self.records_written = 0
+
+    async def async_load(self) -> list:
+        """read all records of the journal"""
+        records = await self.hass.async_add_executor_job(read_journal, self.path)
+        self.size = await self.hass.async_add_executor_job(
+            lambda: os.path.getsize(self.path) if os.path.isfile(self.path) else 0
+        )
+        return records
+
+    async def async_append(self, records: list):
+        """write records to the end of the journal"""
+        if not records:
+            return
+        lines = "".join(
+            json.dumps(record, cls=JSONEncoder, separators=(",", ":")) + "\n"
+            for record in records
+        )
+        await self.hass.async_add_executor_job(append_journal, self.path, lines)
+        size = len(lines.encode("utf-8"))
+        self.size += size
+        self.bytes_written += size
+        self.records_written += len(records)
+
+    async def async_clear(self):
+        """remove the journal, after its records are stored in the snapshot"""
+        await self.hass.async_add_executor_job(remove_journal, self.path)
+        self.size = 0
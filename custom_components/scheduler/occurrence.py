@@ -0,0 +1,439 @@
+import bisect
+import datetime
+import itertools
+from operator import itemgetter
+
+import attr
+import homeassistant.util.dt as dt_util
+from homeassistant.const import WEEKDAYS
+
+from . import const
+
+WEEKDAY_MASK_ALL = 0b1111111
+# assume workdays are mon-fri if the workday sensor does not tell otherwise
+WEEKDAY_MASK_WORKDAYS = 0b0011111
+
+ONE_DAY = datetime.timedelta(days=1)
+
+# give up when a time cannot be resolved on this many consecutive allowed days
+MAX_SKIPPED_DAYS = 400
+
+# timestamp of an entry in the timeslot index
+entry_timestamp = itemgetter(0)
+
+END_OF_DAY = "00:00:00"
+END_OF_DAY_UNWRAPPED = "23:59:59"
+
+
+def time_to_seconds(time: datetime.time) -> int:
+    """convert a time of day into seconds since midnight"""
+    return time.hour * 3600 + time.minute * 60 + time.second
+
+
+def seconds_to_time(seconds: int) -> datetime.time:
+    """convert seconds since midnight into a time of day"""
+    return datetime.time(seconds // 3600, (seconds // 60) % 60, seconds % 60)
+
+
+@attr.s(slots=True, frozen=True, cache_hash=True)
+class TimeOfDay:
+    """Compiled time string: fixed time of day, or sun event with signed offset."""
+
+    seconds = attr.ib(type=int, default=None)
+    sun_event = attr.ib(type=str, default=None)
+    offset = attr.ib(type=int, default=0)
+
+    @property
+    def has_sun(self) -> bool:
+        """check if the time is relative to sunrise/sunset"""
+        return self.sun_event is not None
+
+
+@attr.s(slots=True, frozen=True)
+class CompiledTimeslot:
+    """Compiled start and stop time of a timeslot."""
+
+    start = attr.ib(type=TimeOfDay, default=None)
+    stop = attr.ib(type=TimeOfDay, default=None)
+    # stop time 00:00:00 is unwrapped to 23:59:59 to stay within the day
+    stop_end_of_day = attr.ib(type=bool, default=False)
+
+
+def compile_time(time_str: str) -> TimeOfDay:
+    """parse a time string (07:00:00 or sunrise+00:30:00) once"""
+    if time_str is None:
+        return None
+    res = const.OffsetTimePattern.match(time_str)
+    if not res:
+        return TimeOfDay(seconds=time_to_seconds(dt_util.parse_time(time_str)))
+    offset = time_to_seconds(dt_util.parse_time(res.group(3)))
+    return TimeOfDay(
+        sun_event=res.group(1), offset=-offset if res.group(2) == "-" else offset
+    )
+
+
+def compile_timeslot(slot: dict, cache: dict = None) -> CompiledTimeslot:
+    """parse the start and stop time of a timeslot once
+
+    cache is an optional store of compiled times, shared when compiling many schedules
+    """
+
+    def compile(time_str: str) -> TimeOfDay:
+        if cache is None:
+            return compile_time(time_str)
+        elif time_str not in cache:
+            cache[time_str] = compile_time(time_str)
+        return cache[time_str]
+
+    stop = slot.get(const.ATTR_STOP)
+    return CompiledTimeslot(
+        start=compile(slot[const.ATTR_START]),
+        stop=compile(END_OF_DAY_UNWRAPPED if stop == END_OF_DAY else stop),
+        stop_end_of_day=stop == END_OF_DAY,
+    )
+
+
+def weekday_mask(days: list) -> int:
+    """convert a list of weekdays (mon, tue, ..) into a bitmask (bit 0 = monday)"""
+    mask = 0
+    for day in days:
+        if day in WEEKDAYS:
+            mask |= 1 << WEEKDAYS.index(day)
+    return mask
+
+
+def next_day_in_mask(mask: int, date: datetime.date):
+    """find the first day on or after date which is contained in the bitmask"""
+    weekday = date.weekday()
+    # rotate the mask such that bit 0 corresponds to the weekday of date
+    rotated = ((mask >> weekday) | (mask << (7 - weekday))) & WEEKDAY_MASK_ALL
+    if not rotated:
+        return None
+    return date + datetime.timedelta(days=(rotated & -rotated).bit_length() - 1)
+
+
+def prev_day_in_mask(mask: int, date: datetime.date):
+    """find the last day on or before date which is contained in the bitmask"""
+    weekday = date.weekday()
+    # rotate the mask such that bit 6 corresponds to the weekday of date
+    rotated = ((mask << (6 - weekday)) | (mask >> (weekday + 1))) & WEEKDAY_MASK_ALL
+    if not rotated:
+        return None
+    return date - datetime.timedelta(days=7 - rotated.bit_length())
+
+
+@attr.s(slots=True, frozen=True)
+class WorkdayCalendar:
+    """Workdays according to the workday sensor, shared by all schedules."""
+
+    version = attr.ib(type=int, default=0)
+    workday_mask = attr.ib(type=int, default=WEEKDAY_MASK_WORKDAYS)
+    # state of the workday sensor applies to the current day only
+    today = attr.ib(type=datetime.date, default=None)
+    today_is_workday = attr.ib(type=bool, default=None)
+
+    def is_workday(self, date: datetime.date) -> bool:
+        """check if a date is a workday"""
+        if self.today_is_workday is not None and date == self.today:
+            return self.today_is_workday
+        return bool((self.workday_mask >> date.weekday()) & 1)
+
+    def same_days(self, other) -> bool:
+        """check if another calendar yields the same workdays"""
+        return (
+            other is not None
+            and self.workday_mask == other.workday_mask
+            and self.today == other.today
+            and self.today_is_workday == other.today_is_workday
+        )
+
+
+@attr.s(slots=True, frozen=True, cache_hash=True)
+class OccurrenceRule:
+    """Days on which a schedule is allowed to trigger."""
+
+    weekday_mask = attr.ib(type=int, default=WEEKDAY_MASK_ALL)
+    start_date = attr.ib(type=datetime.date, default=None)
+    end_date = attr.ib(type=datetime.date, default=None)
+    # optional override of the weekday mask for a single day (workday sensor state)
+    today = attr.ib(type=datetime.date, default=None)
+    today_allowed = attr.ib(type=bool, default=None)
+
+    def day_allowed(self, date: datetime.date) -> bool:
+        """check if the schedule may trigger on a date (ignoring date restrictions)"""
+        if self.today is not None and date == self.today:
+            return self.today_allowed
+        return bool((self.weekday_mask >> date.weekday()) & 1)
+
+    def date_allowed(self, date: datetime.date) -> bool:
+        """check if the schedule may trigger on a date (including date restrictions)"""
+        if self.start_date and date < self.start_date:
+            return False
+        if self.end_date and date > self.end_date:
+            return False
+        return self.day_allowed(date)
+
+    def next_allowed_day(self, date: datetime.date):
+        """first allowed day on or after date (ignoring date restrictions)"""
+        result = next_day_in_mask(self.weekday_mask, date)
+        if self.today is None or self.today < date:
+            return result
+        elif self.today_allowed and (result is None or self.today < result):
+            return self.today
+        elif not self.today_allowed and result == self.today:
+            return next_day_in_mask(self.weekday_mask, self.today + ONE_DAY)
+        return result
+
+    def prev_allowed_day(self, date: datetime.date):
+        """last allowed day on or before date (ignoring date restrictions)"""
+        result = prev_day_in_mask(self.weekday_mask, date)
+        if self.today is None or self.today > date:
+            return result
+        elif self.today_allowed and (result is None or self.today > result):
+            return self.today
+        elif not self.today_allowed and result == self.today:
+            return prev_day_in_mask(self.weekday_mask, self.today - ONE_DAY)
+        return result
+
+    def resolve_day(self, date: datetime.date):
+        """find the day on which the schedule triggers, starting from date"""
+        if self.start_date and self.start_date > date:
+            # start date is in the future, jump to start date
+            date = self.start_date
+
+        day = self.next_allowed_day(date)
+        if day is None:
+            return None
+
+        if self.end_date and day > self.end_date:
+            # end date is in the past, use the last allowed day up to the end date
+            day = self.prev_allowed_day(self.end_date)
+            if day is None or (self.start_date and day < self.start_date):
+                return None
+        return day
+
+
+def build_occurrence_rule(
+    weekdays: list,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    calendar: WorkdayCalendar,
+) -> OccurrenceRule:
+    """collect the days on which a schedule is allowed to trigger"""
+    if const.DAY_TYPE_DAILY in weekdays or not len(weekdays):
+        mask = WEEKDAY_MASK_ALL
+    else:
+        mask = weekday_mask(weekdays)
+        if const.DAY_TYPE_WORKDAY in weekdays:
+            mask |= calendar.workday_mask
+        if const.DAY_TYPE_WEEKEND in weekdays:
+            mask |= WEEKDAY_MASK_ALL & ~calendar.workday_mask
+
+    today = None
+    today_allowed = None
+    if calendar.today_is_workday is not None:
+        # state of workday sensor is used for evaluating workday vs weekend
+        if const.DAY_TYPE_WORKDAY in weekdays:
+            today = calendar.today
+            today_allowed = calendar.is_workday(today)
+        elif const.DAY_TYPE_WEEKEND in weekdays:
+            today = calendar.today
+            today_allowed = not calendar.is_workday(today)
+
+    return OccurrenceRule(
+        weekday_mask=mask,
+        start_date=start_date,
+        end_date=end_date,
+        today=today,
+        today_allowed=today_allowed,
+    )
+
+
+def time_on_day(day: datetime.date, time: datetime.time) -> datetime.datetime:
+    """combine a day and time of day, None if the time does not exist on that day"""
+    ts = datetime.datetime.combine(day, time, tzinfo=dt_util.DEFAULT_TIME_ZONE)
+    if dt_util.as_local(dt_util.as_utc(ts)).time() != time:
+        # time is skipped by a DST transition
+        return None
+    return ts
+
+
+def next_occurrence(rule: OccurrenceRule, time, now: datetime.datetime):
+    """calculate the next occurrence of a time of day which is allowed by the rule
+
+    time is either a fixed time of day, or a function which returns the time of
+    day for a given date (e.g. for times relative to sunrise/sunset)
+    """
+    resolve = time if callable(time) else lambda _day: time
+
+    time_today = resolve(now.date())
+    if time_today is None:
+        ts = None
+        date = now.date() + ONE_DAY
+    else:
+        ts = dt_util.find_next_time_expression_time(
+            now, [time_today.second], [time_today.minute], [time_today.hour]
+        )
+        if ts > now:
+            date = ts.date()
+        else:
+            date = dt_util.find_next_time_expression_time(
+                now + datetime.timedelta(seconds=1), [0], [0], [0]
+            ).date()
+
+    day = rule.resolve_day(date)
+    if day is None:
+        return None
+    elif (
+        ts is not None
+        and day == ts.date()
+        and ts > now
+        and (day == now.date() or resolve(day) == time_today)
+    ):
+        return ts
+
+    reverse = False
+    for _i in range(MAX_SKIPPED_DAYS):
+        time_of_day = resolve(day)
+        ts = time_on_day(day, time_of_day) if time_of_day is not None else None
+        if ts is not None:
+            return ts
+        # time does not exist on this day (DST transition or polar day/night)
+        if not reverse:
+            # try the next allowed day
+            next_day = rule.resolve_day(day + ONE_DAY)
+            reverse = next_day is None or next_day <= day
+        if reverse:
+            # end date is reached, try the previous allowed day instead
+            next_day = rule.prev_allowed_day(day - ONE_DAY)
+            if next_day is None or (rule.start_date and next_day < rule.start_date):
+                return None
+        day = next_day
+    return None
+
+
+@attr.s(slots=True)
+class TimeslotIndex:
+    """Start and stop times of all timeslots on the allowed days of a window,
+    sorted such that the next start/stop can be found by bisection.
+
+    Entries are (timestamp, slot, datetime) tuples.
+    Lookups return None when the answer lies outside of the window.
+    """
+
+    key = attr.ib(default=None)
+    # start of the first day of the window
+    first = attr.ib(type=float, default=None)
+    starts = attr.ib(type=list, factory=list)
+    stops = attr.ib(type=list, factory=list)
+    # start times per timeslot
+    slot_starts = attr.ib(type=list, factory=list)
+
+    def _find(self, entries: list, after: datetime.datetime):
+        """first entry later than a point in time"""
+        if after.timestamp() < self.first:
+            return None
+        pos = bisect.bisect_right(entries, after.timestamp(), key=entry_timestamp)
+        return pos if pos < len(entries) else None
+
+    def next_stop(self, after: datetime.datetime):
+        """first timeslot stopping after a point in time, as (slot, timestamp)"""
+        pos = self._find(self.stops, after)
+        return self.stops[pos][1:] if pos is not None else None
+
+    def next_start_of_slot(self, slot: int, after: datetime.datetime):
+        """first start of a timeslot after a point in time"""
+        pos = self._find(self.slot_starts[slot], after)
+        return self.slot_starts[slot][pos][2] if pos is not None else None
+
+    def next_starts(self, after: datetime.datetime) -> list:
+        """next start of every timeslot, as (slot, timestamp) ordered by time"""
+        pos = self._find(self.starts, after)
+        if pos is None:
+            return []
+        result = []
+        seen = set()
+        for (_t, slot, ts) in itertools.islice(self.starts, pos, None):
+            if slot not in seen:
+                seen.add(slot)
+                result.append((slot, ts))
+                if len(seen) == len(self.slot_starts):
+                    break
+        return result
+
+
+def build_timeslot_index(
+    key,
+    rule: OccurrenceRule,
+    timeslots: list,
+    resolve,
+    first_day: datetime.date,
+    days: int,
+    cache: dict = None,
+) -> TimeslotIndex:
+    """calculate the start and stop times of the timeslots for a window of days
+
+    resolve is a function which returns the time of day of a compiled time on a
+    given date (None if it cannot be determined)
+    cache is an optional store of the calculated times, shared when indexing
+    many schedules at once
+    """
+    if cache is None:
+        cache = {}
+    window = [first_day + datetime.timedelta(days=i) for i in range(days)]
+
+    def instant(time: TimeOfDay, day: datetime.date):
+        """calculate a compiled time on a day, as (timestamp, datetime)"""
+        time_of_day = resolve(time, day)
+        ts = time_on_day(day, time_of_day) if time_of_day is not None else None
+        return (ts.timestamp(), ts) if ts is not None else None
+
+    def series(time: TimeOfDay) -> list:
+        """calculate a compiled time on every day of the window"""
+        if (time, first_day) not in cache:
+            cache[(time, first_day)] = [instant(time, day) for day in window]
+        return cache[(time, first_day)]
+
+    if (rule, first_day) not in cache:
+        cache[(rule, first_day)] = [
+            i for (i, day) in enumerate(window) if rule.date_allowed(day)
+        ]
+    allowed_days = cache[(rule, first_day)]
+
+    starts = []
+    stops = []
+    slot_starts = []
+    for (slot, timeslot) in enumerate(timeslots):
+        start_series = series(timeslot.start)
+        stop_series = series(timeslot.stop) if timeslot.stop is not None else None
+        slot_start = []
+        for i in allowed_days:
+            start = start_series[i]
+            if start is not None:
+                start = (start[0], slot, start[1])
+                starts.append(start)
+                slot_start.append(start)
+
+            if stop_series is not None:
+                stop = stop_series[i]
+            elif start is not None:
+                # timeslot without stop time lasts for a minute
+                stop = instant(
+                    TimeOfDay(seconds=(time_to_seconds(start[2].time()) + 60) % 86400),
+                    window[i],
+                )
+            else:
+                stop = None
+            if stop is not None:
+                stops.append((stop[0], slot, stop[1]))
+        slot_starts.append(slot_start)
+
+    starts.sort()
+    stops.sort()
+    return TimeslotIndex(
+        key=key,
+        first=dt_util.start_of_local_day(first_day).timestamp(),
+        starts=starts,
+        stops=stops,
+        slot_starts=slot_starts,
+    )
@@ -1,17 +1,34 @@
 import logging
 import secrets
 from collections import OrderedDict
-from typing import MutableMapping, cast
+from contextlib import contextmanager
+from types import MappingProxyType
+from typing import Mapping, MutableMapping, cast
 
 import attr
-from homeassistant.core import callback, HomeAssistant
-from homeassistant.loader import bind_hass
 from homeassistant.const import (
     ATTR_NAME,
     CONF_CONDITIONS,
+    EVENT_HOMEASSISTANT_FINAL_WRITE,
 )
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.storage import Store
+from homeassistant.loader import bind_hass
+
 from . import const
+from .journal import (
+    JOURNAL_DATA,
+    JOURNAL_KEY,
+    JOURNAL_OP,
+    JOURNAL_VERSION,
+    OP_SCHEDULE_REMOVED,
+    OP_SCHEDULE_UPDATED,
+    OP_TAG_REMOVED,
+    OP_TAG_UPDATED,
+    OP_TIME_SHUTDOWN,
+    ScheduleJournal,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -19,6 +36,9 @@ DATA_REGISTRY = f"{const.DOMAIN}_storage"
 STORAGE_KEY = f"{const.DOMAIN}.storage"
 STORAGE_VERSION = 3
 SAVE_DELAY = 10
+JOURNAL_STORAGE_KEY = f"{const.DOMAIN}.journal"
+# the journal is merged into the storage file when it grows beyond this size
+JOURNAL_COMPACT_SIZE = 1024 * 1024
 
 
 @attr.s(slots=True, frozen=True)
@@ -64,6 +84,7 @@ class ScheduleEntry:
     repeat_type = attr.ib(type=str, default=None)
     name = attr.ib(type=str, default=None)
     enabled = attr.ib(type=bool, default=True)
+    spread = attr.ib(type=int, default=None)
 
 
 @attr.s(slots=True, frozen=True)
@@ -94,6 +115,54 @@ def parse_schedule_data(data: dict):
     return data
 
 
+def parse_schedule_entry(entry: dict) -> ScheduleEntry:
+    """create a ScheduleEntry from stored data"""
+    entry = parse_schedule_data(entry)
+    return ScheduleEntry(
+        schedule_id=entry[const.ATTR_SCHEDULE_ID],
+        weekdays=entry[const.ATTR_WEEKDAYS],
+        start_date=entry[const.ATTR_START_DATE],
+        end_date=entry[const.ATTR_END_DATE],
+        timeslots=entry[const.ATTR_TIMESLOTS],
+        repeat_type=entry[const.ATTR_REPEAT_TYPE],
+        name=entry[ATTR_NAME],
+        enabled=entry[const.ATTR_ENABLED],
+        spread=entry.get(const.ATTR_SPREAD),
+    )
+
+
+def schedule_to_dict(entry: ScheduleEntry) -> dict:
+    """convert a ScheduleEntry to data to store"""
+    item = {
+        const.ATTR_SCHEDULE_ID: entry.schedule_id,
+        const.ATTR_TIMESLOTS: [],
+        const.ATTR_WEEKDAYS: entry.weekdays,
+        const.ATTR_START_DATE: entry.start_date,
+        const.ATTR_END_DATE: entry.end_date,
+        const.ATTR_REPEAT_TYPE: entry.repeat_type,
+        ATTR_NAME: entry.name,
+        const.ATTR_ENABLED: entry.enabled,
+        const.ATTR_SPREAD: entry.spread,
+    }
+    for slot in entry.timeslots:
+        timeslot = {
+            const.ATTR_START: slot.start,
+            const.ATTR_STOP: slot.stop,
+            CONF_CONDITIONS: [],
+            const.ATTR_CONDITION_TYPE: slot.condition_type,
+            const.ATTR_TRACK_CONDITIONS: slot.track_conditions,
+            const.ATTR_ACTIONS: [],
+        }
+        if slot.conditions:
+            for condition in slot.conditions:
+                timeslot[CONF_CONDITIONS].append(attr.asdict(condition))
+        if slot.actions:
+            for action in slot.actions:
+                timeslot[const.ATTR_ACTIONS].append(attr.asdict(action))
+        item[const.ATTR_TIMESLOTS].append(timeslot)
+    return item
+
+
 class MigratableStore(Store):
     async def _async_migrate_func(self, old_version, data: dict):
 
@@ -152,11 +221,29 @@ class ScheduleStorage:
         self.hass = hass
         self.schedules: MutableMapping[str, ScheduleEntry] = {}
         self.tags: MutableMapping[str, TagEntry] = {}
+        self._tag_schedules = {}
+        self._schedule_tags = {}
+        self._entity_schedules = {}
+        self._schedule_entities = {}
+        self._schedule_positions = {}
         self.time_shutdown = None
         self._store = MigratableStore(hass, STORAGE_VERSION, STORAGE_KEY)
+        self.journal = ScheduleJournal(hass, JOURNAL_STORAGE_KEY)
+        self._journal_timer = None
+        self._final_write_listener = None
+        self._changed_schedules = set()
+        self._changed_tags = set()
+        self._time_shutdown_changed = False
+        self._serialized = {}
+        self.journal_enabled = False
+        self.compactions = 0
+        self._batch_depth = 0
+        self._batch_changed = False
 
     async def async_load(self) -> None:
         """Load the registry of schedule entries."""
+        if self.journal_enabled and self._journal_timer:
+            await self._async_write_journal()
         data = await self._store.async_load()
         schedules: "OrderedDict[str, ScheduleEntry]" = OrderedDict()
         tags: "OrderedDict[str, TagEntry]" = OrderedDict()
@@ -165,16 +252,8 @@ class ScheduleStorage:
 
             if "schedules" in data:
                 for entry in data["schedules"]:
-                    entry = parse_schedule_data(entry)
-                    schedules[entry[const.ATTR_SCHEDULE_ID]] = ScheduleEntry(
-                        schedule_id=entry[const.ATTR_SCHEDULE_ID],
-                        weekdays=entry[const.ATTR_WEEKDAYS],
-                        start_date=entry[const.ATTR_START_DATE],
-                        end_date=entry[const.ATTR_END_DATE],
-                        timeslots=entry[const.ATTR_TIMESLOTS],
-                        repeat_type=entry[const.ATTR_REPEAT_TYPE],
-                        name=entry[ATTR_NAME],
-                        enabled=entry[const.ATTR_ENABLED],
+                    schedules[entry[const.ATTR_SCHEDULE_ID]] = parse_schedule_entry(
+                        entry
                     )
 
             if "tags" in data:
@@ -187,55 +266,198 @@ class ScheduleStorage:
             if "time_shutdown" in data:
                 self.time_shutdown = data["time_shutdown"]
 
+        # apply the changes which were written to the journal after the snapshot
+        for record in await self.journal.async_load():
+            op = record[JOURNAL_OP]
+            key = record.get(JOURNAL_KEY)
+            if op == OP_SCHEDULE_UPDATED:
+                entry = record[JOURNAL_DATA]
+                if record[JOURNAL_VERSION] < STORAGE_VERSION:
+                    migrated = await self._store._async_migrate_func(
+                        record[JOURNAL_VERSION], {"schedules": [entry]}
+                    )
+                    entry = migrated["schedules"][0]
+                schedules[key] = parse_schedule_entry(entry)
+            elif op == OP_SCHEDULE_REMOVED:
+                schedules.pop(key, None)
+            elif op == OP_TAG_UPDATED:
+                tags[key] = TagEntry(
+                    name=record[JOURNAL_DATA][ATTR_NAME],
+                    schedules=record[JOURNAL_DATA][const.ATTR_SCHEDULES],
+                )
+            elif op == OP_TAG_REMOVED:
+                tags.pop(key, None)
+            elif op == OP_TIME_SHUTDOWN:
+                self.time_shutdown = record[JOURNAL_DATA]
+
         self.schedules = schedules
         self.tags = tags
+        self._serialized = {}
+        self._tag_schedules = {}
+        self._schedule_tags = {}
+        self._entity_schedules = {}
+        self._schedule_entities = {}
+        self._schedule_positions = {
+            schedule_id: position for (position, schedule_id) in enumerate(schedules)
+        }
+        for name in tags:
+            self._async_index_tag(name)
+        for schedule_id in schedules:
+            self._async_index_schedule(schedule_id)
+
+    async def async_set_journal(self, enabled: bool) -> None:
+        """Write changes to the journal instead of rewriting the storage file."""
+        was_enabled = self.journal_enabled
+        self.journal_enabled = enabled
+        if enabled:
+            if self._final_write_listener is None:
+                self._final_write_listener = self.hass.bus.async_listen_once(
+                    EVENT_HOMEASSISTANT_FINAL_WRITE, self._async_final_write
+                )
+            if not was_enabled:
+                # start the journal from an up-to-date storage file
+                await self.async_compact()
+            return
+
+        if self._final_write_listener:
+            self._final_write_listener()
+            self._final_write_listener = None
+        if self._journal_timer:
+            self._journal_timer()
+            self._journal_timer = None
+        if was_enabled or self.journal.size:
+            # store everything in the storage file and get rid of the journal
+            await self.async_compact()
 
     @callback
     def async_schedule_save(self) -> None:
         """Schedule saving the registry of schedules."""
+        if self._batch_depth:
+            self._batch_changed = True
+            return
+        if self.journal_enabled:
+            if self._journal_timer is None:
+                self._journal_timer = async_call_later(
+                    self.hass, SAVE_DELAY, self._async_write_journal
+                )
+            return
         self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
 
+    @contextmanager
+    def async_batch(self):
+        """Group the changes made within the block, such that they are saved at once."""
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._batch_changed:
+                self._batch_changed = False
+                self.async_schedule_save()
+
     async def async_save(self) -> None:
         """Save the registry of schedules."""
+        if self.journal_enabled:
+            await self._async_write_journal()
+            return
+        await self._store.async_save(self._data_to_save())
+
+    async def async_compact(self) -> None:
+        """Store all data in the storage file and clear the journal."""
+        self._changed_schedules.clear()
+        self._changed_tags.clear()
+        self._time_shutdown_changed = False
         await self._store.async_save(self._data_to_save())
+        await self.journal.async_clear()
+        self.compactions += 1
+
+    async def _async_write_journal(self, _now=None) -> None:
+        """Append the changed records to the journal."""
+        if self._journal_timer:
+            self._journal_timer()
+            self._journal_timer = None
+        await self.journal.async_append(self._journal_records())
+        if self.journal.size > JOURNAL_COMPACT_SIZE:
+            await self.async_compact()
+
+    async def _async_final_write(self, _event) -> None:
+        """Write the pending changes when Home Assistant is stopping."""
+        self._final_write_listener = None
+        if self.journal_enabled:
+            await self._async_write_journal()
+
+    @callback
+    def _journal_records(self) -> list:
+        """Return the records for the changes since the last write."""
+        records = []
+        for schedule_id in self._changed_schedules:
+            entry = self.schedules.get(schedule_id)
+            record = {
+                JOURNAL_VERSION: STORAGE_VERSION,
+                JOURNAL_OP: OP_SCHEDULE_UPDATED if entry else OP_SCHEDULE_REMOVED,
+                JOURNAL_KEY: schedule_id,
+            }
+            if entry:
+                record[JOURNAL_DATA] = self._async_serialize_schedule(entry)
+            records.append(record)
+
+        for name in self._changed_tags:
+            entry = self.tags.get(name)
+            record = {
+                JOURNAL_VERSION: STORAGE_VERSION,
+                JOURNAL_OP: OP_TAG_UPDATED if entry else OP_TAG_REMOVED,
+                JOURNAL_KEY: name,
+            }
+            if entry:
+                record[JOURNAL_DATA] = attr.asdict(entry)
+            records.append(record)
+
+        if self._time_shutdown_changed:
+            records.append(
+                {
+                    JOURNAL_VERSION: STORAGE_VERSION,
+                    JOURNAL_OP: OP_TIME_SHUTDOWN,
+                    JOURNAL_DATA: self.time_shutdown,
+                }
+            )
+
+        self._changed_schedules.clear()
+        self._changed_tags.clear()
+        self._time_shutdown_changed = False
+        return records
+
+    @callback
+    def _async_schedule_changed(self, schedule_id: str) -> None:
+        """Mark a schedule for saving."""
+        self._serialized.pop(schedule_id, None)
+        self._async_index_schedule(schedule_id)
+        if self.journal_enabled:
+            self._changed_schedules.add(schedule_id)
+        self.async_schedule_save()
+
+    @callback
+    def _async_serialize_schedule(self, entry: ScheduleEntry) -> dict:
+        """Return the data to store for a schedule, cached until it changes."""
+        item = self._serialized.get(entry.schedule_id)
+        if item is None:
+            item = self._serialized[entry.schedule_id] = schedule_to_dict(entry)
+        return item
+
+    @callback
+    def _async_tag_changed(self, name: str) -> None:
+        """Mark a tag for saving."""
+        if self.journal_enabled:
+            self._changed_tags.add(name)
+        self.async_schedule_save()
 
     @callback
     def _data_to_save(self) -> dict:
         """Return data for the registry for schedules to store in a file."""
         store_data = {}
 
-        store_data["schedules"] = []
-        store_data["tags"] = []
-
-        for entry in self.schedules.values():
-            item = {
-                const.ATTR_SCHEDULE_ID: entry.schedule_id,
-                const.ATTR_TIMESLOTS: [],
-                const.ATTR_WEEKDAYS: entry.weekdays,
-                const.ATTR_START_DATE: entry.start_date,
-                const.ATTR_END_DATE: entry.end_date,
-                const.ATTR_REPEAT_TYPE: entry.repeat_type,
-                ATTR_NAME: entry.name,
-                const.ATTR_ENABLED: entry.enabled,
-            }
-            for slot in entry.timeslots:
-                timeslot = {
-                    const.ATTR_START: slot.start,
-                    const.ATTR_STOP: slot.stop,
-                    CONF_CONDITIONS: [],
-                    const.ATTR_CONDITION_TYPE: slot.condition_type,
-                    const.ATTR_TRACK_CONDITIONS: slot.track_conditions,
-                    const.ATTR_ACTIONS: [],
-                }
-                if slot.conditions:
-                    for condition in slot.conditions:
-                        timeslot[CONF_CONDITIONS].append(attr.asdict(condition))
-                if slot.actions:
-                    for action in slot.actions:
-                        timeslot[const.ATTR_ACTIONS].append(attr.asdict(action))
-                item[const.ATTR_TIMESLOTS].append(timeslot)
-            store_data["schedules"].append(item)
-
+        store_data["schedules"] = [
+            self._async_serialize_schedule(entry) for entry in self.schedules.values()
+        ]
         store_data["tags"] = [attr.asdict(entry) for entry in self.tags.values()]
 
         if self.time_shutdown:
@@ -248,7 +470,14 @@ class ScheduleStorage:
         _LOGGER.warning("Removing scheduler configuration data!")
         self.schedules = {}
         self.tags = {}
+        self._serialized = {}
+        self._tag_schedules = {}
+        self._schedule_tags = {}
+        self._entity_schedules = {}
+        self._schedule_entities = {}
+        self._schedule_positions = {}
         await self._store.async_remove()
+        await self.journal.async_clear()
 
     @callback
     def async_get_schedule(self, entity_id) -> dict:
@@ -264,6 +493,22 @@ class ScheduleStorage:
             res[key] = attr.asdict(val)
         return res
 
+    @callback
+    def async_get_schedule_entry(self, schedule_id: str) -> ScheduleEntry:
+        """Get an existing ScheduleEntry by id (without copying it)."""
+        return self.schedules.get(schedule_id)
+
+    @callback
+    def async_get_schedule_data(self, schedule_id: str) -> dict:
+        """Get the stored data of a ScheduleEntry (cached, must not be modified)."""
+        entry = self.schedules.get(schedule_id)
+        return self._async_serialize_schedule(entry) if entry else None
+
+    @callback
+    def async_get_schedule_entries(self) -> Mapping[str, ScheduleEntry]:
+        """Get a read-only view of all ScheduleEntries."""
+        return MappingProxyType(self.schedules)
+
     @callback
     def async_create_schedule(self, data: dict) -> ScheduleEntry:
         """Create a new ScheduleEntry."""
@@ -280,7 +525,8 @@ class ScheduleStorage:
         data = parse_schedule_data(data)
         new_schedule = ScheduleEntry(**data, schedule_id=schedule_id)
         self.schedules[schedule_id] = new_schedule
-        self.async_schedule_save()
+        self._schedule_positions[schedule_id] = len(self._schedule_positions)
+        self._async_schedule_changed(schedule_id)
         return new_schedule
 
     @callback
@@ -288,7 +534,7 @@ class ScheduleStorage:
         """Delete ScheduleEntry."""
         if schedule_id in self.schedules:
             del self.schedules[schedule_id]
-            self.async_schedule_save()
+            self._async_schedule_changed(schedule_id)
             return True
         return False
 
@@ -298,7 +544,7 @@ class ScheduleStorage:
         old = self.schedules[schedule_id]
         changes = parse_schedule_data(changes)
         new = self.schedules[schedule_id] = attr.evolve(old, **changes)
-        self.async_schedule_save()
+        self._async_schedule_changed(schedule_id)
         return new
 
     @callback
@@ -315,6 +561,16 @@ class ScheduleStorage:
             res[key] = attr.asdict(val)
         return res
 
+    @callback
+    def async_get_tag_entry(self, name: str) -> TagEntry:
+        """Get an existing TagEntry by name (without copying it)."""
+        return self.tags.get(name)
+
+    @callback
+    def async_get_tag_entries(self) -> Mapping[str, TagEntry]:
+        """Get a read-only view of all TagEntries."""
+        return MappingProxyType(self.tags)
+
     @callback
     def async_create_tag(self, data: dict) -> TagEntry:
         """Create a new TagEntry."""
@@ -324,7 +580,8 @@ class ScheduleStorage:
 
         new_tag = TagEntry(**data)
         self.tags[name] = new_tag
-        self.async_schedule_save()
+        self._async_index_tag(name)
+        self._async_tag_changed(name)
         return new_tag
 
     @callback
@@ -332,7 +589,8 @@ class ScheduleStorage:
         """Delete TagEntry."""
         if name in self.tags:
             del self.tags[name]
-            self.async_schedule_save()
+            self._async_index_tag(name)
+            self._async_tag_changed(name)
             return True
         return False
 
@@ -342,14 +600,122 @@ class ScheduleStorage:
         old = self.tags[name]
         changes = parse_schedule_data(changes)
         new = self.tags[name] = attr.evolve(old, **changes)
-        self.async_schedule_save()
+        self._async_index_tag(name)
+        self._async_tag_changed(name)
         return new
 
+    @callback
+    def async_add_schedule_to_tag(self, name: str, schedule_id: str) -> None:
+        """Assign a tag to a schedule, the tag is created if it does not exist."""
+        schedule_ids = self._tag_schedules.get(name)
+        if schedule_ids is None:
+            self.async_create_tag(
+                {ATTR_NAME: name, const.ATTR_SCHEDULES: [schedule_id]}
+            )
+            return
+        if schedule_id in schedule_ids:
+            return
+        old = self.tags[name]
+        self.tags[name] = attr.evolve(old, schedules=old.schedules + [schedule_id])
+        schedule_ids.add(schedule_id)
+        self._schedule_tags.setdefault(schedule_id, set()).add(name)
+        self._async_tag_changed(name)
+
+    @callback
+    def async_remove_schedule_from_tag(self, name: str, schedule_id: str) -> None:
+        """Unassign a tag from a schedule, the tag is deleted when it becomes unused."""
+        schedule_ids = self._tag_schedules.get(name)
+        if not schedule_ids or schedule_id not in schedule_ids:
+            return
+        if len(schedule_ids) == 1:
+            self.async_delete_tag(name)
+            return
+        old = self.tags[name]
+        self.tags[name] = attr.evolve(
+            old, schedules=[x for x in old.schedules if x != schedule_id]
+        )
+        schedule_ids.discard(schedule_id)
+        self._async_unindex_schedule_tag(schedule_id, name)
+        self._async_tag_changed(name)
+
+    @callback
+    def async_get_schedule_position(self, schedule_id: str) -> int:
+        """Get the position of a schedule in storage order.
+
+        Positions only increase, deleted schedules keep theirs until the
+        storage is loaded again.
+        """
+        return self._schedule_positions.get(schedule_id)
+
+    @callback
+    def async_get_tags_for_schedule(self, schedule_id: str) -> frozenset:
+        """Get the names of the tags which are assigned to a schedule."""
+        return frozenset(self._schedule_tags.get(schedule_id, ()))
+
+    @callback
+    def async_get_schedules_with_tag(self, name: str) -> frozenset:
+        """Get the IDs of the schedules which have a tag assigned."""
+        return frozenset(self._tag_schedules.get(name, ()))
+
+    @callback
+    def _async_index_tag(self, name: str) -> None:
+        """Update the tag indexes after a tag was created, changed or deleted."""
+        for schedule_id in self._tag_schedules.pop(name, ()):
+            self._async_unindex_schedule_tag(schedule_id, name)
+        entry = self.tags.get(name)
+        if entry is None:
+            return
+        schedule_ids = self._tag_schedules[name] = set(entry.schedules)
+        for schedule_id in schedule_ids:
+            self._schedule_tags.setdefault(schedule_id, set()).add(name)
+
+    @callback
+    def _async_unindex_schedule_tag(self, schedule_id: str, name: str) -> None:
+        """Remove a tag from the index of a schedule."""
+        tags = self._schedule_tags.get(schedule_id)
+        if tags is None:
+            return
+        tags.discard(name)
+        if not tags:
+            del self._schedule_tags[schedule_id]
+
+    @callback
+    def async_get_schedules_with_entity(self, entity_id: str) -> frozenset:
+        """Get the IDs of the schedules which have an action for an entity."""
+        return frozenset(self._entity_schedules.get(entity_id, ()))
+
+    @callback
+    def _async_index_schedule(self, schedule_id: str) -> None:
+        """Update the entity indexes after a schedule was changed."""
+        for entity_id in self._schedule_entities.pop(schedule_id, ()):
+            schedule_ids = self._entity_schedules[entity_id]
+            schedule_ids.discard(schedule_id)
+            if not schedule_ids:
+                del self._entity_schedules[entity_id]
+        entry = self.schedules.get(schedule_id)
+        if entry is None:
+            return
+        entity_ids = {
+            action.entity_id
+            for timeslot in entry.timeslots
+            for action in timeslot.actions
+            if action.entity_id
+        }
+        if not entity_ids:
+            return
+        self._schedule_entities[schedule_id] = entity_ids
+        for entity_id in entity_ids:
+            self._entity_schedules.setdefault(entity_id, set()).add(schedule_id)
+
     @callback
     def async_get_time_shutdown(self) -> dict:
         """Get the shutdown time and clear the stored value afterwards."""
         res = self.time_shutdown
+        if res is None:
+            # nothing to clear, no need to save
+            return res
         self.time_shutdown = None
+        self._time_shutdown_changed = self.journal_enabled
         self.async_schedule_save()
         return res
 
@@ -357,6 +723,7 @@ class ScheduleStorage:
     async def async_set_time_shutdown(self, value: str):
         """Set the shutdown time and store it immediately."""
         self.time_shutdown = value
+        self._time_shutdown_changed = self.journal_enabled
         await self.async_save()
 
 @bind_hass
@@ -0,0 +1,297 @@
+import datetime
+import logging
+
+import homeassistant.util.dt as dt_util
+from homeassistant.const import (
+    EVENT_CORE_CONFIG_UPDATE,
+    SUN_EVENT_SUNRISE,
+    SUN_EVENT_SUNSET,
+)
+from homeassistant.core import (
+    HassJob,
+    HomeAssistant,
+    callback,
+)
+from homeassistant.helpers.event import (
+    async_track_point_in_time,
+    async_track_state_change_event,
+)
+from homeassistant.helpers.sun import get_astral_location
+
+from . import const
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_NEXT_RISING = "next_rising"
+ATTR_NEXT_SETTING = "next_setting"
+
+SUN_EVENT_ATTRIBUTES = {
+    SUN_EVENT_SUNRISE: ATTR_NEXT_RISING,
+    SUN_EVENT_SUNSET: ATTR_NEXT_SETTING,
+}
+
+# number of days for which the sun events are calculated in advance
+EPHEMERIS_DAYS = 400
+# recalculate the ephemeris when this many days of it have passed
+EPHEMERIS_REFRESH_DAYS = 30
+
+# the sun does not rise/set on a day of the ephemeris (polar day/night)
+NO_SUN_EVENT = object()
+
+
+def parse_sun_attribute(state, attribute: str) -> datetime.datetime:
+    """read a datetime attribute from the sun entity"""
+    if state is None or attribute not in state.attributes:
+        return None
+    value = state.attributes[attribute]
+    if isinstance(value, datetime.datetime):
+        return value
+    return dt_util.parse_datetime(value) if value else None
+
+
+class SunTracker:
+    """Single subscription to the sun entity, shared by all schedules.
+
+    Only changes of the next sunrise/sunset are propagated, and only to the
+    schedules which depend on the sun event that has moved.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        """init"""
+        self.hass = hass
+        self._listener = None
+        self._next_events = {}
+        self._subscribers = {}
+        self._index = {sun_event: set() for sun_event in SUN_EVENT_ATTRIBUTES}
+        # incremented whenever any of the next sun events changes
+        self.version = 0
+
+        self.suppressed_updates = 0
+        self.propagated_updates = 0
+
+    @callback
+    def async_start(self):
+        """subscribe to the sun entity"""
+        self._async_read_state(self.hass.states.get(const.SUN_ENTITY))
+        self._listener = async_track_state_change_event(
+            self.hass, const.SUN_ENTITY, self._async_sun_updated
+        )
+
+    @callback
+    def async_stop(self):
+        """unsubscribe from the sun entity"""
+        if self._listener:
+            self._listener()
+            self._listener = None
+
+    @callback
+    def async_get_next_event(self, sun_event: str) -> datetime.datetime:
+        """get the next occurrence of sunrise/sunset"""
+        return self._next_events.get(sun_event)
+
+    @callback
+    def async_subscribe(self, schedule_id: str, sun_events: set, action):
+        """notify a schedule when any of the sun events has changed"""
+        self._async_unsubscribe(schedule_id)
+        job = self._subscribers[schedule_id] = HassJob(action)
+        for sun_event in sun_events:
+            self._index[sun_event].add(schedule_id)
+
+        @callback
+        def async_unsubscribe():
+            if self._subscribers.get(schedule_id) is job:
+                self._async_unsubscribe(schedule_id)
+
+        return async_unsubscribe
+
+    @callback
+    def _async_unsubscribe(self, schedule_id: str):
+        """remove a schedule from the index"""
+        if self._subscribers.pop(schedule_id, None) is None:
+            return
+        for schedule_ids in self._index.values():
+            schedule_ids.discard(schedule_id)
+
+    @callback
+    def _async_read_state(self, state) -> list:
+        """store the next sun events of the sun entity, returns the ones that changed"""
+        changed = []
+        for (sun_event, attribute) in SUN_EVENT_ATTRIBUTES.items():
+            value = parse_sun_attribute(state, attribute)
+            if value != self._next_events.get(sun_event):
+                self._next_events[sun_event] = value
+                changed.append(sun_event)
+        if changed:
+            self.version += 1
+        return changed
+
+    @callback
+    def _async_sun_updated(self, event):
+        """the sun entity was updated"""
+        changed = self._async_read_state(event.data["new_state"])
+        if not changed:
+            # only other attributes (elevation, azimuth, ..) have changed
+            self.suppressed_updates += 1
+            return
+        self.propagated_updates += 1
+        self.async_notify(changed)
+
+    @callback
+    def async_notify(self, changed: list):
+        """notify the schedules which depend on the sun events that have changed"""
+        schedule_ids = set()
+        for sun_event in changed:
+            schedule_ids.update(self._index[sun_event])
+
+        _LOGGER.debug(
+            "Sun events {} have changed, updating {} schedules".format(
+                changed, len(schedule_ids)
+            )
+        )
+        for schedule_id in schedule_ids:
+            job = self._subscribers.get(schedule_id)
+            if job:
+                self.hass.async_run_hass_job(job)
+
+
+def calculate_ephemeris(location, elevation, first_date: datetime.date, days: int):
+    """calculate sunrise and sunset for a range of dates (runs in executor)"""
+    result = {}
+    for i in range(days):
+        date = first_date + datetime.timedelta(days=i)
+        events = {}
+        for sun_event in SUN_EVENT_ATTRIBUTES:
+            try:
+                ts = getattr(location, sun_event)(
+                    date, local=False, observer_elevation=elevation
+                )
+                events[sun_event] = dt_util.as_local(ts)
+            except ValueError:
+                # event does not occur on this date
+                events[sun_event] = NO_SUN_EVENT
+        result[date] = events
+    return result
+
+
+class SunEphemeris:
+    """Cache of sunrise and sunset times for a rolling window of dates.
+
+    The times are calculated from the location in the HA configuration, such
+    that sun-relative timeslots get exact timestamps for future days as well.
+    The window is moved forward every EPHEMERIS_REFRESH_DAYS days.
+    """
+
+    def __init__(self, hass: HomeAssistant, sun_tracker: SunTracker):
+        """init"""
+        self.hass = hass
+        self._sun_tracker = sun_tracker
+        self._events = {}
+        self._first_date = None
+        self._task = None
+        self._listener = None
+        self._refresh_timer = None
+        # incremented whenever the ephemeris is recalculated
+        self.version = 0
+
+    @callback
+    def async_start(self):
+        """calculate the ephemeris and recalculate it when the location changes"""
+
+        @callback
+        def async_core_config_updated(_event):
+            self._events = {}
+            self._first_date = None
+            self.version += 1
+            self.async_refresh()
+
+        self._listener = self.hass.bus.async_listen(
+            EVENT_CORE_CONFIG_UPDATE, async_core_config_updated
+        )
+        self.async_refresh()
+
+    @callback
+    def async_stop(self):
+        """stop listening for location changes"""
+        if self._listener:
+            self._listener()
+            self._listener = None
+        if self._refresh_timer:
+            self._refresh_timer()
+            self._refresh_timer = None
+
+    @callback
+    def async_refresh(self):
+        """calculate the ephemeris in the background"""
+        if self._task is not None:
+            return
+        self._task = self.hass.async_create_task(self.async_update())
+
+    async def async_update(self):
+        """calculate the ephemeris starting from yesterday"""
+        first_date = dt_util.as_local(dt_util.utcnow()).date() - datetime.timedelta(
+            days=1
+        )
+        if first_date == self._first_date:
+            # the window has not moved since the last calculation
+            self._task = None
+            return
+        try:
+            location, elevation = get_astral_location(self.hass)
+            events = await self.hass.async_add_executor_job(
+                calculate_ephemeris, location, elevation, first_date, EPHEMERIS_DAYS
+            )
+        finally:
+            self._task = None
+
+        self._events = events
+        self._first_date = first_date
+        self.version += 1
+
+        # move the window forward after a number of days (unless stopped meanwhile)
+        if self._refresh_timer:
+            self._refresh_timer()
+            self._refresh_timer = None
+        if self._listener:
+            self._refresh_timer = async_track_point_in_time(
+                self.hass,
+                self._async_refresh_timer,
+                dt_util.start_of_local_day(
+                    first_date + datetime.timedelta(days=EPHEMERIS_REFRESH_DAYS + 1)
+                ),
+            )
+        _LOGGER.debug(
+            "Calculated sun events for {} days from {}".format(
+                EPHEMERIS_DAYS, first_date
+            )
+        )
+        self._sun_tracker.async_notify(list(SUN_EVENT_ATTRIBUTES))
+
+    @callback
+    def _async_refresh_timer(self, _now):
+        """the window of the ephemeris should be moved forward"""
+        self._refresh_timer = None
+        self.async_refresh()
+
+    @property
+    def ready(self) -> bool:
+        """check if the ephemeris has been calculated"""
+        return self._first_date is not None
+
+    @callback
+    def async_get_event(self, sun_event: str, date: datetime.date) -> datetime.datetime:
+        """get the time of sunrise/sunset on a date
+
+        None if the date is not known, NO_SUN_EVENT if the event does not occur
+        on that date.
+        """
+        events = self._events.get(date)
+        if events is None:
+            today = dt_util.as_local(dt_util.utcnow()).date()
+            if (
+                self._first_date is not None
+                and self._first_date < today - datetime.timedelta(days=1)
+            ):
+                # the window is outdated, shift it to the current date
+                self.async_refresh()
+            return None
+        return events[sun_event]
@@ -1,39 +1,36 @@
 """Initialization of Scheduler switch platform."""
-import copy
 import datetime
 import logging
-import voluptuous as vol
-
 
+import attr
 import homeassistant.util.dt as dt_util
+import voluptuous as vol
+from homeassistant.components.alarm_control_panel import AlarmControlPanelState
 from homeassistant.components.switch import DOMAIN as PLATFORM
-from homeassistant.helpers import entity_platform, config_validation as cv
 from homeassistant.const import (
-    STATE_OFF,
-    STATE_ON,
-    STATE_UNAVAILABLE,
     ATTR_ENTITY_ID,
     ATTR_NAME,
     ATTR_TIME,
+    CONF_CONDITIONS,
     CONF_SERVICE,
-    ATTR_SERVICE_DATA,
     CONF_SERVICE_DATA,
-    CONF_CONDITIONS,
+    STATE_OFF,
+    STATE_ON,
+    STATE_UNAVAILABLE,
 )
-from homeassistant.components.alarm_control_panel import AlarmControlPanelState
 from homeassistant.core import callback
-from homeassistant.helpers.entity import ToggleEntity, EntityCategory
-from homeassistant.helpers.event import (
-    async_call_later,
-)
-from homeassistant.util import slugify
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import entity_platform
 from homeassistant.helpers.dispatcher import (
     async_dispatcher_connect,
 )
+from homeassistant.helpers.entity import EntityCategory, ToggleEntity
+from homeassistant.util import slugify
+
 from . import const
+from .actions import ActionHandler
 from .store import ScheduleEntry, async_get_registry
 from .timer import TimerHandler
-from .actions import ActionHandler
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -72,8 +69,8 @@ async def async_setup_entry(hass, _config_entry, async_add_entities):
     coordinator = hass.data[const.DOMAIN]["coordinator"]
 
     @callback
-    def async_add_entity(schedule: ScheduleEntry):
-        """Add switch for Scheduler."""
+    def async_create_entity(schedule: ScheduleEntry):
+        """Create switch for Scheduler."""
 
         schedule_id = schedule.schedule_id
         name = schedule.name
@@ -81,7 +78,7 @@ async def async_setup_entry(hass, _config_entry, async_add_entities):
         # Check if entity already exists to prevent duplicates
         if schedule_id in hass.data[const.DOMAIN]["schedules"]:
             _LOGGER.debug(f"Schedule entity {schedule_id} already exists, skipping creation")
-            return
+            return None
 
         if name and len(slugify(name)):
             entity_id = "{}.schedule_{}".format(PLATFORM, slugify(name))
@@ -90,12 +87,26 @@ async def async_setup_entry(hass, _config_entry, async_add_entities):
 
         entity = ScheduleEntity(coordinator, hass, schedule_id, entity_id)
         hass.data[const.DOMAIN]["schedules"][schedule_id] = entity
-        async_add_entities([entity])
+        return entity
 
-    for entry in coordinator.store.schedules.values():
-        async_add_entity(entry)
+    @callback
+    def async_add_schedule_entities(schedules: list):
+        """Add switches for a batch of schedules in a single call."""
+        entities = [
+            entity
+            for entity in map(async_create_entity, schedules)
+            if entity is not None
+        ]
+        if entities:
+            async_add_entities(entities)
+
+    # compute the timers of all schedules in one go, the entities pick them up
+    coordinator.async_plan_timers()
+    async_add_schedule_entities(list(coordinator.store.schedules.values()))
 
-    async_dispatcher_connect(hass, const.EVENT_ITEM_CREATED, async_add_entity)
+    async_dispatcher_connect(
+        hass, const.EVENT_ITEMS_CREATED, async_add_schedule_entities
+    )
 
     platform = entity_platform.current_platform.get()
 
@@ -122,35 +133,34 @@ class ScheduleEntity(ToggleEntity):
         self._current_slot = None
         self._init = True
         self._tags = []
+        self._written_state = None
 
         self._listeners = [
             async_dispatcher_connect(
-                self.hass, const.EVENT_ITEM_UPDATED, self.async_item_updated
+                self.hass,
+                const.schedule_signal(const.EVENT_ITEM_UPDATED, schedule_id),
+                self.async_item_updated,
             ),
             async_dispatcher_connect(
-                self.hass, const.EVENT_TIMER_UPDATED, self.async_timer_updated
-            ),
-            async_dispatcher_connect(
-                self.hass, const.EVENT_TIMER_FINISHED, self.async_timer_finished
+                self.hass,
+                const.schedule_signal(const.EVENT_TIMER_UPDATED, schedule_id),
+                self.async_timer_updated,
             ),
         ]
 
     @callback
     async def async_item_updated(self, id: str):
         """update internal properties when schedule config was changed"""
-        if id != self.schedule_id:
-            return
-
         store = await async_get_registry(self.hass)
-        self.schedule = store.async_get_schedule(self.schedule_id)
+        self.schedule = store.async_get_schedule_entry(self.schedule_id)
         self._tags = self.coordinator.async_get_tags_for_schedule(self.schedule_id)
 
-        if self.schedule[const.ATTR_ENABLED] and self._state in [
+        if self.schedule.enabled and self._state in [
             STATE_OFF,
             const.STATE_COMPLETED,
         ]:
             self._state = STATE_ON
-        elif not self.schedule[const.ATTR_ENABLED] and self._state not in [
+        elif not self.schedule.enabled and self._state not in [
             STATE_OFF,
             const.STATE_COMPLETED,
         ]:
@@ -161,15 +171,11 @@ class ScheduleEntity(ToggleEntity):
         if self.hass is None:
             return
 
-        self.async_write_ha_state()
-        self.hass.bus.async_fire(const.EVENT)
+        self.async_queue_update(force=True)
 
     @callback
     async def async_timer_updated(self, id: str):
         """update internal properties when schedule timer was changed"""
-        if id != self.schedule_id:
-            return
-
         self._next_entries = self._timer_handler.slot_queue
         self._timestamps = list(
             map(
@@ -179,24 +185,21 @@ class ScheduleEntity(ToggleEntity):
         if self._current_slot is not None and self._timer_handler.current_slot is None:
             # we are leaving a timeslot, stop execution of actions
             if (
-                len(self.schedule[const.ATTR_TIMESLOTS]) == 1
-                and self.schedule[const.ATTR_REPEAT_TYPE] == const.REPEAT_TYPE_REPEAT
+                len(self.schedule.timeslots) == 1
+                and self.schedule.repeat_type == const.REPEAT_TYPE_REPEAT
             ):
                 # allow unavailable entities to restore within 9 mins (+1 minute of triggered duration)
                 await self._action_handler.async_empty_queue(restore_time=9)
             else:
                 await self._action_handler.async_empty_queue()
 
-            if self._current_slot == (
-                len(self.schedule[const.ATTR_TIMESLOTS]) - 1
-            ) and (
-                not self.schedule[const.ATTR_END_DATE]
-                or not date_in_future(self.schedule[const.ATTR_END_DATE])
+            if self._current_slot == (len(self.schedule.timeslots) - 1) and (
+                not self.schedule.end_date or not date_in_future(self.schedule.end_date)
             ):
                 # last timeslot has ended
                 # in case period is assigned, the end date must have been reached as well
 
-                if self.schedule[const.ATTR_REPEAT_TYPE] == const.REPEAT_TYPE_PAUSE:
+                if self.schedule.repeat_type == const.REPEAT_TYPE_PAUSE:
                     _LOGGER.debug(
                         "Scheduler {} has finished the last timeslot, turning off".format(
                             self.schedule_id
@@ -205,7 +208,7 @@ class ScheduleEntity(ToggleEntity):
                     await self.async_turn_off()
                     self._state = const.STATE_COMPLETED
 
-                elif self.schedule[const.ATTR_REPEAT_TYPE] == const.REPEAT_TYPE_SINGLE:
+                elif self.schedule.repeat_type == const.REPEAT_TYPE_SINGLE:
                     _LOGGER.debug(
                         "Scheduler {} has finished the last timeslot, removing".format(
                             self.schedule_id
@@ -223,9 +226,7 @@ class ScheduleEntity(ToggleEntity):
                 if (self._timer_handler._next_trigger - now).total_seconds() < 0:
                     self._state = const.STATE_COMPLETED
                 else:
-                    self._state = (
-                        STATE_ON if self.schedule[const.ATTR_ENABLED] else STATE_OFF
-                    )
+                    self._state = STATE_ON if self.schedule.enabled else STATE_OFF
 
         if self._init:
             # initial startpoint for timer calculated, fire actions if currently overlapping with timeslot
@@ -236,7 +237,7 @@ class ScheduleEntity(ToggleEntity):
                     # calculate the next start of timeslot since the time of shutdown, execute only if this is in the past
                     ts_shutdown = self.coordinator.time_shutdown
                     now = dt_util.as_local(dt_util.utcnow())
-                    start_time = self.schedule[const.ATTR_TIMESLOTS][self._current_slot][const.ATTR_START]
+                    start_time = self.schedule.timeslots[self._current_slot].start
                     start_of_timeslot = self._timer_handler.calculate_timestamp(start_time, ts_shutdown)
                     if start_of_timeslot > now:
                         skip_initial_execution = True
@@ -254,7 +255,7 @@ class ScheduleEntity(ToggleEntity):
                         )
                     )
                 await self._action_handler.async_queue_actions(
-                    self.schedule[const.ATTR_TIMESLOTS][self._current_slot],
+                    attr.asdict(self.schedule.timeslots[self._current_slot]),
                     skip_initial_execution
                 )
             self._init = False
@@ -262,15 +263,10 @@ class ScheduleEntity(ToggleEntity):
         if self.hass is None:
             return
 
-        self.async_write_ha_state()
-        self.hass.bus.async_fire(const.EVENT)
-
-    @callback
-    async def async_timer_finished(self, id: str):
-        """fire actions when timer is finished"""
-        if id != self.schedule_id:
-            return
+        self.async_queue_update()
 
+    async def async_timer_finished(self):
+        """fire actions when timer is finished (called by the coordinator)"""
         if self._state not in [STATE_OFF, const.STATE_COMPLETED]:
 
             self._current_slot = self._timer_handler.current_slot
@@ -281,7 +277,7 @@ class ScheduleEntity(ToggleEntity):
                     )
                 )
                 await self._action_handler.async_queue_actions(
-                    self.schedule[const.ATTR_TIMESLOTS][self._current_slot]
+                    attr.asdict(self.schedule.timeslots[self._current_slot])
                 )
 
         @callback
@@ -292,12 +288,32 @@ class ScheduleEntity(ToggleEntity):
             await self._timer_handler.async_start_timer()
 
         # keep the entity in triggered state for 1 minute, then restart the timer
-        self._timer = async_call_later(self.hass, 60, async_trigger_finished)
+        self._timer = self.coordinator.trigger_engine.async_call_later(
+            60, async_trigger_finished
+        )
         if self._state == STATE_ON:
             self._state = AlarmControlPanelState.TRIGGERED
 
+        self.async_queue_update()
+
+    @callback
+    def async_queue_update(self, force: bool = False):
+        """write the state and fire scheduler_updated (coalesced by the coordinator)"""
+        self.coordinator.async_queue_entity_update(self, force)
+
+    @callback
+    def async_write_state_if_changed(self) -> bool:
+        """write the state, unless it did not change since the last write"""
+        written_state = (self.state, self.name, self.state_attributes, self._timestamps)
+        if written_state == self._written_state:
+            return False
+        self._written_state = written_state
         self.async_write_ha_state()
-        self.hass.bus.async_fire(const.EVENT)
+        return True
+
+    async def async_restart_timer(self):
+        """recalculate the timer (e.g. after the default spread has changed)"""
+        await self._timer_handler.async_restart_timer()
 
     async def async_cancel_timer(self):
         """cancel timer"""
@@ -320,8 +336,8 @@ class ScheduleEntity(ToggleEntity):
     @property
     def name(self) -> str:
         """Return the name of the entity."""
-        if self.schedule and self.schedule[ATTR_NAME]:
-            return self.schedule[ATTR_NAME]
+        if self.schedule and self.schedule.name:
+            return self.schedule.name
         else:
             return "Schedule #{}".format(self.schedule_id)
 
@@ -347,17 +363,17 @@ class ScheduleEntity(ToggleEntity):
 
     @property
     def weekdays(self):
-        return self.schedule[const.ATTR_WEEKDAYS] if self.schedule else None
+        return self.schedule.weekdays if self.schedule else None
 
     @property
     def entities(self):
         entities = []
         if not self.schedule:
             return
-        for timeslot in self.schedule[const.ATTR_TIMESLOTS]:
-            for action in timeslot[const.ATTR_ACTIONS]:
-                if action[ATTR_ENTITY_ID] and action[ATTR_ENTITY_ID] not in entities:
-                    entities.append(action[ATTR_ENTITY_ID])
+        for timeslot in self.schedule.timeslots:
+            for action in timeslot.actions:
+                if action.entity_id and action.entity_id not in entities:
+                    entities.append(action.entity_id)
 
         return entities
 
@@ -367,14 +383,14 @@ class ScheduleEntity(ToggleEntity):
             return
         return [
             {
-                CONF_SERVICE: timeslot["actions"][0][CONF_SERVICE],
+                CONF_SERVICE: timeslot.actions[0].service,
             }
-            if not timeslot["actions"][0][ATTR_SERVICE_DATA]
+            if not timeslot.actions[0].service_data
             else {
-                CONF_SERVICE: timeslot["actions"][0][CONF_SERVICE],
-                CONF_SERVICE_DATA: timeslot["actions"][0][ATTR_SERVICE_DATA],
+                CONF_SERVICE: timeslot.actions[0].service,
+                CONF_SERVICE_DATA: timeslot.actions[0].service_data,
             }
-            for timeslot in self.schedule[const.ATTR_TIMESLOTS]
+            for timeslot in self.schedule.timeslots
         ]
 
     @property
@@ -382,15 +398,11 @@ class ScheduleEntity(ToggleEntity):
         timeslots = []
         if not self.schedule:
             return
-        for timeslot in self.schedule[const.ATTR_TIMESLOTS]:
-            if timeslot[const.ATTR_STOP]:
-                timeslots.append(
-                    "{} - {}".format(
-                        timeslot[const.ATTR_START], timeslot[const.ATTR_STOP]
-                    )
-                )
+        for timeslot in self.schedule.timeslots:
+            if timeslot.stop:
+                timeslots.append("{} - {}".format(timeslot.start, timeslot.stop))
             else:
-                timeslots.append(timeslot[const.ATTR_START])
+                timeslots.append(timeslot.start)
         return timeslots
 
     @property
@@ -431,43 +443,85 @@ class ScheduleEntity(ToggleEntity):
         return self._state not in [STATE_OFF, const.STATE_COMPLETED]
 
     @callback
-    def async_get_entity_state(self):
-        """fetch schedule data for websocket API"""
-        data = copy.copy(self.schedule)
-        if not data:
-            data = {}
+    def async_get_entity_state(self, fields: list = None):
+        """fetch schedule data for websocket API (only the given fields, if provided)"""
+        if fields is not None:
+            return {field: self.async_get_entity_field(field) for field in fields}
+        data = self.coordinator.store.async_get_schedule_data(self.schedule_id)
+        # shallow copy, the cached serialized schedule must not be modified
+        data = dict(data) if data else {}
         data.update(
             {
                 "next_entries": self._next_entries,
                 "timestamps": self._timestamps,
-                "name": self.schedule[ATTR_NAME] if self.schedule else "",
+                "name": self.schedule.name if self.schedule else "",
                 "entity_id": self.entity_id,
                 "tags": self.tags,
             }
         )
         return data
 
+    def async_get_timer_state(self) -> dict:
+        """fetch the upcoming timeslots and their times, as computed by the timer"""
+        if getattr(self, "_timer_handler", None) is None:
+            return None
+        return {
+            const.ATTR_NEXT_ENTRIES: self._timer_handler.slot_queue,
+            const.ATTR_TIMESTAMPS: [
+                timestamp.isoformat() for timestamp in self._timer_handler.timestamps
+            ],
+        }
+
+    def async_get_entity_field(self, field: str):
+        """fetch a single field of the schedule data, without converting the rest"""
+        if field == const.ATTR_NEXT_ENTRIES:
+            return self._next_entries
+        elif field == const.ATTR_TIMESTAMPS:
+            return self._timestamps
+        elif field == ATTR_ENTITY_ID:
+            return self.entity_id
+        elif field == const.ATTR_TAGS:
+            return self.tags
+        elif field == const.ATTR_STATE:
+            return self._state
+        elif field == const.ATTR_NEXT_TRIGGER:
+            if not len(self._next_entries):
+                return None
+            return self._timestamps[self._next_entries[0]]
+        elif self.schedule is None:
+            return "" if field == ATTR_NAME else None
+        elif field == const.ATTR_TIMESLOTS:
+            data = self.coordinator.store.async_get_schedule_data(self.schedule_id)
+            return data[const.ATTR_TIMESLOTS] if data else None
+        return getattr(self.schedule, field)
+
     async def async_added_to_hass(self):
         """Connect to dispatcher listening for entity data notifications."""
         store = await async_get_registry(self.hass)
-        self.schedule = store.async_get_schedule(self.schedule_id)
+        self.schedule = store.async_get_schedule_entry(self.schedule_id)
         self._tags = self.coordinator.async_get_tags_for_schedule(self.schedule_id)
+        self.coordinator.async_register_entity(self)
 
-        self._timer_handler = TimerHandler(self.hass, self.schedule_id)
-        self._action_handler = ActionHandler(self.hass, self.schedule_id)
+        self._handles = self.coordinator.handles.async_create_scope(self.schedule_id)
+        self._timer_handler = TimerHandler(self.hass, self.schedule_id, self._handles)
+        self._action_handler = ActionHandler(self.hass, self.schedule_id, self._handles)
         _LOGGER.debug("added to hass")
 
+    async def async_empty_action_queue(self):
+        """stop executing the actions of the current timeslot"""
+        await self._action_handler.async_empty_queue()
+
     async def async_turn_off(self):
         """turn off a schedule"""
-        if self.schedule[const.ATTR_ENABLED]:
-            await self._action_handler.async_empty_queue()
+        if self.schedule.enabled:
+            await self.async_empty_action_queue()
             self.coordinator.async_edit_schedule(
                 self.schedule_id, {const.ATTR_ENABLED: False}
             )
 
     async def async_turn_on(self):
         """turn on a schedule"""
-        if not self.schedule[const.ATTR_ENABLED]:
+        if not self.schedule.enabled:
             self.coordinator.async_edit_schedule(
                 self.schedule_id, {const.ATTR_ENABLED: True}
             )
@@ -475,10 +529,12 @@ class ScheduleEntity(ToggleEntity):
     async def async_will_remove_from_hass(self):
         """remove entity from hass."""
         _LOGGER.debug("Schedule {} is removed from hass".format(self.schedule_id))
+        self.coordinator.async_unregister_entity(self)
 
         await self.async_cancel_timer()
-        await self._action_handler.async_empty_queue()
+        await self._action_handler.async_unload()
         await self._timer_handler.async_unload()
+        self._handles.async_release()
 
         while len(self._listeners):
             self._listeners.pop()()
@@ -506,7 +562,7 @@ class ScheduleEntity(ToggleEntity):
         await self._action_handler.async_empty_queue()
         await self._timer_handler.async_unload()
 
-        self.async_write_ha_state()
+        self.async_queue_update()
 
     async def async_service_run_action(self, time=None, skip_conditions=False):
         """Manually trigger the execution of the actions of a timeslot"""
@@ -517,11 +573,7 @@ class ScheduleEntity(ToggleEntity):
 
         (slot, ts) = self._timer_handler.current_timeslot(now)
 
-        if (
-            slot is None
-            and time is None
-            and len(self.schedule[const.ATTR_TIMESLOTS]) == 1
-        ):
+        if slot is None and time is None and len(self.schedule.timeslots) == 1:
             slot = 0
 
         if slot is None:
@@ -532,7 +584,7 @@ class ScheduleEntity(ToggleEntity):
             )
             return
 
-        schedule = dict(self.schedule[const.ATTR_TIMESLOTS][slot])
+        schedule = attr.asdict(self.schedule.timeslots[slot])
         if skip_conditions:
             schedule[CONF_CONDITIONS] = []
 
@@ -1,49 +1,158 @@
-import logging
 import datetime
+import hashlib
+import logging
 
-
+import attr
 import homeassistant.util.dt as dt_util
-from homeassistant.const import (
-    WEEKDAYS,
-    STATE_ON,
-    STATE_OFF,
-)
 from homeassistant.core import (
     HomeAssistant,
     callback,
 )
-from homeassistant.helpers.event import (
-    async_track_point_in_time,
-    async_track_state_change_event,
-)
 from homeassistant.helpers.dispatcher import (
     async_dispatcher_connect,
     async_dispatcher_send,
 )
 
-
 from . import const
+from .handles import HANDLE_LISTENER, HANDLE_TIMER, HandleScope
+from .occurrence import (
+    CompiledTimeslot,
+    OccurrenceRule,
+    TimeOfDay,
+    TimeslotIndex,
+    build_occurrence_rule,
+    build_timeslot_index,
+    compile_time,
+    compile_timeslot,
+    next_occurrence,
+    seconds_to_time,
+    time_to_seconds,
+)
 from .store import async_get_registry
+from .sun import NO_SUN_EVENT
 
 _LOGGER = logging.getLogger(__name__)
 
-ATTR_NEXT_RISING = "next_rising"
-ATTR_NEXT_SETTING = "next_setting"
-ATTR_WORKDAYS = "workdays"
+# the timeslot index covers yesterday up to a week ahead
+INDEX_DAYS_BEFORE = 1
+INDEX_DAYS_AFTER = 7
+
+
+def parse_date(value: str) -> datetime.date:
+    """parse the start/end date of a schedule"""
+    return dt_util.parse_date(value) if value else None
+
+
+def spread_offset(schedule_id: str, spread: int) -> int:
+    """deterministic offset within +/- spread seconds for a schedule"""
+    if not spread:
+        return 0
+    digest = hashlib.sha256(schedule_id.encode()).digest()
+    return int.from_bytes(digest[:4], "big") % (2 * spread + 1) - spread
+
+
+def resolve_time(
+    coordinator, time: TimeOfDay, date: datetime.date = None
+) -> datetime.time:
+    """convert a compiled time into a time of day (on a date)"""
+    if not time.has_sun:
+        # fixed time
+        return seconds_to_time(time.seconds)
+
+    # relative to sunrise/sunset
+    ts = None
+    if date is not None:
+        ts = coordinator.sun_ephemeris.async_get_event(time.sun_event, date)
+        if ts is NO_SUN_EVENT:
+            # no sunrise/sunset on this day (polar day/night), skip the day
+            return None
+    if not ts:
+        # fall back to the next sun event of the sun entity
+        ts = coordinator.sun_tracker.async_get_next_event(time.sun_event)
+    if not ts:
+        return None
+    ts = dt_util.as_local(ts)
+    seconds = ts.hour * 3600 + ts.minute * 60 + time.offset
+    # prevent offset to shift the time past the extends of the day
+    return seconds_to_time(min(max(seconds, 0), 86340))
+
+
+def timeslot_index_key(
+    coordinator, rule: OccurrenceRule, today: datetime.date, timeslots: list
+):
+    """the conditions under which a timeslot index remains valid"""
+    key = (rule, today)
+    if any(x.start.has_sun or (x.stop and x.stop.has_sun) for x in timeslots):
+        # sun times depend on the sun entity and the ephemeris
+        key = key + (
+            coordinator.sun_tracker.version,
+            coordinator.sun_ephemeris.version,
+        )
+    return key
+
+
+@attr.s(slots=True, frozen=True)
+class TimerPlan:
+    """Timer data of a schedule, precomputed for seeding its timer handler."""
+
+    entry = attr.ib(default=None)
+    weekdays = attr.ib(type=list, factory=list)
+    start_date = attr.ib(type=datetime.date, default=None)
+    end_date = attr.ib(type=datetime.date, default=None)
+    timeslots = attr.ib(type=[CompiledTimeslot], factory=list)
+    rule = attr.ib(type=OccurrenceRule, default=None)
+    workday_version = attr.ib(type=int, default=None)
+    index = attr.ib(type=TimeslotIndex, default=None)
+
 
+def plan_timers(coordinator, entries) -> dict:
+    """compute the timeslot indexes of many schedules in a single pass
 
-def has_sun(time_str: str):
-    return const.OffsetTimePattern.match(time_str)
+    Compiled timeslots and the calculated times per day are shared between
+    the schedules, such that each distinct time is only calculated once per day.
+    """
+    today = dt_util.as_local(dt_util.utcnow()).date()
+    first_day = today - datetime.timedelta(days=INDEX_DAYS_BEFORE)
+    days = INDEX_DAYS_BEFORE + INDEX_DAYS_AFTER + 1
+    calendar = coordinator.workday_calendar
 
+    compiled = {}
+    cache = {}
 
-def is_same_day(dateA: datetime.datetime, dateB: datetime.datetime):
-    return dateA.date() == dateB.date()
+    def resolve(time: TimeOfDay, date: datetime.date) -> datetime.time:
+        return resolve_time(coordinator, time, date)
 
+    plans = {}
+    for entry in entries:
+        timeslots = [
+            compile_timeslot(
+                {const.ATTR_START: slot.start, const.ATTR_STOP: slot.stop}, compiled
+            )
+            for slot in entry.timeslots
+        ]
 
-def days_until_date(date_string: str, ts: datetime.datetime):
-    date = dt_util.parse_date(date_string)
-    diff = date - ts.date()
-    return diff.days
+        start_date = parse_date(entry.start_date)
+        end_date = parse_date(entry.end_date)
+        rule = build_occurrence_rule(entry.weekdays, start_date, end_date, calendar)
+        plans[entry.schedule_id] = TimerPlan(
+            entry=entry,
+            weekdays=entry.weekdays,
+            start_date=start_date,
+            end_date=end_date,
+            timeslots=timeslots,
+            rule=rule,
+            workday_version=calendar.version,
+            index=build_timeslot_index(
+                timeslot_index_key(coordinator, rule, today, timeslots),
+                rule,
+                timeslots,
+                resolve,
+                first_day,
+                days,
+                cache,
+            ),
+        )
+    return plans
 
 
 def find_closest_from_now(date_arr: list):
@@ -63,19 +172,26 @@ def find_closest_from_now(date_arr: list):
 
 
 class TimerHandler:
-    def __init__(self, hass: HomeAssistant, id: str):
+    def __init__(self, hass: HomeAssistant, id: str, handles: HandleScope):
         """init"""
         self.hass = hass
         self.id = id
+        self.coordinator = hass.data[const.DOMAIN]["coordinator"]
+        self._handles = handles
         self._weekdays = []
         self._start_date = None
         self._end_date = None
         self._timeslots = []
+        self._spread = None
         self._timer = None
         self._next_trigger = None
         self._next_slot = None
         self._sun_tracker = None
+        self._sun_events = set()
         self._workday_tracker = None
+        self._workday_version = None
+        self._rule = None
+        self._index = None
         self._watched_times = []
 
         self.slot_queue = []
@@ -85,26 +201,47 @@ class TimerHandler:
         self.hass.loop.create_task(self.async_reload_data())
 
         @callback
-        async def async_item_updated(id: str):
-            if id == self.id:
-                await self.async_reload_data()
-
-        self._update_listener = async_dispatcher_connect(
-            self.hass, const.EVENT_ITEM_UPDATED, async_item_updated
+        async def async_item_updated(_id: str):
+            await self.async_reload_data()
+
+        self._update_listener = self._handles.async_track(
+            HANDLE_LISTENER,
+            async_dispatcher_connect(
+                self.hass,
+                const.schedule_signal(const.EVENT_ITEM_UPDATED, self.id),
+                async_item_updated,
+            ),
         )
 
     async def async_reload_data(self):
         """load schedule data into timer class object and start timer"""
-        store = await async_get_registry(self.hass)
-        data = store.async_get_schedule(self.id)
-
-        self._weekdays = data[const.ATTR_WEEKDAYS]
-        self._start_date = data[const.ATTR_START_DATE]
-        self._end_date = data[const.ATTR_END_DATE]
-        self._timeslots = [
-            dict((k, slot[k]) for k in [const.ATTR_START, const.ATTR_STOP] if k in slot)
-            for slot in data[const.ATTR_TIMESLOTS]
-        ]
+        plan = self.coordinator.async_pop_timer_plan(self.id)
+        if plan is not None:
+            # timer data was precomputed together with the other schedules
+            self._weekdays = plan.weekdays
+            self._start_date = plan.start_date
+            self._end_date = plan.end_date
+            self._timeslots = plan.timeslots
+            self._spread = plan.entry.spread
+            self._rule = plan.rule
+            self._workday_version = plan.workday_version
+            self._index = plan.index
+        else:
+            store = await async_get_registry(self.hass)
+            entry = store.async_get_schedule_entry(self.id)
+
+            self._weekdays = entry.weekdays
+            self._start_date = parse_date(entry.start_date)
+            self._end_date = parse_date(entry.end_date)
+            self._timeslots = [
+                compile_timeslot(
+                    {const.ATTR_START: slot.start, const.ATTR_STOP: slot.stop}
+                )
+                for slot in entry.timeslots
+            ]
+            self._spread = entry.spread
+            self._rule = None
+            self._index = None
         await self.async_start_timer()
 
     async def async_unload(self):
@@ -113,15 +250,24 @@ class TimerHandler:
         self._update_listener()
         self._next_trigger = None
 
+    @property
+    def spread(self) -> int:
+        """offset in seconds by which the start of timeslots is spread"""
+        return spread_offset(
+            self.id,
+            self._spread if self._spread is not None else self.coordinator.spread,
+        )
+
     async def async_start_timer(self):
         [current_slot, timestamp_end] = self.current_timeslot()
         [next_slot, timestamp_next] = self.next_timeslot()
 
+        # the times which determine the timer, with the offset by which they are spread
         self._watched_times = []
         if timestamp_next is not None:
-            self._watched_times.append(self._timeslots[next_slot][const.ATTR_START])
+            self._watched_times.append((self._timeslots[next_slot].start, self.spread))
         if timestamp_end is not None:
-            self._watched_times.append(self._timeslots[current_slot][const.ATTR_STOP])
+            self._watched_times.append((self._timeslots[current_slot].stop, 0))
 
         # the next trigger time is next slot or end of current slot (whichever comes first)
         timestamp = find_closest_from_now([timestamp_end, timestamp_next])
@@ -151,14 +297,27 @@ class TimerHandler:
                     )
                 )
             else:
-                self._timer = async_track_point_in_time(
-                    self.hass, self.async_timer_finished, timestamp
+                self._timer = self._handles.async_track(
+                    HANDLE_TIMER,
+                    self.coordinator.trigger_engine.async_track_point_in_time(
+                        self.async_timer_finished, timestamp
+                    ),
                 )
                 _LOGGER.debug("Timer of {} set for {}".format(self.id, timestamp))
                 await self.async_start_workday_tracker()
 
+        async_dispatcher_send(
+            self.hass,
+            const.schedule_signal(const.EVENT_TIMER_UPDATED, self.id),
+            self.id,
+        )
         async_dispatcher_send(self.hass, const.EVENT_TIMER_UPDATED, self.id)
 
+    async def async_restart_timer(self):
+        """recalculate the timer if it is running"""
+        if self._timer:
+            await self.async_start_timer()
+
     async def async_stop_timer(self):
         """stop the timer"""
         if self._timer:
@@ -169,22 +328,27 @@ class TimerHandler:
 
     async def async_start_sun_tracker(self):
         """check for changes in the sun sensor"""
-        if (
-            self._next_trigger is not None
-            and any(has_sun(x) for x in self._watched_times)
-        ) or (
-            self._next_trigger is None
-            and all(has_sun(x[const.ATTR_START]) for x in self._timeslots)
-        ):
-            # install sun tracker for updating timer when sun changes
+        if self._next_trigger is not None:
+            sun_events = set(
+                x.sun_event for (x, _spread) in self._watched_times if x.has_sun
+            )
+        elif all(x.start.has_sun for x in self._timeslots):
             # initially the time calculation may fail due to the sun entity being unavailable
+            sun_events = set(x.start.sun_event for x in self._timeslots)
+        else:
+            sun_events = set()
 
-            if self._sun_tracker is not None:
+        if sun_events:
+            # install sun tracker for updating timer when sun changes
+
+            if self._sun_tracker is not None and self._sun_events == sun_events:
                 # the tracker is already running
                 return
+            # the tracked sun events have changed, replace the tracker
+            await self.async_stop_sun_tracker()
 
             @callback
-            async def async_sun_updated(_event):
+            async def async_sun_updated():
                 """the sun entity was updated"""
                 # sun entity changed
                 if self._next_trigger is None:
@@ -192,7 +356,8 @@ class TimerHandler:
                     await self.async_start_timer()
                     return
                 ts = find_closest_from_now(
-                    self.calculate_timestamp(x) for x in self._watched_times
+                    self.calculate_spread_timestamp(x, spread)
+                    for (x, spread) in self._watched_times
                 )
                 if not ts or not self._next_trigger:
                     # sun entity became unavailable (or other corner case)
@@ -206,8 +371,12 @@ class TimerHandler:
                     # only reschedule if this doesnt cause the timer to shift to another hour (due to DST change)
                     await self.async_start_timer()
 
-            self._sun_tracker = async_track_state_change_event(
-                self.hass, const.SUN_ENTITY, async_sun_updated
+            self._sun_events = sun_events
+            self._sun_tracker = self._handles.async_track(
+                HANDLE_LISTENER,
+                self.coordinator.sun_tracker.async_subscribe(
+                    self.id, sun_events, async_sun_updated
+                ),
             )
         else:
             # clear existing tracker
@@ -221,10 +390,7 @@ class TimerHandler:
 
     async def async_start_workday_tracker(self):
         """check for changes in the workday sensor"""
-        if (
-            const.DAY_TYPE_WORKDAY in self._weekdays
-            or const.DAY_TYPE_WEEKEND in self._weekdays
-        ):
+        if self.uses_workdays:
             # install tracker for updating timer when workday sensor changes
 
             if self._workday_tracker is not None:
@@ -232,8 +398,11 @@ class TimerHandler:
                 return
 
             @callback
-            async def async_workday_updated():
-                """the workday sensor was updated"""
+            async def async_workday_updated(version: int):
+                """the workday calendar was updated"""
+                if version == self._workday_version:
+                    # the timer was already calculated with this calendar
+                    return
                 [current_slot, timestamp_end] = self.current_timeslot()
                 [next_slot, timestamp_next] = self.next_timeslot()
                 ts_next = find_closest_from_now([timestamp_end, timestamp_next])
@@ -249,8 +418,11 @@ class TimerHandler:
                         # only reschedule if the difference is at least a minute
                         await self.async_start_timer()
 
-            self._workday_tracker = async_dispatcher_connect(
-                self.hass, const.EVENT_WORKDAY_SENSOR_UPDATED, async_workday_updated
+            self._workday_tracker = self._handles.async_track(
+                HANDLE_LISTENER,
+                async_dispatcher_connect(
+                    self.hass, const.EVENT_WORKDAY_SENSOR_UPDATED, async_workday_updated
+                ),
             )
         else:
             # clear existing tracker
@@ -270,7 +442,7 @@ class TimerHandler:
             _LOGGER.debug(
                 "Timer {} has reached slot {}".format(self.id, self.current_slot)
             )
-            async_dispatcher_send(self.hass, const.EVENT_TIMER_FINISHED, self.id)
+            self.coordinator.async_queue_timer_finished(self.id)
             # don't automatically reset, wait for external reset after 1 minute
             # await self.async_start_timer()
             await self.async_stop_timer()
@@ -281,148 +453,115 @@ class TimerHandler:
             )
             await self.async_start_timer()
 
+    @property
+    def uses_workdays(self) -> bool:
+        """check if the schedule depends on the workday calendar"""
+        return (
+            const.DAY_TYPE_WORKDAY in self._weekdays
+            or const.DAY_TYPE_WEEKEND in self._weekdays
+        )
+
+    def occurrence_rule(self) -> OccurrenceRule:
+        """collect the days on which the schedule is allowed to trigger"""
+        calendar = self.coordinator.workday_calendar
+        if self._rule is not None and (
+            not self.uses_workdays or self._workday_version == calendar.version
+        ):
+            return self._rule
+
+        self._workday_version = calendar.version
+        self._rule = build_occurrence_rule(
+            self._weekdays, self._start_date, self._end_date, calendar
+        )
+        return self._rule
+
     def day_in_weekdays(self, ts: datetime.datetime) -> bool:
         """check if the day of a datetime object is in the allowed list of days"""
-        day = WEEKDAYS[ts.weekday()]
-        workday_sensor = self.hass.states.get(const.WORKDAY_ENTITY)
+        return self.occurrence_rule().day_allowed(ts.date())
 
-        if (
-            workday_sensor
-            and workday_sensor.state in [STATE_ON, STATE_OFF]
-            and is_same_day(ts, dt_util.as_local(dt_util.utcnow()))
-        ):
-            # state of workday sensor is used for evaluating workday vs weekend
-            if const.DAY_TYPE_WORKDAY in self._weekdays:
-                return workday_sensor.state == STATE_ON
-            elif const.DAY_TYPE_WEEKEND in self._weekdays:
-                return workday_sensor.state == STATE_OFF
-
-        if workday_sensor and ATTR_WORKDAYS in workday_sensor.attributes:
-            # workday sensor defines a list of workdays
-            workday_list = workday_sensor.attributes[ATTR_WORKDAYS]
-            weekend_list = [e for e in WEEKDAYS if e not in workday_list]
-        else:
-            # assume workdays are mon-fri
-            workday_list = WEEKDAYS[0:5]
-            weekend_list = WEEKDAYS[5:7]
-
-        if const.DAY_TYPE_DAILY in self._weekdays or not len(self._weekdays):
-            return True
-        elif const.DAY_TYPE_WORKDAY in self._weekdays and day in workday_list:
-            return True
-        elif const.DAY_TYPE_WEEKEND in self._weekdays and day in weekend_list:
-            return True
-        return day in self._weekdays
+    def resolve_time(
+        self, time: TimeOfDay, date: datetime.date = None
+    ) -> datetime.time:
+        """convert a compiled time into a time of day (on a date)"""
+        return resolve_time(self.coordinator, time, date)
 
     def calculate_timestamp(
         self,
-        time_str,
+        time: TimeOfDay,
         now: datetime.datetime = None,
-        iteration: int = 0,
-        reverse_direction: bool = False,
     ) -> datetime.datetime:
-        """calculate the next occurence of a time string"""
-        if time_str is None:
+        """calculate the next occurence of a time"""
+        if time is None:
             return None
+        if isinstance(time, str):
+            time = compile_time(time)
         if now is None:
             now = dt_util.as_local(dt_util.utcnow())
 
-        res = has_sun(time_str)
-        if not res:
-            # fixed time
-            time = dt_util.parse_time(time_str)
-            ts = dt_util.find_next_time_expression_time(
-                now, [time.second], [time.minute], [time.hour]
-            )
-        else:
-            # relative to sunrise/sunset
-            sun = self.hass.states.get(const.SUN_ENTITY)
-            if not sun:
-                return None
-            ts = None
-            if (
-                res.group(1) == const.SUN_EVENT_SUNRISE
-                and ATTR_NEXT_RISING in sun.attributes
-            ):
-                ts = dt_util.parse_datetime(sun.attributes[ATTR_NEXT_RISING])
-            elif (
-                res.group(1) == const.SUN_EVENT_SUNSET
-                and ATTR_NEXT_SETTING in sun.attributes
-            ):
-                ts = dt_util.parse_datetime(sun.attributes[ATTR_NEXT_SETTING])
-            if not ts:
-                return None
-            ts = dt_util.as_local(ts)
-            ts = ts.replace(second=0)
-            time_sun = datetime.timedelta(
-                hours=ts.hour, minutes=ts.minute, seconds=ts.second
-            )
-            offset = dt_util.parse_time(res.group(3))
-            offset = datetime.timedelta(
-                hours=offset.hour, minutes=offset.minute, seconds=offset.second
+        if not time.has_sun:
+            return next_occurrence(
+                self.occurrence_rule(), seconds_to_time(time.seconds), now
             )
-            if res.group(2) == "-":
-                if (time_sun - offset).total_seconds() >= 0:
-                    ts = ts - offset
-                else:
-                    # prevent offset to shift the time past the extends of the day
-                    ts = ts.replace(hour=0, minute=0, second=0)
-            else:
-                if (time_sun + offset).total_seconds() <= 86340:
-                    ts = ts + offset
-                else:
-                    # prevent offset to shift the time past the extends of the day
-                    ts = ts.replace(hour=23, minute=59, second=0)
-            ts = dt_util.find_next_time_expression_time(
-                now, [ts.second], [ts.minute], [ts.hour]
-            )
-
-        time_delta = datetime.timedelta(seconds=1)
-
-        if self.day_in_weekdays(ts) and (
-            (ts - now).total_seconds() > 0 or iteration > 0
+        elif (
+            not self.coordinator.sun_ephemeris.ready and self.resolve_time(time) is None
         ):
+            # sun entity is not available (yet)
+            return None
 
-            if self._start_date and days_until_date(self._start_date, ts) > 0:
-                # start date is in the future, jump to start date
-                end_of_day = ts.replace(hour=0, minute=0, second=0, microsecond=0) + datetime.timedelta(days=1)
-                days_delta = days_until_date(self._start_date, end_of_day)
-                if days_delta:
-                    time_delta = datetime.timedelta(days=days_delta)
-
-            elif self._end_date and days_until_date(self._end_date, ts) < 0:
-                # end date is in the past, jump to end date
-                time_delta = datetime.timedelta(
-                    days=days_until_date(self._end_date, ts)
-                )
-                reverse_direction = True
-
-            else:
-                # date restrictions are met
-                return ts
-        elif reverse_direction:
-            time_delta = datetime.timedelta(days=-1)
-
-        # calculate next timestamp
-        next_day = dt_util.find_next_time_expression_time(
-            now + time_delta, [0], [0], [0]
-        )
-        if iteration > 15:
-            _LOGGER.warning(
-                "failed to calculate next timeslot for schedule {}".format(self.id)
+        def resolve(date: datetime.date) -> datetime.time:
+            return self.resolve_time(time, date)
+
+        return next_occurrence(self.occurrence_rule(), resolve, now)
+
+    def timeslot_index(self):
+        """sorted start and stop times of the timeslots around today"""
+        rule = self.occurrence_rule()
+        today = dt_util.as_local(dt_util.utcnow()).date()
+        key = timeslot_index_key(self.coordinator, rule, today, self._timeslots)
+        if self._index is None or self._index.key != key:
+            self._index = build_timeslot_index(
+                key,
+                rule,
+                self._timeslots,
+                self.resolve_time,
+                today - datetime.timedelta(days=INDEX_DAYS_BEFORE),
+                INDEX_DAYS_BEFORE + INDEX_DAYS_AFTER + 1,
             )
-            return None
-        return self.calculate_timestamp(
-            time_str, next_day, iteration + 1, reverse_direction
+        return self._index
+
+    def calculate_spread_timestamp(
+        self, time: TimeOfDay, spread: int, now: datetime.datetime = None
+    ) -> datetime.datetime:
+        """calculate the next occurence of a time which is shifted by spread seconds"""
+        if now is None:
+            now = dt_util.as_local(dt_util.utcnow())
+        offset = datetime.timedelta(seconds=spread)
+        ts = self.calculate_timestamp(time, now - offset)
+        return ts + offset if ts is not None else None
+
+    def calculate_start(self, slot: int, after: datetime.datetime) -> datetime.datetime:
+        """calculate the first (spread) start of a timeslot after a point in time"""
+        return self.calculate_spread_timestamp(
+            self._timeslots[slot].start, self.spread, after
         )
 
     def next_timeslot(self):
         """calculate the closest timeslot from now"""
         now = dt_util.as_local(dt_util.utcnow())
+
+        # the start of the timeslots is shifted to spread the load of many schedules
+        offset = datetime.timedelta(seconds=self.spread)
+        next_starts = self.timeslot_index().next_starts(now - offset)
+        if len(next_starts) == len(self._timeslots):
+            # all timeslots have a start within the index
+            self.slot_queue = [slot for (slot, _ts) in next_starts]
+            self.timestamps = [ts + offset for (_slot, ts) in sorted(next_starts)]
+            (slot, ts) = next_starts[0]
+            return (slot, ts + offset)
+
         # calculate next start of all timeslots
         timestamps = [
-            self.calculate_timestamp(slot[const.ATTR_START], now)
-            for slot in self._timeslots
+            self.calculate_start(slot, now) for slot in range(len(self._timeslots))
         ]
 
         # calculate timeslot that will start soonest (or closest in the past)
@@ -450,29 +589,39 @@ class TimerHandler:
         if now is None:
             now = dt_util.as_local(dt_util.utcnow())
 
-        def unwrap_end_of_day(time_str: str):
-            if time_str == "00:00:00":
-                return "23:59:59"
+        offset = datetime.timedelta(seconds=self.spread)
+        index = self.timeslot_index()
+        next_stop = index.next_stop(now)
+        if next_stop is not None:
+            # the timeslot that will end soonest is found in the index
+            (slot, stop) = next_stop
+            start = index.next_start_of_slot(
+                slot, stop - datetime.timedelta(days=1) - offset
+            )
+            if start is not None:
+                start = start + offset
             else:
-                return time_str
+                start = self.calculate_start(slot, stop - datetime.timedelta(days=1))
+            if start is not None and start < now:
+                # timeslot is currently overlapping
+                return (slot, stop if self._timeslots[slot].stop is not None else None)
+            return (None, None)
 
         # calculate next stop of all timeslots
         timestamps = []
         for slot in self._timeslots:
-            if slot[const.ATTR_STOP] is not None:
-                timestamps.append(
-                    self.calculate_timestamp(
-                        unwrap_end_of_day(slot[const.ATTR_STOP]), now
-                    )
-                )
+            if slot.stop is not None:
+                timestamps.append(self.calculate_timestamp(slot.stop, now))
             else:
-                ts = self.calculate_timestamp(slot[const.ATTR_START], now)
+                ts = self.calculate_timestamp(slot.start, now)
                 if ts is None:
                     timestamps.append(None)
                 else:
                     ts = ts + datetime.timedelta(minutes=1)
                     timestamps.append(
-                        self.calculate_timestamp(ts.strftime("%H:%M:%S"), now)
+                        self.calculate_timestamp(
+                            TimeOfDay(seconds=time_to_seconds(ts.time())), now
+                        )
                     )
 
         # calculate timeslot that will end soonest
@@ -491,9 +640,8 @@ class TimerHandler:
                 # end of timeslot is in the past
                 return (None, None)
 
-            start = self.calculate_timestamp(
-                self._timeslots[next_slot_end][const.ATTR_START],
-                stop - datetime.timedelta(days=1),
+            start = self.calculate_start(
+                next_slot_end, stop - datetime.timedelta(days=1)
             )
 
             if start is not None:
@@ -503,7 +651,7 @@ class TimerHandler:
                     return (
                         next_slot_end,
                         stop
-                        if self._timeslots[next_slot_end][const.ATTR_STOP] is not None
+                        if self._timeslots[next_slot_end].stop is not None
                         else None,
                     )
         return (None, None)
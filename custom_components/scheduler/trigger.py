@@ -0,0 +1,209 @@
+import asyncio
+import datetime
+import heapq
+import itertools
+import logging
+import time
+
+import homeassistant.util.dt as dt_util
+from homeassistant.core import (
+    HassJob,
+    HomeAssistant,
+    callback,
+)
+from homeassistant.helpers.event import async_track_point_in_utc_time
+
+_LOGGER = logging.getLogger(__name__)
+
+# position of the fields in a heap entry
+ENTRY_TIMESTAMP = 0
+ENTRY_SEQUENCE = 1
+ENTRY_JOB = 2
+ENTRY_POINT_IN_TIME = 3
+
+# rebuild the heap when the number of cancelled entries grows beyond this
+COMPACT_THRESHOLD = 64
+
+
+class TriggerEngine:
+    """Shared trigger engine for all scheduler timers.
+
+    Pending triggers are kept in a min-heap ordered by their point in time,
+    only a single HA timer is registered for the earliest deadline.
+    Triggers which are due in the same second are processed as one batch.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        """init"""
+        self.hass = hass
+        self._heap = []
+        self._sequence = itertools.count()
+        self._active = 0
+        self._timer = None
+        self._timer_timestamp = None
+        self._batch_listeners = []
+
+        self.batch_count = 0
+        self.last_batch_size = 0
+        self.largest_batch_size = 0
+        self.last_batch_duration = 0.0
+        self.longest_batch_duration = 0.0
+
+    @property
+    def active_triggers(self) -> int:
+        """number of triggers waiting to fire"""
+        return self._active
+
+    @property
+    def active_timers(self) -> int:
+        """number of timers registered in the HA event loop"""
+        return 1 if self._timer else 0
+
+    @callback
+    def async_track_point_in_time(self, action, point_in_time: datetime.datetime):
+        """add a trigger for a point in time, returns a callback to cancel it"""
+        entry = [
+            dt_util.as_timestamp(point_in_time),
+            next(self._sequence),
+            HassJob(action),
+            point_in_time,
+        ]
+        heapq.heappush(self._heap, entry)
+        self._active += 1
+        self._async_update_timer()
+
+        @callback
+        def async_cancel():
+            """cancel the trigger (lazily removed from the heap)"""
+            if entry[ENTRY_JOB] is None:
+                return
+            entry[ENTRY_JOB] = None
+            self._active -= 1
+            self._async_update_timer()
+
+        return async_cancel
+
+    @callback
+    def async_call_later(self, delay: float, action):
+        """add a trigger for a delay in seconds, returns a callback to cancel it"""
+        point_in_time = dt_util.as_local(dt_util.utcnow()) + datetime.timedelta(
+            seconds=delay
+        )
+        return self.async_track_point_in_time(action, point_in_time)
+
+    @callback
+    def async_add_batch_listener(self, action):
+        """call an action after each batch of triggers, returns a remove callback"""
+        job = HassJob(action)
+        self._batch_listeners.append(job)
+
+        @callback
+        def async_remove():
+            if job in self._batch_listeners:
+                self._batch_listeners.remove(job)
+
+        return async_remove
+
+    @callback
+    def async_unload(self):
+        """cancel all pending triggers"""
+        for entry in self._heap:
+            entry[ENTRY_JOB] = None
+        self._heap = []
+        self._active = 0
+        self._async_update_timer()
+
+    @callback
+    def _async_update_timer(self):
+        """make sure the HA timer is set for the earliest deadline"""
+        heap = self._heap
+        while heap and heap[0][ENTRY_JOB] is None:
+            heapq.heappop(heap)
+
+        if len(heap) - self._active > max(COMPACT_THRESHOLD, self._active):
+            self._heap = heap = [e for e in heap if e[ENTRY_JOB] is not None]
+            heapq.heapify(heap)
+
+        timestamp = heap[0][ENTRY_TIMESTAMP] if heap else None
+        if timestamp == self._timer_timestamp:
+            return
+
+        if self._timer:
+            self._timer()
+            self._timer = None
+        self._timer_timestamp = timestamp
+
+        if timestamp is not None:
+            self._timer = async_track_point_in_utc_time(
+                self.hass,
+                self._async_timer_finished,
+                dt_util.utc_from_timestamp(timestamp),
+            )
+
+    @callback
+    def _async_timer_finished(self, now: datetime.datetime):
+        """the HA timer is finished, dispatch all triggers that are due"""
+        self._timer = None
+        self._timer_timestamp = None
+
+        deadline = max(dt_util.as_timestamp(now), dt_util.utcnow().timestamp())
+        due = []
+        heap = self._heap
+        while heap and (
+            heap[0][ENTRY_JOB] is None or heap[0][ENTRY_TIMESTAMP] <= deadline
+        ):
+            entry = heapq.heappop(heap)
+            if entry[ENTRY_JOB] is None:
+                continue
+            due.append(
+                (entry[ENTRY_TIMESTAMP], entry[ENTRY_JOB], entry[ENTRY_POINT_IN_TIME])
+            )
+            entry[ENTRY_JOB] = None
+            self._active -= 1
+
+        self._async_update_timer()
+
+        batches = []
+        for entry in due:
+            if batches and int(batches[-1][0][0]) == int(entry[0]):
+                batches[-1].append(entry)
+            else:
+                batches.append([entry])
+        if batches:
+            self.hass.async_create_task(self._async_process_batches(batches))
+
+    async def _async_process_batches(self, batches: list):
+        """run the triggers per batch, in order of time"""
+        for batch in batches:
+            start = time.monotonic()
+            await self._async_wait(
+                [
+                    self.hass.async_run_hass_job(job, point_in_time)
+                    for (_timestamp, job, point_in_time) in batch
+                ]
+            )
+            await self._async_wait(
+                [
+                    self.hass.async_run_hass_job(job)
+                    for job in list(self._batch_listeners)
+                ]
+            )
+            duration = time.monotonic() - start
+
+            self.batch_count += 1
+            self.last_batch_size = len(batch)
+            self.largest_batch_size = max(self.largest_batch_size, len(batch))
+            self.last_batch_duration = duration
+            self.longest_batch_duration = max(self.longest_batch_duration, duration)
+            _LOGGER.debug(
+                "Processed batch of {} triggers in {:.3f}s".format(len(batch), duration)
+            )
+
+    async def _async_wait(self, results: list):
+        """wait for the jobs that were started as task"""
+        tasks = [x for x in results if x is not None]
+        if not tasks:
+            return
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, Exception):
+                _LOGGER.error("Error while processing trigger", exc_info=result)
@@ -1,15 +1,18 @@
+import bisect
 import logging
 
 import voluptuous as vol
-from homeassistant.helpers import config_validation as cv
 from homeassistant.components import websocket_api
 from homeassistant.components.http import HomeAssistantView
 from homeassistant.components.http.data_validator import RequestDataValidator
+from homeassistant.components.websocket_api import async_register_command, decorators
+from homeassistant.const import ATTR_ENTITY_ID, ATTR_NAME, WEEKDAYS
 from homeassistant.core import callback
-from homeassistant.components.websocket_api import decorators, async_register_command
+from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
 from . import const
-from .store import ScheduleEntry
+from .feed import EventBuffer, EventFilter
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -94,6 +97,51 @@ def websocket_get_schedule_item(hass, connection, msg):
     connection.send_result(msg["id"], data)
 
 
+@callback
+def websocket_list_schedules(hass, connection, msg):
+    """Publish a page of the (filtered) scheduler list."""
+    coordinator = hass.data[const.DOMAIN]["coordinator"]
+    schedule_ids = coordinator.async_find_schedules(
+        tags=msg.get(const.ATTR_TAGS),
+        entity_ids=msg.get(ATTR_ENTITY_ID),
+        enabled=msg.get(const.ATTR_ENABLED),
+        weekdays=msg.get(const.ATTR_WEEKDAYS),
+    )
+    start = msg.get(const.ATTR_OFFSET, 0)
+    if const.ATTR_CURSOR in msg:
+        position = coordinator.async_get_schedule_position(msg[const.ATTR_CURSOR])
+        if position is None:
+            connection.send_error(
+                msg["id"],
+                websocket_api.ERR_NOT_FOUND,
+                "Cursor not found: {}".format(msg[const.ATTR_CURSOR]),
+            )
+            return
+        # the cursor may have been deleted or filtered out, continue after its position
+        start = bisect.bisect_right(
+            schedule_ids, position, key=coordinator.async_get_schedule_position
+        )
+    end = len(schedule_ids)
+    if const.ATTR_LIMIT in msg:
+        end = min(start + msg[const.ATTR_LIMIT], end)
+    page = schedule_ids[start:end]
+
+    fields = msg.get(const.ATTR_FIELDS)
+    connection.send_result(
+        msg["id"],
+        {
+            const.ATTR_SCHEDULES: [
+                coordinator.async_get_schedule(schedule_id, fields)
+                for schedule_id in page
+            ],
+            const.ATTR_TOTAL: len(schedule_ids),
+            const.ATTR_NEXT_CURSOR: page[-1]
+            if page and end < len(schedule_ids)
+            else None,
+        },
+    )
+
+
 @callback
 def websocket_get_tags(hass, connection, msg):
     """Publish tag list data."""
@@ -102,10 +150,87 @@ def websocket_get_tags(hass, connection, msg):
     connection.send_result(msg["id"], tags)
 
 
+@callback
+def websocket_add_schedules(hass, connection, msg):
+    """Create a batch of schedules."""
+    coordinator = hass.data[const.DOMAIN]["coordinator"]
+    entries = coordinator.async_create_schedules(
+        [dict(item) for item in msg[const.ATTR_SCHEDULES]]
+    )
+    connection.send_result(
+        msg["id"],
+        [
+            {const.ATTR_SCHEDULE_ID: entry.schedule_id, ATTR_NAME: entry.name}
+            for entry in entries
+        ],
+    )
+
+
+@callback
+def async_check_schedule_ids(hass, connection, msg, schedule_ids: list) -> bool:
+    """Send an error if any of the schedules does not exist or is given twice."""
+    schedules = hass.data[const.DOMAIN]["schedules"]
+    errors = []
+    seen = set()
+    for schedule_id in schedule_ids:
+        if schedule_id not in schedules:
+            errors.append("Schedule not found: {}".format(schedule_id))
+        elif schedule_id in seen:
+            errors.append("Schedule given more than once: {}".format(schedule_id))
+        seen.add(schedule_id)
+    if errors:
+        connection.send_error(msg["id"], websocket_api.ERR_NOT_FOUND, ", ".join(errors))
+        return False
+    return True
+
+
+@callback
+def websocket_edit_schedules(hass, connection, msg):
+    """Edit a batch of schedules."""
+    coordinator = hass.data[const.DOMAIN]["coordinator"]
+    items = msg[const.ATTR_SCHEDULES]
+    schedule_ids = [item[const.ATTR_SCHEDULE_ID] for item in items]
+    if not async_check_schedule_ids(hass, connection, msg, schedule_ids):
+        return
+    changes = {}
+    for item in items:
+        data = dict(item)
+        del data[const.ATTR_SCHEDULE_ID]
+        changes[item[const.ATTR_SCHEDULE_ID]] = data
+    coordinator.async_edit_schedules(changes)
+    connection.send_result(
+        msg["id"],
+        [{const.ATTR_SCHEDULE_ID: schedule_id} for schedule_id in schedule_ids],
+    )
+
+
+@callback
+def websocket_remove_schedules(hass, connection, msg):
+    """Remove a batch of schedules."""
+    coordinator = hass.data[const.DOMAIN]["coordinator"]
+    schedule_ids = msg[const.ATTR_SCHEDULE_IDS]
+    if not async_check_schedule_ids(hass, connection, msg, schedule_ids):
+        return
+    coordinator.async_delete_schedules(schedule_ids)
+    connection.send_result(
+        msg["id"],
+        [{const.ATTR_SCHEDULE_ID: schedule_id} for schedule_id in schedule_ids],
+    )
+
+
 @callback
 @decorators.websocket_command(
     {
         vol.Required("type"): const.EVENT,
+        vol.Optional(const.ATTR_DELTAS, default=False): cv.boolean,
+        vol.Optional(const.ATTR_BATCH_INTERVAL): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=const.BATCH_INTERVAL_MAX)
+        ),
+        vol.Optional(const.ATTR_BATCH_SIZE, default=const.BATCH_SIZE_DEFAULT): vol.All(
+            vol.Coerce(int), vol.Range(min=1)
+        ),
+        vol.Optional(const.ATTR_SCHEDULE_IDS): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(const.ATTR_TAGS): vol.All(cv.ensure_list, [cv.string]),
     }
 )
 @decorators.async_response
@@ -113,31 +238,88 @@ async def handle_subscribe_updates(hass, connection, msg):
     """subscribe listeners when frontend connection is opened"""
 
     listeners = []
+    send_message = connection.send_message
+    event_filter = None
+
+    if msg.get(const.ATTR_BATCH_INTERVAL):
+        # events are buffered and sent together
+        buffer = EventBuffer(
+            hass,
+            connection,
+            msg["id"],
+            msg[const.ATTR_BATCH_INTERVAL],
+            msg[const.ATTR_BATCH_SIZE],
+        )
+        send_message = buffer.async_send_message
+        listeners.append(buffer.async_cancel)
+
+    if const.ATTR_SCHEDULE_IDS in msg or const.ATTR_TAGS in msg:
+        # only events of the requested schedules are passed
+        event_filter = EventFilter(
+            hass.data[const.DOMAIN]["coordinator"],
+            msg.get(const.ATTR_SCHEDULE_IDS),
+            msg.get(const.ATTR_TAGS),
+            send_message,
+        )
+        send_message = event_filter.async_send_message
+
+    def unsubscribe_listeners():
+        """unsubscribe listeners when frontend connection closes"""
+        while len(listeners):
+            listeners.pop()()
+
+    if msg[const.ATTR_DELTAS]:
+        # events carry the changed data and a revision number
+        coordinator = hass.data[const.DOMAIN]["coordinator"]
+
+        @callback
+        def async_handle_change(change: dict):
+            """pass data to frontend when backend changes"""
+            send_message({"id": msg["id"], "type": "event", "event": change})
+
+        listeners.append(coordinator.change_feed.async_subscribe(async_handle_change))
+        connection.subscriptions[msg["id"]] = unsubscribe_listeners
+        connection.send_result(
+            msg["id"], {const.ATTR_REVISION: coordinator.change_feed.revision}
+        )
+        return
 
     @callback
-    def async_handle_event_item_created(schedule: ScheduleEntry):
-        """pass data to frontend when backend changes"""
-        connection.send_message(
-            {
-                "id": msg["id"],
-                "type": "event",
-                "event": {  # data to pass with event
-                    "event": const.EVENT_ITEM_CREATED,
-                    "schedule_id": schedule.schedule_id,
-                },
-            }
+    def async_skip(event_type: str, schedule_id: str) -> bool:
+        """whether an event is filtered out, such that no message needs to be built"""
+        return event_filter is not None and event_filter.async_rejects(
+            event_type, schedule_id
         )
 
+    @callback
+    def async_handle_event_items_created(schedules: list):
+        """pass data to frontend when backend changes"""
+        for schedule in schedules:
+            if async_skip(const.EVENT_ITEM_CREATED, schedule.schedule_id):
+                continue
+            send_message(
+                {
+                    "id": msg["id"],
+                    "type": "event",
+                    "event": {  # data to pass with event
+                        "event": const.EVENT_ITEM_CREATED,
+                        "schedule_id": schedule.schedule_id,
+                    },
+                }
+            )
+
     listeners.append(
         async_dispatcher_connect(
-            hass, const.EVENT_ITEM_CREATED, async_handle_event_item_created
+            hass, const.EVENT_ITEMS_CREATED, async_handle_event_items_created
         )
     )
 
     @callback
     def async_handle_event_item_updated(schedule_id: str):
         """pass data to frontend when backend changes"""
-        connection.send_message(
+        if async_skip(const.EVENT_ITEM_UPDATED, schedule_id):
+            return
+        send_message(
             {
                 "id": msg["id"],
                 "type": "event",
@@ -157,7 +339,9 @@ async def handle_subscribe_updates(hass, connection, msg):
     @callback
     def async_handle_event_item_removed(schedule_id: str):
         """pass data to frontend when backend changes"""
-        connection.send_message(
+        if async_skip(const.EVENT_ITEM_REMOVED, schedule_id):
+            return
+        send_message(
             {
                 "id": msg["id"],
                 "type": "event",
@@ -177,7 +361,9 @@ async def handle_subscribe_updates(hass, connection, msg):
     @callback
     def async_handle_event_timer_updated(schedule_id: str):
         """pass data to frontend when backend changes"""
-        connection.send_message(
+        if async_skip(const.EVENT_TIMER_UPDATED, schedule_id):
+            return
+        send_message(
             {
                 "id": msg["id"],
                 "type": "event",
@@ -195,18 +381,21 @@ async def handle_subscribe_updates(hass, connection, msg):
     )
 
     @callback
-    def async_handle_event_timer_finished(schedule_id: str):
+    def async_handle_event_timer_finished(schedule_ids: list):
         """pass data to frontend when backend changes"""
-        connection.send_message(
-            {
-                "id": msg["id"],
-                "type": "event",
-                "event": {  # data to pass with event
-                    "event": const.EVENT_TIMER_FINISHED,
-                    "schedule_id": schedule_id,
-                },
-            }
-        )
+        for schedule_id in schedule_ids:
+            if async_skip(const.EVENT_TIMER_FINISHED, schedule_id):
+                continue
+            send_message(
+                {
+                    "id": msg["id"],
+                    "type": "event",
+                    "event": {  # data to pass with event
+                        "event": const.EVENT_TIMER_FINISHED,
+                        "schedule_id": schedule_id,
+                    },
+                }
+            )
 
     listeners.append(
         async_dispatcher_connect(
@@ -214,11 +403,6 @@ async def handle_subscribe_updates(hass, connection, msg):
         )
     )
 
-    def unsubscribe_listeners():
-        """unsubscribe listeners when frontend connection closes"""
-        while len(listeners):
-            listeners.pop()()
-
     connection.subscriptions[msg["id"]] = unsubscribe_listeners
     connection.send_result(msg["id"])
 
@@ -256,6 +440,44 @@ async def async_register_websockets(hass):
         ),
     )
 
+    # pass a page of the (filtered) list of schedules to frontend
+    websocket_api.async_register_command(
+        hass,
+        "{}/list".format(const.DOMAIN),
+        websocket_list_schedules,
+        websocket_api.BASE_COMMAND_MESSAGE_SCHEMA.extend(
+            {
+                vol.Required("type"): "{}/list".format(const.DOMAIN),
+                vol.Exclusive(const.ATTR_OFFSET, "start"): vol.All(
+                    vol.Coerce(int), vol.Range(min=0)
+                ),
+                vol.Exclusive(const.ATTR_CURSOR, "start"): cv.string,
+                vol.Optional(const.ATTR_LIMIT): vol.All(
+                    vol.Coerce(int), vol.Range(min=1)
+                ),
+                vol.Optional(const.ATTR_TAGS): vol.All(cv.ensure_list, [cv.string]),
+                vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+                vol.Optional(const.ATTR_ENABLED): cv.boolean,
+                vol.Optional(const.ATTR_WEEKDAYS): vol.All(
+                    cv.ensure_list,
+                    [
+                        vol.In(
+                            WEEKDAYS
+                            + [
+                                const.DAY_TYPE_WORKDAY,
+                                const.DAY_TYPE_WEEKEND,
+                                const.DAY_TYPE_DAILY,
+                            ]
+                        )
+                    ],
+                ),
+                vol.Optional(const.ATTR_FIELDS): vol.All(
+                    cv.ensure_list, [vol.In(const.SCHEDULE_FIELDS)]
+                ),
+            }
+        ),
+    )
+
     # pass list of tags to frontend
     websocket_api.async_register_command(
         hass,
@@ -268,5 +490,54 @@ async def async_register_websockets(hass):
         ),
     )
 
+    # create, edit and remove batches of schedules
+    websocket_api.async_register_command(
+        hass,
+        "{}/add_many".format(const.DOMAIN),
+        websocket_add_schedules,
+        websocket_api.BASE_COMMAND_MESSAGE_SCHEMA.extend(
+            {
+                vol.Required("type"): "{}/add_many".format(const.DOMAIN),
+                vol.Required(const.ATTR_SCHEDULES): vol.All(
+                    cv.ensure_list, vol.Length(min=1), [const.ADD_SCHEDULE_SCHEMA]
+                ),
+            }
+        ),
+    )
+
+    websocket_api.async_register_command(
+        hass,
+        "{}/edit_many".format(const.DOMAIN),
+        websocket_edit_schedules,
+        websocket_api.BASE_COMMAND_MESSAGE_SCHEMA.extend(
+            {
+                vol.Required("type"): "{}/edit_many".format(const.DOMAIN),
+                vol.Required(const.ATTR_SCHEDULES): vol.All(
+                    cv.ensure_list,
+                    vol.Length(min=1),
+                    [
+                        const.EDIT_SCHEDULE_SCHEMA.extend(
+                            {vol.Required(const.ATTR_SCHEDULE_ID): cv.string}
+                        )
+                    ],
+                ),
+            }
+        ),
+    )
+
+    websocket_api.async_register_command(
+        hass,
+        "{}/remove_many".format(const.DOMAIN),
+        websocket_remove_schedules,
+        websocket_api.BASE_COMMAND_MESSAGE_SCHEMA.extend(
+            {
+                vol.Required("type"): "{}/remove_many".format(const.DOMAIN),
+                vol.Required(const.ATTR_SCHEDULE_IDS): vol.All(
+                    cv.ensure_list, vol.Length(min=1), [cv.string]
+                ),
+            }
+        ),
+    )
+
     # instantiate listener for sending event to frontend on backend change
     async_register_command(hass, handle_subscribe_updates)
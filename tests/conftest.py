@@ -0,0 +1,27 @@
+import datetime
+import zoneinfo
+
+import homeassistant.util.dt as dt_util
+import pytest
+
+
+@pytest.fixture
+def time_zone():
+    """set the time zone of HA, restored afterwards"""
+    original = dt_util.DEFAULT_TIME_ZONE
+
+    def set_time_zone(name: str):
+        dt_util.set_default_time_zone(zoneinfo.ZoneInfo(name))
+
+    yield set_time_zone
+    dt_util.set_default_time_zone(original)
+
+
+@pytest.fixture
+def freeze_time(monkeypatch):
+    """fix the current time of HA to a local datetime"""
+
+    def set_now(now: datetime.datetime):
+        monkeypatch.setattr(dt_util, "utcnow", lambda: dt_util.as_utc(now))
+
+    return set_now
@@ -0,0 +1,157 @@
+import asyncio
+import time
+
+from homeassistant.const import ATTR_NAME
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from custom_components.scheduler import SchedulerCoordinator, const
+from custom_components.scheduler.store import ScheduleStorage
+
+SCHEDULES = 10000
+LOOKUPS = 100
+
+
+class Entity:
+    """the parts of a schedule entity which are used for resolving entity IDs"""
+
+    def __init__(self, schedule_id: str, entity_id: str):
+        self.schedule_id = schedule_id
+        self.entity_id = entity_id
+
+
+def create_coordinator(hass: HomeAssistant, store=None):
+    """coordinator of the schedule entities, without setting up the integration"""
+    coordinator = SchedulerCoordinator.__new__(SchedulerCoordinator)
+    coordinator.hass = hass
+    coordinator.store = store
+    coordinator._entity_ids = {}
+    coordinator._schedule_ids = {}
+    hass.data[const.DOMAIN] = {"coordinator": coordinator, "schedules": {}}
+    return coordinator
+
+
+def add_entity(coordinator, schedule_id: str, entity_id: str):
+    """add the entity of a schedule, like the switch platform does"""
+    entity = Entity(schedule_id, entity_id)
+    coordinator.hass.data[const.DOMAIN]["schedules"][schedule_id] = entity
+    coordinator.async_register_entity(entity)
+    return entity
+
+
+def test_resolve_entity_id(tmp_path):
+    """time to find the schedule of an entity ID out of 10000 schedules"""
+
+    async def run():
+        hass = HomeAssistant(str(tmp_path))
+        coordinator = create_coordinator(hass)
+        for i in range(SCHEDULES):
+            add_entity(coordinator, "id{}".format(i), "switch.schedule_{}".format(i))
+        entities = hass.data[const.DOMAIN]["schedules"]
+        entity_ids = [
+            "switch.schedule_{}".format(i * SCHEDULES // LOOKUPS)
+            for i in range(LOOKUPS)
+        ]
+
+        # every entity is compared with the entity ID
+        start = time.perf_counter()
+        scanned = []
+        for entity_id in entity_ids:
+            match = None
+            for entity in entities.values():
+                if entity.entity_id == entity_id:
+                    match = entity.schedule_id
+            scanned.append(match)
+        scan = (time.perf_counter() - start) / LOOKUPS
+
+        start = time.perf_counter()
+        indexed = [coordinator.async_get_schedule_id(x) for x in entity_ids]
+        index = (time.perf_counter() - start) / LOOKUPS
+
+        print(
+            "{} schedules: entity ID resolved in {:.0f} us scanned, "
+            "{:.1f} us indexed".format(SCHEDULES, scan * 1e6, index * 1e6)
+        )
+        assert indexed == scanned
+
+        # a renamed schedule is only found under its new entity ID
+        add_entity(coordinator, "id0", "switch.renamed")
+        assert coordinator.async_get_schedule_id("switch.schedule_0") is None
+        assert coordinator.async_get_schedule_id("switch.renamed") == "id0"
+        assert coordinator.async_get_entity_id("id0") == "switch.renamed"
+        await hass.async_stop(force=True)
+
+    asyncio.run(run())
+
+
+def test_provision_schedules(tmp_path):
+    """saves and entity creations when provisioning 5000 schedules"""
+    count = 5000
+
+    def schedule_data(i: int) -> dict:
+        return {
+            const.ATTR_WEEKDAYS: [const.DAY_TYPE_DAILY],
+            const.ATTR_REPEAT_TYPE: const.REPEAT_TYPE_REPEAT,
+            ATTR_NAME: "schedule {}".format(i),
+            const.ATTR_TIMESLOTS: [
+                {
+                    const.ATTR_START: "{:02d}:00:00".format(i % 24),
+                    const.ATTR_STOP: "{:02d}:30:00".format(i % 24),
+                }
+            ],
+            const.ATTR_TAGS: ["room{}".format(i % 50)],
+        }
+
+    async def provision(hass: HomeAssistant, create) -> tuple:
+        """returns the time, the number of saves and of entity creations"""
+        store = ScheduleStorage(hass)
+        await store.async_load()
+        coordinator = create_coordinator(hass, store)
+        saves = []
+        store._store.async_delay_save = lambda *args: saves.append(args)
+        created = []
+
+        @callback
+        def async_add_entities(entries: list):
+            created.append(entries)
+
+        remove = async_dispatcher_connect(
+            hass, const.EVENT_ITEMS_CREATED, async_add_entities
+        )
+        start = time.perf_counter()
+        create(coordinator, [schedule_data(i) for i in range(count)])
+        duration = time.perf_counter() - start
+        remove()
+        assert len(store.schedules) == count
+        assert sum(len(x) for x in created) == count
+        assert len(store.async_get_schedules_with_tag("room0")) == count // 50
+        return (duration, len(saves), len(created))
+
+    def add(coordinator, items: list):
+        for data in items:
+            coordinator.async_create_schedule(data)
+
+    def add_many(coordinator, items: list):
+        coordinator.async_create_schedules(items)
+
+    async def run():
+        hass = HomeAssistant(str(tmp_path))
+        (single, single_saves, single_created) = await provision(hass, add)
+        (bulk, bulk_saves, bulk_created) = await provision(hass, add_many)
+        print(
+            "{} schedules: {:.0f} ms, {} saves, {} entity creations (add), "
+            "{:.0f} ms, {} save, {} entity creation (add_many)".format(
+                count,
+                single * 1000,
+                single_saves,
+                single_created,
+                bulk * 1000,
+                bulk_saves,
+                bulk_created,
+            )
+        )
+        assert single_created == count
+        assert (bulk_saves, bulk_created) == (1, 1)
+        await hass.async_stop(force=True)
+
+    asyncio.run(run())
@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import (
+    async_dispatcher_connect,
+    async_dispatcher_send,
+)
+
+from custom_components.scheduler import const
+
+SCHEDULES = 1000
+UPDATES = 100
+
+
+def test_handlers_per_update(tmp_path):
+    """handler invocations for an update of one out of 1000 schedules"""
+    calls = []
+
+    def handler():
+        @callback
+        def async_item_updated(id: str):
+            calls.append(id)
+
+        return async_item_updated
+
+    def send_updates(hass: HomeAssistant, signal) -> float:
+        """send the updates, returns the time per update"""
+        calls.clear()
+        start = time.perf_counter()
+        for i in range(UPDATES):
+            async_dispatcher_send(hass, signal("id{}".format(i)), "id{}".format(i))
+        return (time.perf_counter() - start) / UPDATES
+
+    async def run():
+        hass = HomeAssistant(str(tmp_path))
+
+        # the timer and entity of every schedule listen to one shared signal
+        remove = [
+            async_dispatcher_connect(hass, const.EVENT_ITEM_UPDATED, handler())
+            for _i in range(2 * SCHEDULES)
+        ]
+        shared = send_updates(hass, lambda _id: const.EVENT_ITEM_UPDATED)
+        shared_calls = len(calls) / UPDATES
+        for x in remove:
+            x()
+
+        # the timer and entity of every schedule listen to the signal of the schedule
+        remove = [
+            async_dispatcher_connect(
+                hass,
+                const.schedule_signal(const.EVENT_ITEM_UPDATED, "id{}".format(i)),
+                handler(),
+            )
+            for i in range(SCHEDULES)
+            for _x in range(2)
+        ]
+        per_schedule = send_updates(
+            hass, lambda id: const.schedule_signal(const.EVENT_ITEM_UPDATED, id)
+        )
+        per_schedule_calls = len(calls) / UPDATES
+        for x in remove:
+            x()
+
+        print(
+            "{} schedules: {:.0f} handlers per update in {:.0f} us (shared signal), "
+            "{:.0f} handlers in {:.0f} us (per schedule)".format(
+                SCHEDULES,
+                shared_calls,
+                shared * 1e6,
+                per_schedule_calls,
+                per_schedule * 1e6,
+            )
+        )
+        assert shared_calls == 2 * SCHEDULES
+        assert per_schedule_calls == 2
+        await hass.async_stop(force=True)
+
+    asyncio.run(run())
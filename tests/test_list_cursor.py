@@ -0,0 +1,88 @@
+from custom_components.scheduler import const
+from custom_components.scheduler.websockets import websocket_list_schedules
+
+SCHEDULES = ["id{}".format(i) for i in range(10)]
+
+
+class Coordinator:
+    """the parts of the coordinator which are used for listing schedules"""
+
+    def __init__(self):
+        self.positions = {
+            schedule_id: position for (position, schedule_id) in enumerate(SCHEDULES)
+        }
+        self.schedules = list(SCHEDULES)
+
+    def async_find_schedules(self, **_kwargs):
+        return list(self.schedules)
+
+    def async_get_schedule_position(self, schedule_id: str):
+        return self.positions.get(schedule_id)
+
+    def async_get_schedule(self, schedule_id: str, fields: list = None):
+        return {const.ATTR_SCHEDULE_ID: schedule_id}
+
+
+class Connection:
+    """websocket connection which keeps the last response"""
+
+    def __init__(self):
+        self.result = None
+        self.error = None
+
+    def send_result(self, msg_id, result=None):
+        self.result = result
+
+    def send_error(self, msg_id, code, message):
+        self.error = code
+
+
+class Hass:
+    def __init__(self, coordinator):
+        self.data = {const.DOMAIN: {"coordinator": coordinator}}
+
+
+def list_page(coordinator, **msg):
+    """the schedule IDs and next cursor of a page"""
+    connection = Connection()
+    websocket_list_schedules(Hass(coordinator), connection, dict(id=1, **msg))
+    assert connection.error is None
+    return (
+        [
+            item[const.ATTR_SCHEDULE_ID]
+            for item in connection.result[const.ATTR_SCHEDULES]
+        ],
+        connection.result[const.ATTR_NEXT_CURSOR],
+    )
+
+
+def test_pages():
+    """walking the cursor returns every schedule once"""
+    coordinator = Coordinator()
+    (page, cursor) = list_page(coordinator, limit=4)
+    seen = list(page)
+    while cursor:
+        (page, cursor) = list_page(coordinator, limit=4, cursor=cursor)
+        seen += page
+    assert seen == SCHEDULES
+
+
+def test_deleted_cursor():
+    """the list continues after the position of a deleted cursor"""
+    coordinator = Coordinator()
+    (page, cursor) = list_page(coordinator, limit=3)
+    assert cursor == "id2"
+    coordinator.schedules.remove("id2")
+    coordinator.schedules.remove("id3")
+    (page, cursor) = list_page(coordinator, limit=3, cursor=cursor)
+    assert page == ["id4", "id5", "id6"]
+    assert cursor == "id6"
+
+
+def test_unknown_cursor():
+    """a cursor which never was a schedule is an error"""
+    connection = Connection()
+    websocket_list_schedules(
+        Hass(Coordinator()), connection, {"id": 1, const.ATTR_CURSOR: "nope"}
+    )
+    assert connection.error == "not_found"
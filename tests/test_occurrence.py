@@ -0,0 +1,258 @@
+import datetime
+import random
+
+import homeassistant.util.dt as dt_util
+import pytest
+from homeassistant.const import WEEKDAYS
+
+from custom_components.scheduler import const
+from custom_components.scheduler.occurrence import (
+    WorkdayCalendar,
+    build_occurrence_rule,
+    next_occurrence,
+    time_on_day,
+    weekday_mask,
+)
+
+DAY_TYPES = [const.DAY_TYPE_DAILY, const.DAY_TYPE_WORKDAY, const.DAY_TYPE_WEEKEND]
+TIME_ZONES = ["UTC", "Europe/Amsterdam", "America/New_York", "Australia/Sydney"]
+
+
+def legacy_next_occurrence(
+    time: datetime.time,
+    now: datetime.datetime,
+    today: datetime.date,
+    weekdays: list,
+    start_date: datetime.date = None,
+    end_date: datetime.date = None,
+    workday_state: bool = None,
+    workday_list: list = None,
+    iteration: int = 0,
+    reverse_direction: bool = False,
+):
+    """the day-by-day walk of TimerHandler.calculate_timestamp, before occurrence.py
+
+    The workday sensor is given by its state and list of workdays, today is the
+    date on which its state applies.
+    """
+    if workday_list is None:
+        workday_list = WEEKDAYS[0:5]
+
+    def day_in_weekdays(ts: datetime.datetime) -> bool:
+        day = WEEKDAYS[ts.weekday()]
+        if workday_state is not None and ts.date() == today:
+            if const.DAY_TYPE_WORKDAY in weekdays:
+                return workday_state
+            elif const.DAY_TYPE_WEEKEND in weekdays:
+                return not workday_state
+        weekend_list = [e for e in WEEKDAYS if e not in workday_list]
+        if const.DAY_TYPE_DAILY in weekdays or not len(weekdays):
+            return True
+        elif const.DAY_TYPE_WORKDAY in weekdays and day in workday_list:
+            return True
+        elif const.DAY_TYPE_WEEKEND in weekdays and day in weekend_list:
+            return True
+        return day in weekdays
+
+    ts = dt_util.find_next_time_expression_time(
+        now, [time.second], [time.minute], [time.hour]
+    )
+    time_delta = datetime.timedelta(seconds=1)
+
+    if day_in_weekdays(ts) and ((ts - now).total_seconds() > 0 or iteration > 0):
+        if start_date and (start_date - ts.date()).days > 0:
+            # start date is in the future, jump to start date
+            end_of_day = ts.replace(
+                hour=0, minute=0, second=0, microsecond=0
+            ) + datetime.timedelta(days=1)
+            days_delta = (start_date - end_of_day.date()).days
+            if days_delta:
+                time_delta = datetime.timedelta(days=days_delta)
+        elif end_date and (end_date - ts.date()).days < 0:
+            # end date is in the past, jump to end date
+            time_delta = datetime.timedelta(days=(end_date - ts.date()).days)
+            reverse_direction = True
+        else:
+            return ts
+    elif reverse_direction:
+        time_delta = datetime.timedelta(days=-1)
+
+    next_day = dt_util.find_next_time_expression_time(now + time_delta, [0], [0], [0])
+    if iteration > 15:
+        return None
+    return legacy_next_occurrence(
+        time,
+        next_day,
+        today,
+        weekdays,
+        start_date,
+        end_date,
+        workday_state,
+        workday_list,
+        iteration + 1,
+        reverse_direction,
+    )
+
+
+def occurrence_rule(
+    now: datetime.datetime,
+    weekdays: list,
+    start_date: datetime.date = None,
+    end_date: datetime.date = None,
+    workday_state: bool = None,
+    workday_list: list = None,
+    **_kwargs,
+):
+    """occurrence rule with the same inputs as the legacy walk"""
+    calendar = WorkdayCalendar(
+        workday_mask=weekday_mask(
+            workday_list if workday_list is not None else WEEKDAYS[0:5]
+        ),
+        today=now.date(),
+        today_is_workday=workday_state,
+    )
+    return build_occurrence_rule(weekdays, start_date, end_date, calendar)
+
+
+def scan_occurrence(rule, time: datetime.time, now: datetime.datetime):
+    """the first existing time on an allowed day after now, checking every day
+
+    Without any in the date range, the last one up to the end date is used.
+    """
+    day = now.date()
+    if rule.start_date and rule.start_date > day:
+        day = rule.start_date
+    while not rule.end_date or day <= rule.end_date:
+        ts = time_on_day(day, time)
+        if rule.date_allowed(day) and ts is not None and ts > now:
+            return ts
+        day += datetime.timedelta(days=1)
+        if (day - now.date()).days > 60:
+            return None
+
+    day = rule.end_date
+    while not rule.start_date or day >= rule.start_date:
+        ts = time_on_day(day, time)
+        if rule.date_allowed(day) and ts is not None:
+            return ts
+        day -= datetime.timedelta(days=1)
+        if (now.date() - day).days > 60:
+            return None
+    return None
+
+
+def near_dst_gap(time: datetime.time, now: datetime.datetime) -> bool:
+    """check if the time is skipped by a DST transition in the weeks around now"""
+    return any(
+        time_on_day(now.date() + datetime.timedelta(days=days), time) is None
+        for days in range(-30, 31)
+    )
+
+
+def random_case(rnd: random.Random) -> dict:
+    """random schedule and point in time"""
+    tz = dt_util.DEFAULT_TIME_ZONE
+    now = datetime.datetime(2023, 1, 1, tzinfo=tz) + datetime.timedelta(
+        seconds=rnd.randrange(3 * 365 * 86400)
+    )
+    now = dt_util.as_local(now)
+    choice = rnd.random()
+    if choice < 0.2:
+        weekdays = [rnd.choice(DAY_TYPES)]
+    elif choice < 0.3:
+        weekdays = [rnd.choice(DAY_TYPES[1:]), rnd.choice(WEEKDAYS)]
+    else:
+        weekdays = rnd.sample(WEEKDAYS, rnd.randint(1, 3))
+
+    start_date = end_date = None
+    if rnd.random() < 0.4:
+        start_date = now.date() + datetime.timedelta(days=rnd.randint(-20, 20))
+    if rnd.random() < 0.4:
+        end_date = (start_date or now.date()) + datetime.timedelta(
+            days=rnd.randint(-20, 20)
+        )
+    return dict(
+        time=datetime.time(rnd.randrange(24), rnd.choice([0, 15, 30, 59]), 0),
+        now=now,
+        weekdays=weekdays,
+        start_date=start_date,
+        end_date=end_date,
+        workday_state=rnd.choice([None, True, False]),
+        workday_list=rnd.choice(
+            [None, WEEKDAYS[0:5], WEEKDAYS[0:4], ["sun", "mon", "tue", "wed", "thu"]]
+        ),
+    )
+
+
+def assert_same(case: dict):
+    """compare the closed-form calculation with the legacy walk"""
+    rule = occurrence_rule(**case)
+    result = next_occurrence(rule, case["time"], case["now"])
+    if near_dst_gap(case["time"], case["now"]):
+        # the legacy walk can land on a skipped time, or miss a day when it
+        # jumps back to the end date from the DST transition
+        assert result == scan_occurrence(rule, case["time"], case["now"]), case
+        return
+    legacy = legacy_next_occurrence(today=case["now"].date(), **case)
+    assert result == legacy, case
+
+
+@pytest.mark.parametrize("tz", TIME_ZONES)
+def test_differential(time_zone, tz):
+    """randomized schedules give the same occurrence as the legacy walk"""
+    time_zone(tz)
+    rnd = random.Random(tz)
+    for _i in range(1000):
+        assert_same(random_case(rnd))
+
+
+# the days of the DST transitions of 2024 in the time zones
+DST_DAYS = {
+    "UTC": [datetime.date(2024, 3, 31)],
+    "Europe/Amsterdam": [datetime.date(2024, 3, 31), datetime.date(2024, 10, 27)],
+    "America/New_York": [datetime.date(2024, 3, 10), datetime.date(2024, 11, 3)],
+    "Australia/Sydney": [datetime.date(2024, 4, 7), datetime.date(2024, 10, 6)],
+}
+
+# weekdays and state of the workday sensor
+DST_CASES = [
+    (["sun"], None),
+    (["sat", "mon"], None),
+    ([const.DAY_TYPE_DAILY], None),
+    ([const.DAY_TYPE_WORKDAY], None),
+    ([const.DAY_TYPE_WORKDAY], False),
+    ([const.DAY_TYPE_WEEKEND], None),
+    ([const.DAY_TYPE_WEEKEND], True),
+]
+
+
+@pytest.mark.parametrize("tz", TIME_ZONES)
+def test_around_dst(time_zone, tz):
+    """fixed cases in the days around the DST transitions"""
+    time_zone(tz)
+    for day in DST_DAYS[tz]:
+        date_ranges = [
+            (None, None),
+            (day + datetime.timedelta(days=1), None),
+            (None, day - datetime.timedelta(days=1)),
+            (day - datetime.timedelta(days=3), day + datetime.timedelta(days=3)),
+        ]
+        # HA steps through a skipped time second by second, start close to it
+        for hours in [-24, 1, 3, 12, 36]:
+            now = dt_util.as_local(
+                dt_util.start_of_local_day(day) + datetime.timedelta(hours=hours)
+            )
+            for (weekdays, workday_state) in DST_CASES:
+                for (start_date, end_date) in date_ranges:
+                    for time in [datetime.time(0, 0), datetime.time(2, 30)]:
+                        assert_same(
+                            dict(
+                                time=time,
+                                now=now,
+                                weekdays=weekdays,
+                                start_date=start_date,
+                                end_date=end_date,
+                                workday_state=workday_state,
+                                workday_list=None,
+                            )
+                        )
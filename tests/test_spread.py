@@ -0,0 +1,170 @@
+import asyncio
+import collections
+import datetime
+
+import homeassistant.util.dt as dt_util
+import pytest
+from homeassistant.const import SUN_EVENT_SUNRISE
+
+from custom_components.scheduler import const
+from custom_components.scheduler.handles import HandleRegistry
+from custom_components.scheduler.occurrence import WorkdayCalendar, compile_timeslot
+from custom_components.scheduler.sun import SunTracker
+from custom_components.scheduler.timer import TimerHandler, spread_offset
+
+SCHEDULES = 500
+SPREAD = 30
+
+
+class Coordinator:
+    """the parts of the coordinator which are used for fixed times"""
+
+    def __init__(self, spread: int):
+        self.spread = spread
+        self.workday_calendar = WorkdayCalendar()
+
+
+def create_timer(schedule_id: str, spread: int, start="07:00:00", stop="08:00:00"):
+    """timer handler of a daily schedule, without hass"""
+    timer = TimerHandler.__new__(TimerHandler)
+    timer.id = schedule_id
+    timer.coordinator = Coordinator(spread)
+    timer._weekdays = [const.DAY_TYPE_DAILY]
+    timer._start_date = None
+    timer._end_date = None
+    timer._timeslots = [
+        compile_timeslot({const.ATTR_START: start, const.ATTR_STOP: stop})
+    ]
+    timer._spread = None
+    timer._rule = None
+    timer._index = None
+    timer._workday_version = None
+    timer.slot_queue = []
+    timer.timestamps = []
+    return timer
+
+
+def find_schedule_id(predicate) -> str:
+    """a schedule ID of which the offset matches"""
+    return next(
+        schedule_id
+        for schedule_id in ("id{}".format(i) for i in range(1000))
+        if predicate(spread_offset(schedule_id, SPREAD))
+    )
+
+
+@pytest.fixture
+def morning(time_zone, freeze_time):
+    """06:00 local time"""
+    time_zone("Europe/Amsterdam")
+    now = datetime.datetime(2024, 3, 12, 6, 0, tzinfo=dt_util.DEFAULT_TIME_ZONE)
+    freeze_time(now)
+    return now
+
+
+def test_spread_offset():
+    """offsets are deterministic and cover the window"""
+    offsets = [spread_offset("id{}".format(i), SPREAD) for i in range(2000)]
+    assert offsets == [spread_offset("id{}".format(i), SPREAD) for i in range(2000)]
+    assert set(offsets) == set(range(-SPREAD, SPREAD + 1))
+    assert spread_offset("id0", 0) == 0
+
+
+@pytest.mark.parametrize("spread", [0, SPREAD])
+def test_peak_service_calls(morning, spread):
+    """number of schedules firing within the same second at 07:00"""
+    fire_times = collections.Counter()
+    for i in range(SCHEDULES):
+        (_slot, ts) = create_timer("id{}".format(i), spread).next_timeslot()
+        fire_times[ts] += 1
+    peak = max(fire_times.values())
+    print("spread {}: peak of {} service calls per second".format(spread, peak))
+    if spread:
+        assert len(fire_times) == 2 * SPREAD + 1
+        assert peak <= 2 * SCHEDULES / (2 * SPREAD + 1)
+    else:
+        assert peak == SCHEDULES
+
+
+def test_reload_before_delayed_start(morning, freeze_time):
+    """a positive offset: reloading between 07:00 and the spread start"""
+    schedule_id = find_schedule_id(lambda offset: offset > 10)
+    offset = datetime.timedelta(seconds=spread_offset(schedule_id, SPREAD))
+    start = morning.replace(hour=7)
+    freeze_time(start + offset / 2)
+
+    timer = create_timer(schedule_id, SPREAD)
+    assert timer.current_timeslot() == (None, None)
+    assert timer.next_timeslot() == (0, start + offset)
+
+
+def test_reload_after_early_start(morning, freeze_time):
+    """a negative offset: reloading between the spread start and 07:00"""
+    schedule_id = find_schedule_id(lambda offset: offset < -10)
+    offset = datetime.timedelta(seconds=spread_offset(schedule_id, SPREAD))
+    start = morning.replace(hour=7)
+    freeze_time(start + offset / 2)
+
+    timer = create_timer(schedule_id, SPREAD)
+    assert timer.current_timeslot() == (0, morning.replace(hour=8))
+    assert timer.next_timeslot() == (0, start + datetime.timedelta(days=1) + offset)
+
+
+def test_slot_end_is_not_spread(morning, freeze_time):
+    """the end of the timeslot stays at the configured time"""
+    schedule_id = find_schedule_id(lambda offset: offset > 0)
+    freeze_time(morning.replace(hour=7, minute=30))
+
+    timer = create_timer(schedule_id, SPREAD)
+    assert timer.current_timeslot() == (0, morning.replace(hour=8))
+
+
+class SunEphemeris:
+    """ephemeris which is not calculated yet"""
+
+    ready = False
+    version = 0
+
+    def async_get_event(self, sun_event, date):
+        return None
+
+
+def test_sun_update_with_spread(morning, freeze_time):
+    """a moved sunrise is compared with the spread start of the timer"""
+    schedule_id = find_schedule_id(lambda offset: offset > 10)
+    timer = create_timer(schedule_id, SPREAD, start="sunrise+00:00:00", stop=None)
+    sun_tracker = timer.coordinator.sun_tracker = SunTracker(None)
+    timer.coordinator.sun_ephemeris = SunEphemeris()
+    timer._handles = HandleRegistry().async_create_scope(schedule_id)
+    timer._sun_tracker = None
+    timer._sun_events = set()
+    restarts = []
+
+    async def async_start_timer():
+        restarts.append(dt_util.utcnow())
+
+    timer.async_start_timer = async_start_timer
+    sunrise = morning.replace(hour=7)
+    sun_tracker._next_events[SUN_EVENT_SUNRISE] = sunrise
+
+    async def run():
+        (slot, timer._next_trigger) = timer.next_timeslot()
+        assert timer._next_trigger == sunrise + datetime.timedelta(
+            seconds=spread_offset(schedule_id, SPREAD)
+        )
+        timer._watched_times = [(timer._timeslots[slot].start, timer.spread)]
+        await timer.async_start_sun_tracker()
+        async_sun_updated = sun_tracker._subscribers[schedule_id].target
+
+        # the sun entity is updated without moving the sunrise
+        await async_sun_updated()
+        assert restarts == []
+
+        # the sunrise moves by a minute
+        sun_tracker._next_events[SUN_EVENT_SUNRISE] = sunrise + datetime.timedelta(
+            minutes=1
+        )
+        await async_sun_updated()
+        assert len(restarts) == 1
+
+    asyncio.run(run())
@@ -0,0 +1,187 @@
+import asyncio
+import os
+import time
+import tracemalloc
+
+import attr
+import pytest
+from homeassistant.const import ATTR_NAME
+from homeassistant.core import HomeAssistant
+
+from custom_components.scheduler import const
+from custom_components.scheduler import store as store_module
+from custom_components.scheduler.store import ScheduleStorage
+
+SCHEDULES = 10000
+EDITS = 100
+
+
+def schedule_data(i: int) -> dict:
+    """data of a daily schedule with a single timeslot"""
+    return {
+        const.ATTR_WEEKDAYS: [const.DAY_TYPE_DAILY],
+        const.ATTR_REPEAT_TYPE: const.REPEAT_TYPE_REPEAT,
+        ATTR_NAME: "schedule {}".format(i),
+        const.ATTR_TIMESLOTS: [
+            {
+                const.ATTR_START: "{:02d}:00:00".format(i % 24),
+                const.ATTR_STOP: "{:02d}:30:00".format(i % 24),
+                const.ATTR_ACTIONS: [
+                    {
+                        "service": "light.turn_on",
+                        "entity_id": "light.light_{}".format(i),
+                    }
+                ],
+            }
+        ],
+    }
+
+
+async def async_create_store(hass: HomeAssistant, count: int) -> ScheduleStorage:
+    """storage holding a number of schedules"""
+    store = ScheduleStorage(hass)
+    await store.async_load()
+    with store.async_batch():
+        for i in range(count):
+            store.async_create_schedule(schedule_data(i))
+    await store.async_save()
+    return store
+
+
+def test_journal_burst(tmp_path):
+    """bytes written and save time for a burst of edits of 10000 schedules"""
+
+    async def run():
+        hass = HomeAssistant(str(tmp_path))
+        store = await async_create_store(hass, SCHEDULES)
+        edited = list(store.schedules)[:EDITS]
+
+        # every save rewrites the storage file
+        for schedule_id in edited:
+            store.async_update_schedule(schedule_id, {ATTR_NAME: "edited"})
+        start = time.perf_counter()
+        await store.async_save()
+        file_save = time.perf_counter() - start
+        file_bytes = os.path.getsize(store._store.path)
+
+        # a save appends the edited schedules to the journal
+        await store.async_set_journal(True)
+        for schedule_id in edited:
+            store.async_update_schedule(schedule_id, {ATTR_NAME: "journaled"})
+        start = time.perf_counter()
+        await store.async_save()
+        journal_save = time.perf_counter() - start
+
+        print(
+            "{} edits of {} schedules: {} bytes in {:.1f} ms (storage file), "
+            "{} bytes in {:.1f} ms (journal)".format(
+                EDITS,
+                SCHEDULES,
+                file_bytes,
+                file_save * 1000,
+                store.journal.bytes_written,
+                journal_save * 1000,
+            )
+        )
+        assert store.journal.records_written == EDITS
+        assert store.journal.bytes_written < file_bytes / 50
+
+        # the journal is applied on top of the storage file when loading
+        loaded = ScheduleStorage(hass)
+        await loaded.async_load()
+        assert len(loaded.schedules) == SCHEDULES
+        assert all(loaded.schedules[x].name == "journaled" for x in edited)
+
+        await store.async_set_journal(False)
+        assert not os.path.isfile(store.journal.path)
+        await hass.async_stop(force=True)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("count", [1, 100, 10000])
+def test_save_after_edit(tmp_path, monkeypatch, count):
+    """time to collect the data to save after a single edit"""
+
+    async def run():
+        hass = HomeAssistant(str(tmp_path))
+        store = await async_create_store(hass, count)
+        calls = []
+        schedule_to_dict = store_module.schedule_to_dict
+        monkeypatch.setattr(
+            store_module,
+            "schedule_to_dict",
+            lambda entry: (calls.append(entry), schedule_to_dict(entry))[1],
+        )
+
+        store._serialized = {}
+        start = time.perf_counter()
+        data = store._data_to_save()
+        uncached = time.perf_counter() - start
+
+        calls.clear()
+        store.async_update_schedule(next(iter(store.schedules)), {ATTR_NAME: "edited"})
+        start = time.perf_counter()
+        cached_data = store._data_to_save()
+        cached = time.perf_counter() - start
+
+        print(
+            "{} schedules: data to save in {:.2f} ms uncached, {:.2f} ms cached".format(
+                count, uncached * 1000, cached * 1000
+            )
+        )
+        assert len(calls) == 1
+        assert cached_data["schedules"][1:] == data["schedules"][1:]
+        await hass.async_stop(force=True)
+
+    asyncio.run(run())
+
+
+def test_allocations_per_update(tmp_path):
+    """bytes allocated by the reads of a schedule update, copied or not"""
+    tags = 50
+
+    async def run():
+        hass = HomeAssistant(str(tmp_path))
+        store = await async_create_store(hass, 1000)
+        for (i, schedule_id) in enumerate(store.schedules):
+            store.async_add_schedule_to_tag("tag{}".format(i % tags), schedule_id)
+        schedule_id = next(iter(store.schedules))
+
+        def copied_reads():
+            # the entity, the timer and the tags of the schedule
+            entry = attr.asdict(store.schedules[schedule_id])
+            timer_entry = attr.asdict(store.schedules[schedule_id])
+            tag_names = sorted(
+                tag[ATTR_NAME]
+                for tag in [attr.asdict(x) for x in store.tags.values()]
+                if schedule_id in tag[const.ATTR_SCHEDULES]
+            )
+            return (entry, timer_entry, tag_names)
+
+        def entry_reads():
+            entry = store.async_get_schedule_entry(schedule_id)
+            timer_entry = store.async_get_schedule_entry(schedule_id)
+            tag_names = sorted(store.async_get_tags_for_schedule(schedule_id))
+            return (entry, timer_entry, tag_names)
+
+        def allocated(reads) -> int:
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            result = reads()
+            after = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            assert result[2] == ["tag0"]
+            return after - before
+
+        copied = allocated(copied_reads)
+        entries = allocated(entry_reads)
+        print(
+            "reads of an update: {} bytes allocated copied, {} bytes as entries".format(
+                copied, entries
+            )
+        )
+        assert entries < copied / 10
+        await hass.async_stop(force=True)
+
+    asyncio.run(run())
@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+from homeassistant.const import ATTR_NAME
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.json import json_bytes
+
+from custom_components.scheduler import SchedulerCoordinator, const
+from custom_components.scheduler.store import ScheduleStorage
+from custom_components.scheduler.websockets import handle_subscribe_updates
+
+SCHEDULES = 5000
+SUBSCRIBERS = 50
+# schedules in a room share a tag
+ROOM_SIZE = 5
+
+
+class Connection:
+    """websocket connection which serializes the messages it sends"""
+
+    def __init__(self):
+        self.subscriptions = {}
+        self.schedule_ids = set()
+        self.messages = 0
+
+    def send_message(self, message: dict):
+        json_bytes(message)
+        self.messages += 1
+        self.schedule_ids.add(message["event"][const.ATTR_SCHEDULE_ID])
+
+    def send_result(self, msg_id, result=None):
+        pass
+
+
+async def async_create_coordinator(hass: HomeAssistant):
+    """coordinator with a storage of schedules, without setting up the integration"""
+    store = ScheduleStorage(hass)
+    await store.async_load()
+    with store.async_batch():
+        for i in range(SCHEDULES):
+            entry = store.async_create_schedule(
+                {ATTR_NAME: "schedule {}".format(i), const.ATTR_TIMESLOTS: []}
+            )
+            store.async_add_schedule_to_tag(
+                "room{}".format(i // ROOM_SIZE), entry.schedule_id
+            )
+    coordinator = SchedulerCoordinator.__new__(SchedulerCoordinator)
+    coordinator.hass = hass
+    coordinator.store = store
+    hass.data[const.DOMAIN] = {"coordinator": coordinator, "schedules": {}}
+    return coordinator
+
+
+def test_filtered_fan_out(tmp_path):
+    """server CPU for 50 subscribers during a burst of events of 5000 schedules"""
+
+    async def subscribe(hass: HomeAssistant, schedule_ids: list, filtered: bool):
+        """connections of the subscribers, which each show a room"""
+        connections = []
+        for i in range(SUBSCRIBERS):
+            msg = {"id": 1, "type": "scheduler_updated", const.ATTR_DELTAS: False}
+            if filtered and i % 2:
+                msg[const.ATTR_TAGS] = ["room{}".format(i)]
+            elif filtered:
+                msg[const.ATTR_SCHEDULE_IDS] = schedule_ids[
+                    i * ROOM_SIZE : (i + 1) * ROOM_SIZE
+                ]
+            connection = Connection()
+            handle_subscribe_updates(hass, connection, msg)
+            connections.append(connection)
+        await hass.async_block_till_done()
+        return connections
+
+    def burst(hass: HomeAssistant, schedule_ids: list) -> float:
+        """all timers finish and 1000 schedules are edited, returns the CPU time"""
+        start = time.process_time()
+        async_dispatcher_send(hass, const.EVENT_TIMER_FINISHED, schedule_ids)
+        for schedule_id in schedule_ids[:1000]:
+            async_dispatcher_send(hass, const.EVENT_ITEM_UPDATED, schedule_id)
+        return time.process_time() - start
+
+    async def run():
+        hass = HomeAssistant(str(tmp_path))
+        coordinator = await async_create_coordinator(hass)
+        schedule_ids = list(coordinator.store.schedules)
+        results = {}
+        for filtered in (False, True):
+            connections = await subscribe(hass, schedule_ids, filtered)
+            cpu = burst(hass, schedule_ids)
+            results[filtered] = (cpu, sum(x.messages for x in connections))
+            for connection in connections:
+                connection.subscriptions[1]()
+            if filtered:
+                assert all(len(x.schedule_ids) == ROOM_SIZE for x in connections)
+
+        print(
+            "{} subscribers, {} schedules: burst CPU {:.0f} ms for {} messages, "
+            "{:.0f} ms for {} messages (filtered)".format(
+                SUBSCRIBERS,
+                SCHEDULES,
+                results[False][0] * 1000,
+                results[False][1],
+                results[True][0] * 1000,
+                results[True][1],
+            )
+        )
+        assert results[False][1] == SUBSCRIBERS * (SCHEDULES + 1000)
+        assert results[True][1] < results[False][1] / 100
+        await hass.async_stop(force=True)
+
+    asyncio.run(run())
@@ -0,0 +1,167 @@
+import asyncio
+import datetime
+
+import homeassistant.util.dt as dt_util
+from homeassistant.const import SUN_EVENT_SUNRISE, SUN_EVENT_SUNSET
+from homeassistant.core import HomeAssistant
+
+from custom_components.scheduler.occurrence import (
+    OccurrenceRule,
+    compile_time,
+    next_occurrence,
+)
+from custom_components.scheduler.sun import (
+    EPHEMERIS_DAYS,
+    EPHEMERIS_REFRESH_DAYS,
+    NO_SUN_EVENT,
+    SunEphemeris,
+    SunTracker,
+)
+from custom_components.scheduler.timer import resolve_time
+
+
+def test_window_moves_forward(tmp_path, time_zone, freeze_time):
+    """the ephemeris is recalculated from yesterday after the refresh interval"""
+    time_zone("Europe/Amsterdam")
+    # the timer of the refresh runs on the real clock
+    today = dt_util.as_local(dt_util.utcnow()).date()
+
+    async def run():
+        hass = HomeAssistant(str(tmp_path))
+        hass.config.latitude = 52.37
+        hass.config.longitude = 4.89
+        freeze_time(dt_util.start_of_local_day(today).replace(hour=12))
+
+        ephemeris = SunEphemeris(hass, SunTracker(hass))
+        ephemeris.async_start()
+        await hass.async_block_till_done()
+        version = ephemeris.version
+        yesterday = today - datetime.timedelta(days=1)
+        assert ephemeris.async_get_event(SUN_EVENT_SUNRISE, yesterday) is not None
+
+        # the refresh is due at the start of the day after the interval
+        later = today + datetime.timedelta(days=EPHEMERIS_REFRESH_DAYS)
+        assert ephemeris.async_get_event(SUN_EVENT_SUNRISE, later) is not None
+        freeze_time(dt_util.start_of_local_day(later).replace(hour=12))
+        ephemeris._async_refresh_timer(dt_util.utcnow())
+        await hass.async_block_till_done()
+
+        assert ephemeris.version == version + 1
+        assert ephemeris.async_get_event(SUN_EVENT_SUNRISE, yesterday) is None
+        assert (
+            ephemeris.async_get_event(
+                SUN_EVENT_SUNRISE, later - datetime.timedelta(days=1)
+            )
+            is not None
+        )
+        assert ephemeris._refresh_timer is not None
+
+        ephemeris.async_stop()
+        assert ephemeris._refresh_timer is None
+        await hass.async_stop(force=True)
+
+    asyncio.run(run())
+
+
+def test_date_beyond_window(tmp_path, time_zone, freeze_time):
+    """a start date past the end of the window does not keep refreshing it"""
+    time_zone("Europe/Amsterdam")
+    today = dt_util.as_local(dt_util.utcnow()).date()
+    start_date = today + datetime.timedelta(days=EPHEMERIS_DAYS + 10)
+
+    async def run():
+        hass = HomeAssistant(str(tmp_path))
+        hass.config.latitude = 52.37
+        hass.config.longitude = 4.89
+        freeze_time(dt_util.start_of_local_day(today).replace(hour=12))
+
+        sun_tracker = SunTracker(hass)
+        ephemeris = SunEphemeris(hass, sun_tracker)
+        lookups = []
+
+        async def async_sun_updated():
+            # a sun-relative schedule looks up the first day it may trigger on
+            lookups.append(ephemeris.async_get_event(SUN_EVENT_SUNRISE, start_date))
+
+        sun_tracker.async_subscribe("id0", {SUN_EVENT_SUNRISE}, async_sun_updated)
+        ephemeris.async_start()
+        await hass.async_block_till_done()
+        version = ephemeris.version
+        assert lookups == [None]
+
+        # two days later the window is outdated, it is moved exactly once
+        freeze_time(
+            dt_util.start_of_local_day(today + datetime.timedelta(days=2)).replace(
+                hour=12
+            )
+        )
+        assert ephemeris.async_get_event(SUN_EVENT_SUNRISE, start_date) is None
+        await hass.async_block_till_done()
+        assert ephemeris.version == version + 1
+        assert lookups == [None, None]
+
+        # a refresh of an up to date window does not notify the schedules
+        ephemeris.async_refresh()
+        await hass.async_block_till_done()
+        assert ephemeris.version == version + 1
+        assert lookups == [None, None]
+
+        ephemeris.async_stop()
+        await hass.async_stop(force=True)
+
+    asyncio.run(run())
+
+
+class Coordinator:
+    """the parts of the coordinator which are used for sun times"""
+
+    def __init__(self, sun_tracker: SunTracker, sun_ephemeris: SunEphemeris):
+        self.sun_tracker = sun_tracker
+        self.sun_ephemeris = sun_ephemeris
+
+
+def test_polar_night(tmp_path, time_zone):
+    """days without sunrise are skipped instead of using the next sunrise"""
+    time_zone("Europe/Oslo")
+    today = dt_util.as_local(dt_util.utcnow()).date()
+    midwinter = datetime.date(today.year, 12, 21)
+    if midwinter <= today:
+        midwinter = midwinter.replace(year=today.year + 1)
+
+    async def run():
+        hass = HomeAssistant(str(tmp_path))
+        # Tromsø
+        hass.config.latitude = 69.65
+        hass.config.longitude = 18.96
+        sun_tracker = SunTracker(hass)
+        ephemeris = SunEphemeris(hass, sun_tracker)
+        ephemeris.async_start()
+        await hass.async_block_till_done()
+        ephemeris.async_stop()
+        await hass.async_stop(force=True)
+        return Coordinator(sun_tracker, ephemeris)
+
+    coordinator = asyncio.run(run())
+    ephemeris = coordinator.sun_ephemeris
+    assert ephemeris.async_get_event(SUN_EVENT_SUNRISE, midwinter) is NO_SUN_EVENT
+    assert ephemeris.async_get_event(SUN_EVENT_SUNSET, midwinter) is NO_SUN_EVENT
+
+    # the sun entity knows the next sunrise, which is weeks later
+    sunrise = compile_time("sunrise+00:00:00")
+    coordinator.sun_tracker._next_events[SUN_EVENT_SUNRISE] = dt_util.now()
+    assert resolve_time(coordinator, sunrise, midwinter) is None
+
+    ts = next_occurrence(
+        OccurrenceRule(),
+        lambda date: resolve_time(coordinator, sunrise, date),
+        dt_util.start_of_local_day(midwinter),
+    )
+    assert ts.date() > midwinter + datetime.timedelta(days=14)
+    first_sunrise = ephemeris.async_get_event(SUN_EVENT_SUNRISE, ts.date())
+    assert ts == first_sunrise.replace(second=0, microsecond=0)
+    assert (
+        ephemeris.async_get_event(
+            SUN_EVENT_SUNRISE, ts.date() - datetime.timedelta(days=1)
+        )
+        is NO_SUN_EVENT
+    )
@@ -0,0 +1,53 @@
+import asyncio
+
+from custom_components.scheduler.handles import HandleRegistry
+from custom_components.scheduler.occurrence import compile_time
+from custom_components.scheduler.sun import SunTracker
+from custom_components.scheduler.timer import TimerHandler
+
+
+class Coordinator:
+    """the parts of the coordinator which are used for tracking the sun"""
+
+    def __init__(self):
+        self.sun_tracker = SunTracker(None)
+
+
+def create_timer(registry: HandleRegistry) -> TimerHandler:
+    """timer handler with a running timer, without hass"""
+    timer = TimerHandler.__new__(TimerHandler)
+    timer.id = "id0"
+    timer.coordinator = Coordinator()
+    timer._handles = registry.async_create_scope(timer.id)
+    timer._timeslots = []
+    timer._sun_tracker = None
+    timer._sun_events = set()
+    timer._next_trigger = object()
+    return timer
+
+
+def test_sun_tracker_replaced():
+    """changing the tracked sun events does not leave the old subscription behind"""
+    registry = HandleRegistry()
+    timer = create_timer(registry)
+    sun_tracker = timer.coordinator.sun_tracker
+
+    async def run():
+        for time_str in ["sunrise+00:10:00", "sunset-00:30:00", "sunrise+00:00:00"]:
+            timer._watched_times = [(compile_time(time_str), 0)]
+            await timer.async_start_sun_tracker()
+            assert registry.active_handles == 1
+            assert set(sun_tracker._subscribers) == {timer.id}
+
+        # the same sun events keep the running tracker
+        tracker = timer._sun_tracker
+        await timer.async_start_sun_tracker()
+        assert timer._sun_tracker is tracker
+
+        await timer.async_stop_sun_tracker()
+
+    asyncio.run(run())
+    assert registry.active_handles == 0
+    assert registry.released_count == registry.registered_count == 3
+    assert timer._handles.async_release() == 0
+    assert registry.leaked_count == 0
@@ -0,0 +1,138 @@
+import datetime
+import time
+
+import homeassistant.util.dt as dt_util
+import pytest
+
+from custom_components.scheduler import const
+from custom_components.scheduler import timer as timer_module
+from custom_components.scheduler.occurrence import (
+    WorkdayCalendar,
+    compile_timeslot,
+    seconds_to_time,
+)
+from custom_components.scheduler.timer import TimerHandler
+
+RECOMPUTES = 100
+
+
+class Coordinator:
+    """the parts of the coordinator which are used for fixed times"""
+
+    spread = 0
+
+    def __init__(self):
+        self.workday_calendar = WorkdayCalendar()
+
+
+def create_timer(timeslots: list):
+    """timer handler of a daily schedule with (start, stop) timeslots, without hass"""
+    timer = TimerHandler.__new__(TimerHandler)
+    timer.id = "id0"
+    timer.coordinator = Coordinator()
+    timer._weekdays = [const.DAY_TYPE_DAILY]
+    timer._start_date = None
+    timer._end_date = None
+    timer._timeslots = [
+        compile_timeslot({const.ATTR_START: start, const.ATTR_STOP: stop})
+        for (start, stop) in timeslots
+    ]
+    timer._spread = None
+    timer._rule = None
+    timer._index = None
+    timer._workday_version = None
+    timer.slot_queue = []
+    timer.timestamps = []
+    return timer
+
+
+def day_of_timeslots(count: int) -> list:
+    """timeslots of equal length which cover a day"""
+    length = 86400 // count
+    return [
+        (
+            seconds_to_time(i * length).isoformat(),
+            seconds_to_time(i * length + length // 2).isoformat(),
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def noon(time_zone, freeze_time):
+    """12:00 local time"""
+    time_zone("Europe/Amsterdam")
+    now = datetime.datetime(2024, 3, 12, 12, 0, tzinfo=dt_util.DEFAULT_TIME_ZONE)
+    freeze_time(now)
+    return now
+
+
+def test_recompute_compiled_timeslots(noon, monkeypatch):
+    """cost of a recompute of 48 timeslots, compiled once or parsed every time"""
+    timeslots = day_of_timeslots(48)
+    timer = create_timer(timeslots)
+
+    def recompute(times: list):
+        for (start, stop) in times:
+            timer.calculate_timestamp(start, noon)
+            timer.calculate_timestamp(stop, noon)
+
+    start = time.perf_counter()
+    for _i in range(RECOMPUTES):
+        recompute(timeslots)
+    parsed = (time.perf_counter() - start) / RECOMPUTES
+
+    compiled_times = [(slot.start, slot.stop) for slot in timer._timeslots]
+    compiled_calls = []
+    compile_time = timer_module.compile_time
+    monkeypatch.setattr(
+        timer_module,
+        "compile_time",
+        lambda time_str: (compiled_calls.append(time_str), compile_time(time_str))[1],
+    )
+    start = time.perf_counter()
+    for _i in range(RECOMPUTES):
+        recompute(compiled_times)
+    compiled = (time.perf_counter() - start) / RECOMPUTES
+
+    print(
+        "48 timeslots: recompute {:.0f} us parsed, {:.0f} us compiled".format(
+            parsed * 1e6, compiled * 1e6
+        )
+    )
+    assert compiled_calls == []
+    assert [timer.calculate_timestamp(start, noon) for (start, _stop) in timeslots] == [
+        timer.calculate_timestamp(start, noon) for (start, _stop) in compiled_times
+    ]
+
+
+@pytest.mark.parametrize("count", [1, 24, 96, 288])
+def test_timeslot_lookup(noon, count):
+    """current and next timeslot from the index, or by calculating every timeslot"""
+    timer = create_timer(day_of_timeslots(count))
+
+    start = time.perf_counter()
+    timer.timeslot_index()
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _i in range(RECOMPUTES):
+        next_slot = timer.next_timeslot()
+        current_slot = timer.current_timeslot()
+    indexed = (time.perf_counter() - start) / RECOMPUTES
+
+    start = time.perf_counter()
+    starts = [timer.calculate_start(slot, noon) for slot in range(count)]
+    stops = [timer.calculate_timestamp(slot.stop, noon) for slot in timer._timeslots]
+    calculated = time.perf_counter() - start
+
+    print(
+        "{} timeslots: lookup {:.0f} us indexed (build {:.0f} us), "
+        "{:.0f} us calculated".format(
+            count, indexed * 1e6, build * 1e6, calculated * 1e6
+        )
+    )
+    assert next_slot == (starts.index(min(starts)), min(starts))
+    (slot, stop) = current_slot
+    if slot is not None:
+        assert stop == min(stops)
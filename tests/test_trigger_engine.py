@@ -0,0 +1,99 @@
+import asyncio
+import datetime
+import time
+
+import homeassistant.util.dt as dt_util
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.event import async_track_point_in_utc_time
+
+from custom_components.scheduler.trigger import TriggerEngine
+
+
+def loop_timers(hass: HomeAssistant) -> int:
+    """number of timer handles waiting in the event loop"""
+    return len([x for x in hass.loop._scheduled if not x.cancelled()])
+
+
+def trigger_times(count: int) -> list:
+    """points in time spread over the next day, a few in the same second"""
+    now = dt_util.utcnow().replace(microsecond=0)
+    return [
+        now + datetime.timedelta(hours=1, seconds=(i * 7) % 86400) for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize("schedules", [100, 1000, 10000])
+def test_timer_count(tmp_path, schedules):
+    """event loop timers and arm/cancel time for a timer per schedule"""
+
+    def action(_now):
+        pass
+
+    async def run():
+        hass = HomeAssistant(str(tmp_path))
+        points = trigger_times(schedules)
+        idle = loop_timers(hass)
+
+        # a HA timer per schedule
+        start = time.perf_counter()
+        cancels = [async_track_point_in_utc_time(hass, action, x) for x in points]
+        legacy_arm = time.perf_counter() - start
+        legacy_timers = loop_timers(hass) - idle
+        start = time.perf_counter()
+        for cancel in cancels:
+            cancel()
+        legacy_cancel = time.perf_counter() - start
+
+        # triggers of the shared engine
+        engine = TriggerEngine(hass)
+        start = time.perf_counter()
+        cancels = [engine.async_track_point_in_time(action, x) for x in points]
+        engine_arm = time.perf_counter() - start
+        engine_timers = loop_timers(hass) - idle
+        assert engine.active_triggers == schedules
+        start = time.perf_counter()
+        for cancel in cancels:
+            cancel()
+        engine_cancel = time.perf_counter() - start
+
+        print(
+            "{} schedules: {} loop timers, arm {:.1f} ms, cancel {:.1f} ms (engine: "
+            "{} loop timer, arm {:.1f} ms, cancel {:.1f} ms)".format(
+                schedules,
+                legacy_timers,
+                legacy_arm * 1000,
+                legacy_cancel * 1000,
+                engine_timers,
+                engine_arm * 1000,
+                engine_cancel * 1000,
+            )
+        )
+        assert legacy_timers == schedules
+        assert engine_timers == 1
+        assert engine.active_triggers == 0
+        assert engine.active_timers == 0
+        await hass.async_stop(force=True)
+
+    asyncio.run(run())
+
+
+def test_batch_of_same_second(tmp_path):
+    """triggers which are due in the same second fire as one batch"""
+    fired = []
+
+    async def run():
+        hass = HomeAssistant(str(tmp_path))
+        engine = TriggerEngine(hass)
+        now = dt_util.utcnow()
+        for i in range(50):
+            engine.async_track_point_in_time(fired.append, now)
+        engine._async_timer_finished(now)
+        await hass.async_block_till_done()
+        await hass.async_stop(force=True)
+
+        assert len(fired) == 50
+        assert engine.batch_count == 1
+        assert engine.largest_batch_size == 50
+
+    asyncio.run(run())